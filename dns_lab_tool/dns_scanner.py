@@ -3,86 +3,457 @@ import json
 import dns.resolver
 import sys
 import argparse
+import textwrap
+import time
+from pathlib import Path
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from zone_transfer import ZoneTransfers
+
+# Shared result file readers and writers live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from recon_common.serialization import (ResultWriter, detect_encoding, iter_records, open_output,
+                                        open_text_input, open_text_output, path_compression)
+from recon_common.metrics import REGISTRY, PROBES_IN_FLIGHT, MetricsExporter, submit_queued
+
+# Label of this tool's series in the shared metrics (recon_common.metrics)
+TOOL = 'dns_scanner'
+DNS_QUERIES = REGISTRY.counter('recon_dns_queries_total',
+                               'DNS queries sent, by record type and outcome '
+                               '(answer, nxdomain, no_answer, timeout, error)', ('type', 'outcome'))
+DNS_QUERY_DURATION = REGISTRY.histogram('recon_dns_query_seconds', 'Time per DNS query', ('type',))
+DNS_HOSTS = REGISTRY.counter('recon_dns_hosts_total', 'Hosts enriched with their nameservers')
+
+_OUTCOMES = ((dns.resolver.NXDOMAIN, 'nxdomain'), (dns.resolver.NoAnswer, 'no_answer'),
+             (dns.exception.Timeout, 'timeout'))
+
+def _resolve(name, rdtype):
+    """dns.resolver.resolve, counted in the DNS query metrics (cache misses only)."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        answer = dns.resolver.resolve(name, rdtype)
+        outcome = 'answer'
+        return answer
+    except Exception as e:
+        outcome = next((label for error, label in _OUTCOMES if isinstance(e, error)), 'error')
+        raise
+    finally:
+        DNS_QUERIES.labels(rdtype, outcome).inc()
+        DNS_QUERY_DURATION.labels(rdtype).observe(time.perf_counter() - start)
 
 def get_nameservers(domain):
     """
     Get NS records for a domain and their IPs.
     Returns a list of dicts: [{'name': 'ns1.example.com', 'ip': '1.2.3.4'}, ...]
+    Lookups are cached per process, so hosts seen by several scans are only
+    resolved once.
     """
-    nameservers = []
+    return [{'name': ns_name, 'ip': _resolve_ns_ip(ns_name)} for ns_name in _lookup_nameservers(domain)]
+
+# Per-process caches of the NS names of each host and the address of each
+# nameserver. Only answers (including NXDOMAIN and NoAnswer) are kept: a
+# timeout or other failure is retried by the next lookup, so one transient
+# error does not stick to every later entry of a batch scan.
+_nameserver_cache = {}
+_ns_ip_cache = {}
+
+def _lookup_nameservers(domain):
+    """NS names of domain (empty when it has none), cached unless the lookup failed."""
+    if domain in _nameserver_cache:
+        return _nameserver_cache[domain]
     try:
         # Query NS records
-        answers = dns.resolver.resolve(domain, 'NS')
-        for rdata in answers:
-            ns_name = str(rdata.target).rstrip('.')
-            ns_entry = {'name': ns_name, 'ip': None}
-            
-            # Resolve IP for the nameserver
-            try:
-                # Try A record (IPv4)
-                ip_answers = dns.resolver.resolve(ns_name, 'A')
-                # Take the first one for simplicity, or list all? Input example showed single string IP in one place, but list in my plan.
-                # Let's stringify the first IP for the 'ip' field to keep it simple as per plan example
-                if ip_answers:
-                     ns_entry['ip'] = str(ip_answers[0])
-            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.exception.Timeout):
-                pass
-            
-            nameservers.append(ns_entry)
-            
-    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.exception.Timeout, dns.name.EmptyLabel):
+        answers = _resolve(domain, 'NS')
+        nameservers = tuple(str(rdata.target).rstrip('.') for rdata in answers)
+    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.name.EmptyLabel):
         # No NS records found (common for subdomains that are just hosts)
-        pass
+        nameservers = ()
     except Exception as e:
+        # Timeout or resolver failure: no nameservers this time, not cached
         # print(f"Error resolving NS for {domain}: {e}", file=sys.stderr)
-        pass
-        
+        return ()
+    _nameserver_cache[domain] = nameservers
     return nameservers
 
-def process_results(input_file, output_file):
+def _resolve_ns_ip(ns_name):
+    """Resolve the IP of a nameserver; the same servers back many zones."""
+    if ns_name in _ns_ip_cache:
+        return _ns_ip_cache[ns_name]
+    ip = None
     try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
+        # Try A record (IPv4)
+        ip_answers = _resolve(ns_name, 'A')
+        # Take the first one for simplicity, or list all? Input example showed single string IP in one place, but list in my plan.
+        # Let's stringify the first IP for the 'ip' field to keep it simple as per plan example
+        if ip_answers:
+            ip = str(ip_answers[0])
+    except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+        pass
+    except dns.exception.DNSException:
+        # Timeout or resolver failure: retried next time, not cached
+        return None
+    _ns_ip_cache[ns_name] = ip
+    return ip
+
+def build_entry(url, ips, transfers=None):
+    """
+    Build one result entry for a URL discovered by subdomain_checker.
+    Returns None when the URL has no usable hostname.
+    With `transfers` (a zone_transfer.ZoneTransfers), hosts covered by a
+    transferred zone are answered from it, and every newly seen zone apex
+    gets its AXFR attempt.
+    """
+    parsed = urlparse(url)
+    hostname = parsed.netloc or parsed.path # Handle cases without scheme if any
+    if not hostname:
+        return None
+
+    print(f"Processing: {hostname}")
+
+    with PROBES_IN_FLIGHT.labels(TOOL).track_inprogress():
+        nameservers = None
+        if transfers:
+            nameservers = transfers.nameservers_for(hostname, _resolve_ns_ip)
+        if nameservers is None:
+            nameservers = get_nameservers(hostname)
+            if transfers and nameservers:
+                transfers.attempt(hostname, nameservers)
+    DNS_HOSTS.inc()
+
+    return {
+        "domain": hostname,
+        "ip_addresses": ips,
+        "nameservers": nameservers
+    }
+
+def add_transferred(entries, transfers, domain=None):
+    """
+    Pass entries through, then append the hosts found only in transferred
+    zones once the input is exhausted (only zones at or under `domain`,
+    when given).
+    """
+    seen = set()
+    for entry in entries:
+        seen.add(entry['domain'].lower())
+        yield entry
+    if transfers:
+        yield from transfers.extra_entries(seen, _resolve_ns_ip, domain)
+
+def enrich_results(items, max_workers=10, executor=None, transfers=None):
+    """
+    Resolve nameservers for (url, ips) pairs concurrently.
+    Consumes `items` lazily, so lookups start while the producer is still
+    running, and yields entries as soon as each one is ready.
+    Pass `executor` to share one thread pool between several scans.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield from enrich_results(items, executor=executor, transfers=transfers)
+        return
+
+    pending = set()
+    for url, ips in items:
+        pending.add(submit_queued(executor, TOOL, build_entry, url, ips, transfers))
+        done = {f for f in pending if f.done()}
+        pending -= done
+        for future in done:
+            entry = future.result()
+            if entry:
+                yield entry
+
+    for future in as_completed(pending):
+        entry = future.result()
+        if entry:
+            yield entry
+
+OUTPUT_FORMATS = ('json', 'jsonl', 'array', 'normalized', 'bin')
+
+def iter_url_ips(f, chunk_size=1 << 16):
+    """
+    Incrementally parse subdomain_checker output ({"url": ["ip", ...], ...})
+    from an open file, yielding (url, ips) pairs without loading the whole
+    document. Raises ValueError on malformed JSON.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def peek():
+        # Next non-whitespace character, reading more input as needed
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if eof:
+                raise ValueError("Unexpected end of JSON input")
+            fill()
+
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {pos}")
+        pos += 1
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A value touching the end of the buffer may be cut short (e.g. a number)
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            pos = end
+            return obj
+
+    expect('{')
+    if peek() == '}':
+        return
+    while True:
+        url = value()
+        if not isinstance(url, str):
+            raise ValueError(f"Expected a URL string, got {url!r}")
+        expect(':')
+        yield url, value()
+        if peek() == '}':
+            return
+        expect(',')
+
+def read_url_ips(input_file):
+    """
+    (url, ips) pairs from a subdomain_checker output file, in any of its
+    formats (detected from the content, optionally gzip/zstd-compressed):
+    the {"url": ["ip", ...]} document is parsed incrementally by
+    iter_url_ips, jsonl/bin files hold {"url", "ips"} records.
+    Raises FileNotFoundError before returning.
+    """
+    if detect_encoding(input_file) != 'json':
+        return ((record['url'], record['ips']) for record in iter_records(input_file))
+
+    def pairs():
+        with open_text_input(input_file) as f:
+            yield from iter_url_ips(f)
+    return pairs()
+
+def write_results(entries, f, output_format='json'):
+    """
+    Write entries to an open file as soon as each one arrives.
+      json:  the original {"results": [...]} document (same bytes as json.dump(indent=4))
+      jsonl: one compact entry per line
+      array: a top-level JSON array, one compact entry per line
+      normalized: IPs and nameserver sets stored once, see _write_normalized
+      bin:   recon_common.serialization binary records (`f` opened in binary mode)
+    Returns the number of entries written.
+    """
+    count = 0
+    if output_format == 'bin':
+        # Entries are framed in chunks, so they reach the file CHUNK_SIZE at a time
+        with ResultWriter(f, 'bin') as writer:
+            count = writer.write_many(entries)
+    elif output_format == 'jsonl':
+        for entry in entries:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            count += 1
+    elif output_format == 'array':
+        f.write('[')
+        for entry in entries:
+            f.write((',\n' if count else '\n') + json.dumps(entry))
+            f.flush()
+            count += 1
+        f.write('\n]\n' if count else ']\n')
+    elif output_format == 'normalized':
+        count = _write_normalized(entries, f)
+    else:
+        f.write('{\n    "results": [')
+        for entry in entries:
+            f.write((',\n' if count else '\n') + textwrap.indent(json.dumps(entry, indent=4), ' ' * 8))
+            f.flush()
+            count += 1
+        f.write('\n    ]\n}' if count else ']\n}')
+    return count
+
+def _write_normalized(entries, f):
+    """
+    Write entries with every IP, nameserver and nameserver set stored once:
+
+        {"format": "normalized",
+         "hosts": [["www.upm.es", [0], 0], ...],    # domain, ip ids, nameserver set id
+         "ips": ["138.100.10.10", ...],
+         "nameservers": [["dns1.upm.es", 1], ...],  # name, ip id (or null)
+         "nameserver_sets": [[0, 1], ...]}           # nameserver ids
+
+    Hosts are streamed as they arrive; the lookup tables follow them.
+    """
+    ips, nameservers, nameserver_sets = {}, {}, {}
+
+    def intern(table, key):
+        return table.setdefault(key, len(table))
+
+    count = 0
+    f.write('{"format": "normalized", "hosts": [')
+    for entry in entries:
+        ip_ids = [intern(ips, ip) for ip in entry['ip_addresses']]
+        ns_ids = tuple(
+            intern(nameservers, (ns['name'], None if ns['ip'] is None else intern(ips, ns['ip'])))
+            for ns in entry['nameservers']
+        )
+        row = [entry['domain'], ip_ids, intern(nameserver_sets, ns_ids)]
+        f.write((',\n' if count else '\n') + json.dumps(row))
+        f.flush()
+        count += 1
+
+    f.write('\n], "ips": ' + json.dumps(list(ips)))
+    f.write(',\n"nameservers": ' + json.dumps([list(ns) for ns in nameservers]))
+    f.write(',\n"nameserver_sets": ' + json.dumps([list(ids) for ids in nameserver_sets]))
+    f.write('}\n')
+    return count
+
+def expand_normalized(data):
+    """Lazily rebuild the original entry dicts from a normalized document."""
+    ips = data['ips']
+    nameservers = [
+        {'name': name, 'ip': None if ip_id is None else ips[ip_id]}
+        for name, ip_id in data['nameservers']
+    ]
+    nameserver_sets = data['nameserver_sets']
+    for domain, ip_ids, set_id in data['hosts']:
+        yield {
+            "domain": domain,
+            "ip_addresses": [ips[i] for i in ip_ids],
+            "nameservers": [dict(nameservers[i]) for i in nameserver_sets[set_id]]
+        }
+
+def open_results_output(output_file, output_format):
+    """
+    Open output_file for write_results: binary for 'bin', text otherwise.
+    A .gz or .zst suffix compresses it.
+    """
+    compression = path_compression(output_file)
+    if output_format == 'bin':
+        return open_output(output_file, compression)
+    return open_text_output(output_file, compression)
+
+def iter_results(input_file):
+    """
+    Iterate the entries of a results file written in any OUTPUT_FORMATS,
+    detecting the format (and gzip/zstd compression) from its content.
+    """
+    if detect_encoding(input_file) != 'json':
+        return iter_records(input_file)
+    with open_text_input(input_file) as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        if not e.msg.startswith('Extra data'):
+            raise
+        # jsonl: one entry per line
+        return (json.loads(line) for line in text.splitlines() if line.strip())
+    if isinstance(data, list):
+        return iter(data)
+    if data.get('format') == 'normalized':
+        return expand_normalized(data)
+    return iter(data['results'])
+
+def load_results(input_file):
+    """Load a results file in any format as the original {"results": [...]} shape."""
+    return {"results": list(iter_results(input_file))}
+
+def convert_results(input_file, output_file, output_format):
+    try:
+        entries = iter_results(input_file)
     except FileNotFoundError:
         print(f"Error: Input file {input_file} not found.")
         return
-    except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in {input_file}.")
+    except (json.JSONDecodeError, KeyError, TypeError):
+        print(f"Error: {input_file} is not a results file.")
         return
 
-    final_results = []
-
-    # The input is a dict: {"url": ["ip", ...], ...}
-    for url, ips in data.items():
-        # Extract hostname
-        parsed = urlparse(url)
-        hostname = parsed.netloc or parsed.path # Handle cases without scheme if any
-        if not hostname:
-            continue
-            
-        print(f"Processing: {hostname}")
-        
-        entry = {
-            "domain": hostname,
-            "ip_addresses": ips,
-            "nameservers": get_nameservers(hostname)
-        }
-        final_results.append(entry)
+    with open_results_output(output_file, output_format) as f:
+        count = write_results(entries, f, output_format)
+    print(f"Finished. {count} results converted to {output_format} in {output_file}")
 
-    # Wrap in a "results" key or just list? The plan said:
-    # { "results": [ ... ] }
-    output_data = {"results": final_results}
+def process_results(input_file, output_file, output_format='json', max_workers=1, transfers=None):
+    """
+    Stream subdomain_checker output through the NS resolver into output_file.
+    With max_workers > 1 lookups run concurrently and entries are written
+    in completion order instead of input order.
+    """
+    try:
+        items = read_url_ips(input_file)
+    except FileNotFoundError:
+        print(f"Error: Input file {input_file} not found.")
+        return
 
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=4)
+    with open_results_output(output_file, output_format) as outfile:
+        if max_workers > 1:
+            entries = enrich_results(items, max_workers=max_workers, transfers=transfers)
+        else:
+            entries = (entry for entry in (build_entry(url, ips, transfers) for url, ips in items) if entry)
+        try:
+            count = write_results(add_transferred(entries, transfers), outfile, output_format)
+        except ValueError:
+            print(f"Error: Invalid JSON in {input_file}. Partial results left in {output_file}.")
+            return
     
-    print(f"Finished. Results saved to {output_file}")
+    print(f"Finished. {count} results saved to {output_file}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="DNS Enumeration Tool - NS Resolver")
-    parser.add_argument('input_file', help="Path to input JSON file from subdomain_checker")
-    parser.add_argument('output_file', help="Path to output JSON file")
+    parser.add_argument('input_file', help="Path to input file from subdomain_checker (any format, optionally .gz/.zst)")
+    parser.add_argument('output_file', help="Path to output file (a .gz or .zst suffix compresses it)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='json',
+                        help="json: {\"results\": [...]} (default), jsonl: one entry per line, "
+                             "array: streamed JSON array, normalized: deduplicated lookup tables, "
+                             "bin: compact binary records")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Concurrent NS lookups (default: 1, keeps input order)")
+    parser.add_argument('--convert', action='store_true',
+                        help="input_file is an existing results file (any format); rewrite it in --format without any lookups")
+    parser.add_argument('--axfr', action='store_true',
+                        help="Attempt a zone transfer against each zone's nameservers (authorised audits only)")
+    parser.add_argument('--axfr-timeout', type=float, default=5.0,
+                        help="Timeout in seconds for each AXFR attempt (default: 5)")
+    parser.add_argument('--axfr-port', type=int, default=53,
+                        help="DNS port of the nameservers for AXFR, e.g. a local test server (default: 53)")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="Serve live lookup metrics (Prometheus text format) on http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Rewrite PATH with the live lookup metrics every 15 seconds")
     args = parser.parse_args()
 
-    process_results(args.input_file, args.output_file)
+    if args.convert:
+        convert_results(args.input_file, args.output_file, args.format)
+    else:
+        metrics = MetricsExporter.from_config(None, args.metrics_port, args.metrics_file)
+        if metrics is not None:
+            metrics.start()
+            print(f"Metrics: {metrics.url or metrics.path}")
+        transfers = ZoneTransfers(timeout=args.axfr_timeout, port=args.axfr_port) if args.axfr else None
+        try:
+            process_results(args.input_file, args.output_file, args.format, args.workers, transfers)
+        finally:
+            if metrics is not None:
+                metrics.close()
+        if transfers:
+            allowed = [f for f in transfers.findings if f['allowed']]
+            print(f"AXFR: {len(allowed)}/{len(transfers.findings)} attempts allowed")
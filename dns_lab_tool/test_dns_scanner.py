@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Checks of the per-process NS lookup caches of dns_scanner (no network needed)
+
+Run with: python -m pytest dns_lab_tool/test_dns_scanner.py
+      or: python dns_lab_tool/test_dns_scanner.py
+"""
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import dns.exception
+import dns.resolver
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dns_scanner
+
+
+class FakeResolver:
+    """Stands in for dns_scanner._resolve, answering from a script of results per query."""
+
+    def __init__(self, script):
+        self.script = script
+        self.queries = []
+
+    def __call__(self, name, rdtype):
+        self.queries.append((name, rdtype))
+        result = self.script[(name, rdtype)].pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@contextmanager
+def scanner_with(script):
+    """Empty caches and scripted DNS answers for the duration of a test."""
+    resolve = dns_scanner._resolve
+    dns_scanner._nameserver_cache.clear()
+    dns_scanner._ns_ip_cache.clear()
+    dns_scanner._resolve = FakeResolver(script)
+    try:
+        yield dns_scanner._resolve
+    finally:
+        dns_scanner._resolve = resolve
+        dns_scanner._nameserver_cache.clear()
+        dns_scanner._ns_ip_cache.clear()
+
+
+def ns(*names):
+    return [SimpleNamespace(target=f"{name}.") for name in names]
+
+
+def test_timeouts_are_retried():
+    with scanner_with({
+            ('a.com', 'NS'): [dns.exception.Timeout(), ns('ns1.a.com')],
+            ('ns1.a.com', 'A'): [dns.exception.Timeout(), ['192.0.2.1']],
+    }) as resolver:
+        assert dns_scanner.get_nameservers('a.com') == []
+        # The NS answer is kept, the nameserver address is looked up again
+        assert dns_scanner.get_nameservers('a.com') == [{'name': 'ns1.a.com', 'ip': None}]
+        assert dns_scanner.get_nameservers('a.com') == [{'name': 'ns1.a.com', 'ip': '192.0.2.1'}]
+        assert len(resolver.queries) == 4
+
+
+def test_answers_are_cached():
+    with scanner_with({
+            ('a.com', 'NS'): [ns('ns1.a.com', 'ns2.a.com')],
+            ('www.a.com', 'NS'): [dns.resolver.NoAnswer()],
+            ('ns1.a.com', 'A'): [['192.0.2.1']],
+            ('ns2.a.com', 'A'): [dns.resolver.NXDOMAIN()],
+    }) as resolver:
+        for _ in range(3):
+            assert dns_scanner.get_nameservers('a.com') == [{'name': 'ns1.a.com', 'ip': '192.0.2.1'},
+                                                            {'name': 'ns2.a.com', 'ip': None}]
+            assert dns_scanner.get_nameservers('www.a.com') == []
+        assert len(resolver.queries) == 4
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
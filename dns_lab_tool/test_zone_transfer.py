@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Checks of the AXFR stage: transfers against a local authoritative server on
+127.0.0.1 that allows or refuses them, and the results kept apart per domain
+(no network needed)
+
+Run with: python -m pytest dns_lab_tool/test_zone_transfer.py
+      or: python dns_lab_tool/test_zone_transfer.py
+"""
+import socketserver
+import struct
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import dns.zone
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dns_scanner import add_transferred, build_entry
+from test_dns_scanner import ns, scanner_with
+from zone_transfer import ZoneTransfers
+
+ZONES = {
+    'a.com': """
+@    3600 IN SOA ns1.a.com. admin.a.com. 1 3600 600 86400 300
+@    3600 IN NS  ns1.a.com.
+ns1  3600 IN A   192.0.2.1
+www  3600 IN A   192.0.2.10
+""",
+    'b.org': """
+@    3600 IN SOA ns1.b.org. admin.b.org. 1 3600 600 86400 300
+@    3600 IN NS  ns1.b.org.
+ns1  3600 IN A   198.51.100.1
+mail 3600 IN A   198.51.100.25
+""",
+}
+
+
+def transferred_zones():
+    """A ZoneTransfers shared by two scans, as in batch mode, with both zones transferred."""
+    transfers = ZoneTransfers()
+    for name, text in ZONES.items():
+        transfers._zones[name] = dns.zone.from_text(text, origin=name, relativize=True)
+    return transfers
+
+
+class AuthoritativeStub(socketserver.ThreadingTCPServer):
+    """DNS over TCP on 127.0.0.1 answering AXFR for `zones` and refusing it for any other zone."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, zones):
+        super().__init__(('127.0.0.1', 0), AxfrHandler)
+        self.zones = {name: dns.zone.from_text(text, origin=name, relativize=False) for name, text in zones.items()}
+        self.queries = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class AxfrHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        (length,) = struct.unpack('!H', self.recv(2))
+        query = dns.message.from_wire(self.recv(length))
+        zone_name = query.question[0].name.to_text().rstrip('.')
+        self.server.queries.append(zone_name)
+        response = dns.message.make_response(query)
+        data = self.server.zones.get(zone_name)
+        if data is None or query.question[0].rdtype != dns.rdatatype.AXFR:
+            response.set_rcode(dns.rcode.REFUSED)
+        else:
+            # The zone between two copies of its SOA, in a single message
+            soa = dns.rrset.from_rdata_list(data.origin, 3600, list(data.find_rdataset('@', 'SOA')))
+            response.answer.append(soa)
+            for name, rdataset in data.iterate_rdatasets():
+                if rdataset.rdtype != dns.rdatatype.SOA:
+                    response.answer.append(dns.rrset.from_rdata_list(name, rdataset.ttl, list(rdataset)))
+            response.answer.append(soa)
+        wire = response.to_wire()
+        self.request.sendall(struct.pack('!H', len(wire)) + wire)
+
+    def recv(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+
+@contextmanager
+def authoritative_stub(zones):
+    server = AuthoritativeStub(zones)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def no_lookup(ns_name):
+    raise AssertionError(f"Unexpected NS lookup for {ns_name}")
+
+
+def hosts(entries):
+    return sorted(entry['domain'] for entry in entries)
+
+
+def test_allowed_transfer_answers_the_host_lookups():
+    with authoritative_stub({'a.com': ZONES['a.com']}) as stub, scanner_with({
+            ('a.com', 'NS'): [ns('ns1.a.com')],
+            ('ns1.a.com', 'A'): [['127.0.0.1']],
+    }) as resolver:
+        transfers = ZoneTransfers(timeout=2, port=stub.port)
+        entries = [build_entry('https://a.com', ['192.0.2.10'], transfers),
+                   build_entry('https://www.a.com', ['192.0.2.10'], transfers)]
+
+        assert stub.queries == ['a.com']
+        assert transfers.findings == [{'zone': 'a.com', 'nameserver': 'ns1.a.com', 'ip': '127.0.0.1',
+                                       'allowed': True, 'records': 4, 'error': None}]
+        # www.a.com is answered from the zone: no NS query of its own
+        assert resolver.queries == [('a.com', 'NS'), ('ns1.a.com', 'A')]
+        assert entries[1]['nameservers'] == []
+        assert hosts(add_transferred(iter(entries), transfers, 'a.com')) == ['a.com', 'ns1.a.com', 'www.a.com']
+
+
+def test_refused_transfer_is_recorded_and_hosts_are_resolved():
+    with authoritative_stub({'a.com': ZONES['a.com']}) as stub, scanner_with({
+            ('b.org', 'NS'): [ns('ns1.b.org')],
+            ('ns1.b.org', 'A'): [['127.0.0.1']],
+            ('mail.b.org', 'NS'): [dns.resolver.NoAnswer()],
+    }) as resolver:
+        transfers = ZoneTransfers(timeout=2, port=stub.port)
+        root = build_entry('https://b.org', ['198.51.100.1'], transfers)
+        mail = build_entry('https://mail.b.org', ['198.51.100.25'], transfers)
+
+        assert stub.queries == ['b.org']
+        [finding] = transfers.findings
+        assert finding['zone'] == 'b.org' and not finding['allowed'] and finding['records'] == 0
+        assert finding['error']
+        assert root['nameservers'] == [{'name': 'ns1.b.org', 'ip': '127.0.0.1'}]
+        assert mail['nameservers'] == []
+        assert ('mail.b.org', 'NS') in resolver.queries
+        # Nothing was transferred, so nothing is appended
+        assert hosts(add_transferred(iter([root, mail]), transfers, 'b.org')) == ['b.org', 'mail.b.org']
+
+
+def test_each_domain_gets_only_its_own_hosts():
+    # Both zones are transferred before either scan appends its extra hosts
+    # (nameserver addresses come from the zones' glue, so nothing is resolved)
+    transfers = transferred_zones()
+
+    a_com = hosts(add_transferred(iter([{'domain': 'www.a.com'}]), transfers, 'a.com'))
+    b_org = hosts(add_transferred(iter([]), transfers, 'b.org'))
+
+    assert a_com == ['ns1.a.com', 'www.a.com']
+    assert b_org == ['mail.b.org', 'ns1.b.org']
+
+
+def test_subzones_belong_to_their_parent_domain():
+    transfers = transferred_zones()
+    transfers._zones['dept.a.com'] = dns.zone.from_text("""
+@    3600 IN SOA ns1.a.com. admin.a.com. 1 3600 600 86400 300
+@    3600 IN NS  ns1.a.com.
+lab  3600 IN A   192.0.2.50
+""", origin='dept.a.com', relativize=True)
+
+    assert hosts(transfers.extra_entries(set(), no_lookup, 'a.com')) == [
+        'lab.dept.a.com', 'ns1.a.com', 'www.a.com']
+    assert hosts(transfers.extra_entries(set(), no_lookup, 'b.org')) == ['mail.b.org', 'ns1.b.org']
+
+
+def test_without_domain_every_zone_is_listed():
+    # dns_scanner.py on its own: the input file is the whole scope
+    assert hosts(transferred_zones().extra_entries(set(), no_lookup)) == [
+        'mail.b.org', 'ns1.a.com', 'ns1.b.org', 'www.a.com']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
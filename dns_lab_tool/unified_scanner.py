@@ -1,77 +1,244 @@
 #!/usr/bin/env python3
 import argparse
-import subprocess
-import os
 import sys
-import tempfile
 import json
+import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import yaml
+
+# Shared metrics and profiling live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from recon_common.metrics import MetricsExporter
+from recon_common.profiling import StageProfiler, stage
+
 # Import the logic from our existing scanner
 # Assuming this script is in dns_lab_tool/, and dns_scanner.py is also there.
 try:
-    from dns_scanner import process_results
+    from dns_scanner import (enrich_results, write_results, add_transferred, get_nameservers,
+                             open_results_output, OUTPUT_FORMATS)
+    from zone_transfer import ZoneTransfers
 except ImportError:
     # If run from elsewhere, try to adjust path or fail
     sys.path.append(str(Path(__file__).parent))
-    from dns_scanner import process_results
+    from dns_scanner import (enrich_results, write_results, add_transferred, get_nameservers,
+                             open_results_output, OUTPUT_FORMATS)
+    from zone_transfer import ZoneTransfers
+
+# subdomain_checker is one level up; its modules import each other flat from src/
+CHECKER_DIR = Path(__file__).parent.resolve().parent / "subdomain_checker"
+sys.path.insert(0, str(CHECKER_DIR / "src"))
+
+# Suppress SSL warnings (the verifier uses verify=False)
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+from crtsh_scraper import CrtShScraper
+from subdomain_verifier import SubdomainVerifier
+
+
+def load_checker_config():
+    """Load subdomain_checker's config so both tools scan with the same settings."""
+    with open(CHECKER_DIR / "config" / "config.yaml", 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+def live_url_ips(results):
+    """Turn a stream of verifier results into (url, [ip]) pairs for live URLs."""
+    for r in results:
+        if r['is_live']:
+            yield r['url'], [r['ip']] if r.get('ip') else []
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+def output_path(domain, output_dir, output_format='json', compression=None):
+    extension = output_format if output_format in ('jsonl', 'bin') else 'json'
+    return Path(output_dir) / f"{domain}_full_results.{extension}{COMPRESSION_SUFFIXES.get(compression, '')}"
+
+def scan_domain(domain, scraper, verifier, config, output_dir, output_format='json',
+                http_executor=None, ns_executor=None, transfers=None, compression=None):
+    """
+    Discover, verify and NS-enrich one domain, writing each entry to its
+    output file as soon as it is ready. Returns the output path, or None
+    when crt.sh returned nothing for the domain.
+    With `transfers`, the root zone's AXFR is tried up front so that a
+    successful transfer answers the NS lookups of every host it covers.
+    `compression` ('gzip' or 'zstd') compresses the output file.
+    """
+    with stage('discovery'):
+        subdomains = scraper.search_subdomains(f"%.{domain}", use_json_api=config.get('use_json_api', True))
+    if not subdomains:
+        return None
+
+    if transfers:
+        with stage('resolution'):
+            transfers.attempt(domain, get_nameservers(domain))
+
+    # Every live URL is handed to the NS resolver as soon as the verifier reports it
+    # (and written out as soon as it is resolved, so all three are the probing stage)
+    live = live_url_ips(verifier.iter_verify(subdomains, executor=http_executor))
+    entries = add_transferred(enrich_results(live, executor=ns_executor, transfers=transfers), transfers, domain)
+
+    final_output = output_path(domain, output_dir, output_format, compression)
+    with stage('probing'), open_results_output(final_output, output_format) as f:
+        write_results(entries, f, output_format)
+    if transfers:
+        with stage('output'):
+            save_axfr_findings(domain, transfers, output_dir)
+    return final_output
+
+def save_axfr_findings(domain, transfers, output_dir):
+    """Write every AXFR attempt for zones under domain, allowed or not, for the audit report."""
+    findings = [f for f in list(transfers.findings)
+                if f['zone'] == domain or f['zone'].endswith('.' + domain)]
+    with open(Path(output_dir) / f"{domain}_axfr_findings.json", 'w') as f:
+        json.dump({"findings": findings}, f, indent=4)
+
+def build_components(config):
+    scraper = CrtShScraper(
+        base_url=config['crt_sh_url'],
+        timeout=config['request_timeout'],
+        user_agent=config['user_agent'],
+        memory_budget_mb=config.get('memory_budget_mb', 256),
+        spill_dir=config.get('spill_dir')
+    )
+    verifier = SubdomainVerifier(
+        timeout=config['verification_timeout'],
+        protocols=config['protocols'],
+        max_workers=config.get('max_workers', 10)
+    )
+    return scraper, verifier
 
-def run_unified_scan(domain):
+def run_unified_scan(domain, output_format='json', transfers=None, compression=None):
     print(f"[*] Starting unified scan for: {domain}")
-    
-    # Define paths
+
     base_dir = Path(__file__).parent.resolve()
-    # subdomain_checker is one level up and then in subdomain_checker/
-    checker_dir = base_dir.parent / "subdomain_checker"
-    checker_script = checker_dir / "main.py"
-    
-    if not checker_script.exists():
-        print(f"[!] Error: Could not find subdomain_checker at {checker_script}")
-        sys.exit(1)
+    config = load_checker_config()
+    scraper, verifier = build_components(config)
 
-    # 1. Run subdomain_checker
-    # We'll use a temporary file for the intermediate JSON
-    # Named explicitly so we can easily find it if needed, or just temp file
-    temp_fd, temp_path = tempfile.mkstemp(suffix='.json', prefix=f'subdomains_{domain}_')
-    os.close(temp_fd) # Close file descriptor, we just need the path
-
-    print(f"[*] Step 1: Discovering subdomains (using subdomain_checker)...")
-    cmd = [
-        "python3",
-        str(checker_script),
-        "-q", f"%.{domain}",
-        "-o", temp_path
-    ]
-    
-    # We want to capture output or let it stream? 
-    # Let's let it stream to stdout so user sees progress
+    print(f"[*] Discovering subdomains, verifying them and resolving Name Servers...")
     try:
-        subprocess.run(cmd, cwd=str(checker_dir), check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"[!] Subdomain discovery failed with exit code {e.returncode}")
-        # Cleanup
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        final_output = scan_domain(domain, scraper, verifier, config, base_dir, output_format,
+                                   transfers=transfers, compression=compression)
+    except IOError as e:
+        print(f"[!] Error saving results: {e}")
         sys.exit(1)
+    if final_output is None:
+        print(f"[!] Subdomain discovery returned no results")
+        sys.exit(1)
+
+    print(f"\n[+] Unified scan completed successfully!")
+    print(f"[+] Final results saved to: {final_output}")
 
-    # 2. Run dns_scanner process_results
-    final_output = base_dir / f"{domain}_full_results.json"
-    print(f"\n[*] Step 2: resolving Name Servers and formatting results...")
-    
+def read_domains(domains_file):
+    """Read root domains, one per line; blank lines and '#' comments are skipped."""
+    domains = []
+    with open(domains_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip().lower()
+            if line and not line.startswith('#') and line not in domains:
+                domains.append(line)
+    return domains
+
+def run_batch_scan(domains_file, domain_workers=4, output_dir=None, output_format='json', transfers=None,
+                   compression=None):
+    """
+    Scan every domain in `domains_file` concurrently.
+
+    All domains share one scraper (HTTP session + crt.sh response cache),
+    one verifier session, the NS lookup cache and a single pair of thread
+    pools sized from `max_workers`, so the global concurrency stays the
+    same no matter how many domains run at once. Each domain's output is
+    written as soon as that domain finishes.
+    """
     try:
-        process_results(temp_path, str(final_output))
-        print(f"\n[+] Unified scan completed successfully!")
-        print(f"[+] Final results saved to: {final_output}")
-    except Exception as e:
-        print(f"[!] Error during processing: {e}")
-    finally:
-        # Cleanup intermediate file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        domains = read_domains(domains_file)
+    except FileNotFoundError:
+        print(f"[!] Error: Domains file {domains_file} not found.")
+        sys.exit(1)
+
+    output_dir = Path(output_dir) if output_dir else Path(__file__).parent.resolve()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    config = load_checker_config()
+    scraper, verifier = build_components(config)
+    max_workers = config.get('max_workers', 10)
+
+    print(f"[*] Starting batch scan for {len(domains)} domains ({domain_workers} at a time)")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as http_executor, \
+         ThreadPoolExecutor(max_workers=max_workers) as ns_executor, \
+         ThreadPoolExecutor(max_workers=domain_workers) as domain_executor:
+        future_to_domain = {
+            domain_executor.submit(scan_domain, domain, scraper, verifier, config, output_dir,
+                                   output_format, http_executor, ns_executor, transfers, compression): domain
+            for domain in domains
+        }
+        for future in as_completed(future_to_domain):
+            domain = future_to_domain[future]
+            try:
+                final_output = future.result()
+            except Exception as e:
+                print(f"[!] Error scanning {domain}: {e}")
+                failed.append(domain)
+                continue
+            if final_output is None:
+                print(f"[!] Subdomain discovery returned no results for {domain}")
+                failed.append(domain)
+                continue
+            print(f"[+] Final results for {domain} saved to: {final_output}")
+
+    print(f"\n[+] Batch scan finished: {len(domains) - len(failed)}/{len(domains)} domains completed")
+    if failed:
+        print(f"[!] Domains without results: {', '.join(failed)}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Unified DNS Enumeration Tool")
-    parser.add_argument("domain", help="Target domain (e.g., upm.es)")
+    parser.add_argument("domain", nargs='?', help="Target domain (e.g., upm.es)")
+    parser.add_argument("-f", "--domains-file", help="File with one root domain per line (batch mode)")
+    parser.add_argument("-w", "--domain-workers", type=int, default=4,
+                        help="Domains scanned at the same time in batch mode (default: 4)")
+    parser.add_argument("-o", "--output-dir", help="Output directory for batch mode (default: this directory)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='json',
+                        help="json: {\"results\": [...]} (default), jsonl: one entry per line, array: streamed JSON array, "
+                             "normalized: deduplicated lookup tables, bin: compact binary records")
+    parser.add_argument("--compress", choices=tuple(COMPRESSION_SUFFIXES),
+                        help="Compress the output files (.gz / .zst; zstd needs the zstandard package)")
+    parser.add_argument("--axfr", action="store_true",
+                        help="Attempt a zone transfer against each zone's nameservers (authorised audits only)")
+    parser.add_argument("--axfr-timeout", type=float, default=5.0,
+                        help="Timeout in seconds for each AXFR attempt (default: 5)")
+    parser.add_argument("--axfr-port", type=int, default=53,
+                        help="DNS port of the nameservers for AXFR, e.g. a local test server (default: 53)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve live scan metrics (Prometheus text format) on http://127.0.0.1:PORT/metrics "
+                             "(default: metrics.port in the subdomain_checker config)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Rewrite PATH with the live scan metrics every metrics.interval seconds")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Profile each stage (CPU, collapsed stacks for flame graphs, allocations) and write "
+                             "the results to DIR")
     args = parser.parse_args()
+    if not args.domains_file and not args.domain:
+        parser.error("a domain or --domains-file is required")
 
-    run_unified_scan(args.domain)
+    metrics = MetricsExporter.from_config(load_checker_config().get('metrics'), args.metrics_port, args.metrics_file)
+    if metrics is not None:
+        metrics.start()
+        print(f"[*] Metrics: {metrics.url or metrics.path}")
+
+    transfers = ZoneTransfers(timeout=args.axfr_timeout, port=args.axfr_port) if args.axfr else None
+    profiler = StageProfiler(args.profile).start() if args.profile else None
+    try:
+        if args.domains_file:
+            # Each domain worker enters scan_domain's stages in its own thread
+            run_batch_scan(args.domains_file, args.domain_workers, args.output_dir, args.format, transfers,
+                           args.compress)
+        else:
+            run_unified_scan(args.domain, args.format, transfers, args.compress)
+    finally:
+        if metrics is not None:
+            metrics.close()
+        if profiler is not None:
+            profiler.close()
+            print(f"\n[*] Stage profile written to {profiler.output_dir}:")
+            print(profiler.summary())
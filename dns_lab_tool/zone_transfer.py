@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Optional AXFR (zone transfer) stage for authorised audits.
+
+Once a zone's authoritative servers are known, a single AXFR attempt per
+nameserver shows whether the whole zone is exposed. A successful transfer
+is recorded as a finding, and its records answer the per-host lookups for
+every name it covers.
+"""
+import sys
+import threading
+from pathlib import Path
+
+import dns.exception
+import dns.query
+import dns.rdataclass
+import dns.rdatatype
+import dns.zone
+
+# Shared metrics live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from recon_common.metrics import REGISTRY
+
+AXFR_ATTEMPTS = REGISTRY.counter('recon_axfr_attempts_total', 'Zone transfer attempts, by outcome (allowed, refused)',
+                                 ('outcome',))
+
+
+class ZoneTransfers:
+    """Attempts AXFR once per (zone, nameserver) and serves the transferred data."""
+
+    def __init__(self, timeout=5.0, port=53):
+        """
+        Args:
+            timeout: Hard limit in seconds for each transfer attempt
+            port: DNS port of the nameservers (a local stub can use another one)
+        """
+        self.timeout = timeout
+        self.port = port
+        self.findings = []
+        self._zones = {}        # zone name -> dns.zone.Zone of the first successful transfer
+        self._attempted = set() # (zone, nameserver ip)
+        self._lock = threading.Lock()
+
+    def attempt(self, zone, nameservers):
+        """
+        Try AXFR of `zone` against each nameserver ({'name': ..., 'ip': ...})
+        not tried before. Returns True if the zone has been transferred.
+        """
+        zone = zone.rstrip('.').lower()
+        for ns in nameservers:
+            if not ns.get('ip'):
+                continue
+            key = (zone, ns['ip'])
+            with self._lock:
+                if key in self._attempted:
+                    continue
+                self._attempted.add(key)
+
+            finding = {'zone': zone, 'nameserver': ns['name'], 'ip': ns['ip'],
+                       'allowed': False, 'records': 0, 'error': None}
+            try:
+                data = dns.zone.from_xfr(
+                    dns.query.xfr(ns['ip'], zone, port=self.port,
+                                  timeout=self.timeout, lifetime=self.timeout)
+                )
+            except (dns.exception.DNSException, OSError, EOFError) as e:
+                finding['error'] = str(e) or type(e).__name__
+            else:
+                finding['allowed'] = True
+                finding['records'] = sum(len(rdataset) for _, rdataset in data.iterate_rdatasets())
+                print(f"[!] Zone transfer allowed: {zone} via {ns['name']} ({ns['ip']}), {finding['records']} records")
+                with self._lock:
+                    self._zones.setdefault(zone, data)
+
+            with self._lock:
+                self.findings.append(finding)
+            AXFR_ATTEMPTS.labels('allowed' if finding['allowed'] else 'refused').inc()
+
+        with self._lock:
+            return zone in self._zones
+
+    def _covering_zone(self, hostname):
+        """The transferred zone that is authoritative for hostname, if any."""
+        labels = hostname.rstrip('.').lower().split('.')
+        with self._lock:
+            zones = dict(self._zones)
+        for i in range(len(labels)):
+            zone_name = '.'.join(labels[i:])
+            data = zones.get(zone_name)
+            if data is None:
+                continue
+            # Names at or below a delegation point belong to the child zone
+            for j in range(i):
+                cut = data.get_node('.'.join(labels[j:i]))
+                if cut is not None and cut.get_rdataset(dns.rdataclass.IN, dns.rdatatype.NS):
+                    return None, None
+            relative = '.'.join(labels[:i]) or '@'
+            return zone_name, data.get_node(relative)
+        return None, None
+
+    def _addresses(self, node):
+        if node is None:
+            return []
+        rdataset = node.get_rdataset(dns.rdataclass.IN, dns.rdatatype.A)
+        return [rdata.address for rdata in rdataset] if rdataset else []
+
+    def _nameservers(self, zone_name, node, resolve_ip):
+        if node is None:
+            return []
+        rdataset = node.get_rdataset(dns.rdataclass.IN, dns.rdatatype.NS)
+        if not rdataset:
+            return []
+        with self._lock:
+            data = self._zones[zone_name]
+        nameservers = []
+        for rdata in rdataset:
+            ns_name = rdata.target.derelativize(data.origin).to_text().rstrip('.')
+            # Prefer the address (or glue) from the zone itself, fall back to a lookup
+            glue = []
+            if ns_name == zone_name or ns_name.endswith('.' + zone_name):
+                glue = self._addresses(data.get_node(ns_name[:-len(zone_name)].rstrip('.') or '@'))
+            nameservers.append({'name': ns_name, 'ip': glue[0] if glue else resolve_ip(ns_name)})
+        return nameservers
+
+    def nameservers_for(self, hostname, resolve_ip):
+        """
+        NS entries for hostname taken from a transferred zone, or None when
+        no transferred zone covers it and the host must be resolved normally.
+        `resolve_ip` resolves nameserver names missing from the zone data.
+        """
+        zone_name, node = self._covering_zone(hostname)
+        if zone_name is None:
+            return None
+        if hostname.rstrip('.').lower() != zone_name:
+            # Only a zone apex carries NS records inside its own zone
+            return []
+        return self._nameservers(zone_name, node, resolve_ip)
+
+    def extra_entries(self, seen, resolve_ip, domain=None):
+        """
+        Entries for transferred names with A records that are not in `seen`.
+        With `domain`, only zones at or under it are listed, so scans sharing
+        one ZoneTransfers (batch mode) do not get each other's hosts.
+        """
+        if domain is not None:
+            domain = domain.rstrip('.').lower()
+        with self._lock:
+            zones = list(self._zones.items())
+        for zone_name, data in zones:
+            if domain is not None and zone_name != domain and not zone_name.endswith('.' + domain):
+                continue
+            for name, node in data.nodes.items():
+                hostname = name.derelativize(data.origin).to_text().rstrip('.').lower()
+                if hostname in seen or hostname.startswith('*'):
+                    continue
+                ips = self._addresses(node)
+                if not ips or self._covering_zone(hostname)[0] != zone_name:
+                    continue
+                seen.add(hostname)
+                yield {
+                    "domain": hostname,
+                    "ip_addresses": ips,
+                    "nameservers": self.nameservers_for(hostname, resolve_ip) or []
+                }
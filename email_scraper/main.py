@@ -2,6 +2,7 @@
 """
 Script principal para extraer correos electrónicos de la web de la UPM
 """
+import argparse
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -12,6 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from src.scraper import EmailScraper
 from src.logger import setup_logger
+# src.scraper añade la raíz del repositorio al path
+from recon_common.profiling import StageProfiler
 
 
 def load_config(config_file: str = 'config/config.yaml') -> dict:
@@ -37,6 +40,16 @@ def load_config(config_file: str = 'config/config.yaml') -> dict:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Extrae correos electrónicos de la web de la UPM')
+    parser.add_argument(
+        '--profile',
+        help='Perfilar la ejecución por etapas (descarga, análisis, salida) y guardar en este directorio '
+             'las pilas en formato collapsed (flame graphs), los pstats de cProfile y las asignaciones '
+             'de memoria de cada etapa',
+        metavar='DIRECTORIO'
+    )
+    args = parser.parse_args()
+    
     logger = setup_logger()
     
     # Cargar configuración
@@ -54,9 +67,17 @@ def main():
     logger.info(f"URL objetivo: {url}")
     logger.info(f"Archivo de salida: {output_file}")
     
-    # Ejecutar scraping
-    scraper = EmailScraper(url)
-    scraper.run(str(output_file))
+    # Ejecutar scraping (perfilado por etapas con --profile)
+    profiler = StageProfiler(args.profile).start() if args.profile else None
+    try:
+        scraper = EmailScraper(url)
+        scraper.run(str(output_file))
+    finally:
+        if profiler is not None:
+            profiler.close()
+            logger.info(f"Perfil por etapas guardado en {profiler.output_dir}:")
+            for line in profiler.summary().splitlines():
+                logger.info(f"  {line}")
 
 
 if __name__ == '__main__':
@@ -3,11 +3,17 @@ Módulo para extraer correos electrónicos de páginas web
 """
 import re
 import csv
+import sys
+from pathlib import Path
 from typing import List, Dict, Optional
 import requests
 from bs4 import BeautifulSoup
 from .logger import setup_logger
 
+# El perfilado por etapas (recon_common/) está en la raíz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.profiling import stage
+
 
 logger = setup_logger()
 
@@ -159,14 +165,18 @@ class EmailScraper:
         """
         logger.info("=== Iniciando proceso de scraping ===")
         
-        if not self.fetch_page():
+        with stage('fetch'):
+            fetched = self.fetch_page()
+        if not fetched:
             logger.error("No se pudo descargar la página")
             return
         
-        contacts = self.extract_contacts()
+        with stage('analysis'):
+            contacts = self.extract_contacts()
         
         if contacts:
-            self.save_to_csv(contacts, output_file)
+            with stage('output'):
+                self.save_to_csv(contacts, output_file)
             logger.info("=== Proceso completado exitosamente ===")
         else:
             logger.warning("No se encontraron contactos")
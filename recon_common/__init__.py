@@ -0,0 +1,4 @@
+"""
+Recon Common - Code shared by the subdomain tools in this repository
+"""
+__version__ = "1.0.0"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and insertion time of a plain set[str] (the previous
+representation of discovered subdomains) vs. recon_common.DomainStore.
+
+Names are synthetic hosts under a few organisational subtrees
+(<host>.<dept>.<school>.upm.es) with some duplicates, as crt.sh returns
+them. Memory is measured with tracemalloc and includes the strings.
+
+Usage:
+    python recon_common/benchmarks/domain_store.py
+    python recon_common/benchmarks/domain_store.py --count 1000000
+"""
+
+import sys
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+# Make the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from recon_common.domain_store import DomainStore
+
+HOST_LABELS = ['www', 'mail', 'vpn', 'moodle', 'intranet', 'portal', 'api', 'dev', 'ftp', 'static']
+
+
+def make_lines(count, seed=1):
+    """Lines as a scraper would read them: fresh strings, ~10% duplicates."""
+    rng = random.Random(seed)
+    schools = [f"school{i}" for i in range(20)]
+    depts = [f"dept{i}" for i in range(30)]
+    lines = []
+    for i in range(count):
+        if i and rng.random() < 0.1:
+            lines.append(lines[rng.randrange(len(lines))])
+            continue
+        host = rng.choice(HOST_LABELS) if rng.random() < 0.5 else f"host{rng.randrange(count)}"
+        lines.append(f"{host}.{rng.choice(depts)}.{rng.choice(schools)}.upm.es")
+    return [line.encode() for line in lines]
+
+
+def build_set(lines):
+    return {line.decode().strip().lower() for line in lines}
+
+
+def build_store(lines):
+    return DomainStore(line.decode() for line in lines)
+
+
+def measure(build, lines):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    names = build(lines)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return names, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of set[str] vs. DomainStore')
+    parser.add_argument('--count', type=int, default=500_000, help='Input lines (default: 500000)')
+    args = parser.parse_args()
+
+    # Keep the input as bytes so the decoded names are only held by the structure under test
+    lines = make_lines(args.count)
+    print(f"{args.count:,} input lines\n")
+    print(f"{'storage':<12} {'names':>9} {'total MB':>9} {'bytes/name':>11} {'build s':>8}")
+
+    for storage, build in (('set', build_set), ('DomainStore', build_store)):
+        names, size, elapsed = measure(build, lines)
+        print(f"{storage:<12} {len(names):>9,} {size / 1e6:>9.1f} {size / len(names):>11.1f} {elapsed:>8.2f}")
+        del names
+
+    store = build_store(lines)
+    start = time.perf_counter()
+    under = sum(1 for _ in store.under('school3.upm.es'))
+    print(f"\nunder('school3.upm.es'): {under:,} names in {time.perf_counter() - start:.3f} s")
+    names = build_set(lines)
+    start = time.perf_counter()
+    scan = sum(1 for name in names if name.endswith('.school3.upm.es'))
+    print(f"set scan with endswith:   {scan:,} names in {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
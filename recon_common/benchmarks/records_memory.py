@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by verification results stored as plain dicts
+(the previous representation) vs. the slotted records in recon_common.records.
+
+Measured with tracemalloc over N synthetic results of each shape:
+  checker   -> subdomain_checker's per-(subdomain, protocol) check
+  discovery -> subdomain_discovery's result with its nested http_info
+
+The subdomain/url/title strings are built once up front and shared by both
+representations, so only the containers themselves are compared.
+
+Usage:
+    python recon_common/benchmarks/records_memory.py
+    python recon_common/benchmarks/records_memory.py --count 200000
+"""
+
+import sys
+import argparse
+import gc
+import time
+import tracemalloc
+from pathlib import Path
+
+# Make the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from recon_common.records import CheckResult, HttpInfo, VerificationResult
+
+
+def make_strings(count):
+    subdomains = [f"host{i}.upm.es" for i in range(count)]
+    urls = [f"https://{subdomain}" for subdomain in subdomains]
+    return subdomains, urls
+
+
+def checker_dicts(subdomains, urls):
+    return [
+        {
+            'subdomain': subdomain,
+            'url': url,
+            'protocol': 'https',
+            'is_live': i % 3 != 0,
+            'status_code': 200 if i % 3 else None,
+            'ip': None,
+            'error': None
+        }
+        for i, (subdomain, url) in enumerate(zip(subdomains, urls))
+    ]
+
+
+def checker_records(subdomains, urls):
+    return [
+        CheckResult(subdomain=subdomain, url=url, protocol='https',
+                    is_live=i % 3 != 0, status_code=200 if i % 3 else None)
+        for i, (subdomain, url) in enumerate(zip(subdomains, urls))
+    ]
+
+
+def discovery_dicts(subdomains, urls):
+    return [
+        {
+            'subdomain': subdomain,
+            'dns_resolves': True,
+            'is_live': i % 3 != 0,
+            'http_info': {
+                'accessible': i % 3 != 0,
+                'status_code': 200 if i % 3 else None,
+                'protocol': 'https',
+                'redirect_url': None,
+                'title': None,
+                'error': None
+            }
+        }
+        for i, subdomain in enumerate(subdomains)
+    ]
+
+
+def discovery_records(subdomains, urls):
+    return [
+        VerificationResult(
+            subdomain=subdomain, dns_resolves=True, is_live=i % 3 != 0,
+            http_info=HttpInfo(accessible=i % 3 != 0, status_code=200 if i % 3 else None,
+                               protocol='https')
+        )
+        for i, subdomain in enumerate(subdomains)
+    ]
+
+
+def measure(build, subdomains, urls):
+    """Return (bytes held by the built results, seconds to build them)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = build(subdomains, urls)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of dict vs. slotted result records')
+    parser.add_argument('--count', type=int, default=1_000_000,
+                        help='Synthetic results per shape (default: 1000000)')
+    args = parser.parse_args()
+
+    subdomains, urls = make_strings(args.count)
+    print(f"{args.count:,} synthetic results per shape\n")
+    print(f"{'shape':<10} {'storage':<8} {'total MB':>10} {'bytes/result':>13} {'build s':>8}")
+
+    for shape, dict_build, record_build in (('checker', checker_dicts, checker_records),
+                                            ('discovery', discovery_dicts, discovery_records)):
+        sizes = {}
+        for storage, build in (('dict', dict_build), ('record', record_build)):
+            size, elapsed = measure(build, subdomains, urls)
+            sizes[storage] = size
+            print(f"{shape:<10} {storage:<8} {size / 1e6:>10.1f} {size / args.count:>13.1f} {elapsed:>8.2f}")
+        print(f"{shape:<10} {'saving':<8} {(1 - sizes['record'] / sizes['dict']) * 100:>9.1f}%\n")
+
+
+if __name__ == '__main__':
+    main()
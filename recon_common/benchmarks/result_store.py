@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: "all 403s seen under etsit.upm.es in the last month" over a
+history of scans, answered from timestamped *_results.json files (the
+previous storage: every file is parsed) vs. recon_common.ResultStore.
+
+Runs are synthetic subdomain_discovery scans spread over the last 90
+days, one every few days, each verifying the same hosts under a few
+schools of upm.es with a mix of status codes. Insertion goes through the
+batched add_result() path used while scanning.
+
+Usage:
+    python recon_common/benchmarks/result_store.py
+    python recon_common/benchmarks/result_store.py --runs 60 --hosts 50000
+"""
+
+import sys
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Make the repository root importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from recon_common.records import HttpInfo, VerificationResult, to_serializable
+from recon_common.result_store import ResultStore, TIME_FORMAT, FILE_TIMESTAMP_FORMAT
+
+SCHOOLS = ['etsit', 'etsiinf', 'etsii', 'etsiaab', 'etsam', 'euitt', 'fi', 'inef']
+STATUS_CODES = [200, 200, 200, 403, 401, 301, 302, 404, 500]
+
+
+def make_hosts(count, seed=1):
+    rng = random.Random(seed)
+    return [f"host{i}.{rng.choice(['www', 'lab', 'dep'])}{i % 40}.{rng.choice(SCHOOLS)}.upm.es"
+            for i in range(count)]
+
+
+def make_results(hosts, rng):
+    results = []
+    for host in hosts:
+        if rng.random() < 0.3:
+            results.append(VerificationResult(host, rng.random() < 0.5, False, HttpInfo(error='HTTPS timeout')))
+            continue
+        code = rng.choice(STATUS_CODES)
+        results.append(VerificationResult(host, True, code in (200, 403, 401), HttpInfo(
+            accessible=code in (200, 403, 401), status_code=code, protocol='https', title=f"Title {code}"
+        )))
+    return results
+
+
+def query_files(output_dir, suffix, status_code, since):
+    """The previous way: parse every results file and filter."""
+    matches = []
+    for path in sorted(output_dir.glob('*_results.json')):
+        with open(path) as f:
+            data = json.load(f)
+        if datetime.strptime(data['timestamp'], FILE_TIMESTAMP_FORMAT) < since:
+            continue
+        for result in data['results']:
+            info = result.get('http_info') or {}
+            name = result['subdomain']
+            if info.get('status_code') == status_code and (name == suffix or name.endswith('.' + suffix)):
+                matches.append((name, data['timestamp']))
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-run queries: results files vs. ResultStore')
+    parser.add_argument('--runs', type=int, default=30, help='Scans in the history (default: 30)')
+    parser.add_argument('--hosts', type=int, default=20_000, help='Hosts verified per scan (default: 20000)')
+    args = parser.parse_args()
+
+    hosts = make_hosts(args.hosts)
+    rng = random.Random(2)
+    now = datetime.now()
+    # Timestamps are stored with one-second resolution
+    since = (now - timedelta(days=30)).replace(microsecond=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp) / 'output'
+        output_dir.mkdir()
+        store = ResultStore(Path(tmp) / 'results.db')
+
+        insert_time = 0.0
+        for run in range(args.runs):
+            when = now - timedelta(days=90 * (args.runs - run) / args.runs)
+            results = make_results(hosts, rng)
+            with open(output_dir / f"upm.es_{when.strftime(FILE_TIMESTAMP_FORMAT)}_results.json", 'w') as f:
+                json.dump({'domain': 'upm.es', 'timestamp': when.strftime(FILE_TIMESTAMP_FORMAT),
+                           'total_discovered': len(hosts), 'results': results}, f, default=to_serializable)
+
+            start = time.perf_counter()
+            run_id = store.start_run('subdomain_discovery', 'upm.es', when.strftime(TIME_FORMAT))
+            for result in results:
+                store.add_result(run_id, result, ['10.0.0.1'] if result['dns_resolves'] else [],
+                                 probed_at=when.strftime(TIME_FORMAT))
+            store.finish_run(run_id, len(hosts))
+            insert_time += time.perf_counter() - start
+
+        probes = args.runs * args.hosts
+        print(f"{args.runs} runs x {args.hosts:,} hosts = {probes:,} probes\n")
+        print(f"insert (batched add_result): {insert_time:.2f} s ({probes / insert_time:,.0f} probes/s)")
+        print(f"database size: {Path(store.path).stat().st_size / 1e6:.1f} MB, "
+              f"results files: {sum(p.stat().st_size for p in output_dir.iterdir()) / 1e6:.1f} MB\n")
+
+        start = time.perf_counter()
+        from_files = query_files(output_dir, 'etsit.upm.es', 403, since)
+        files_time = time.perf_counter() - start
+
+        # First query warms the page cache; report the best of a few
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            from_store = store.query_probes(suffix='etsit.upm.es', status_code=403, since=since)
+            timings.append(time.perf_counter() - start)
+
+        assert len(from_files) == len(from_store), (len(from_files), len(from_store))
+        print("403s under etsit.upm.es in the last 30 days")
+        print(f"  parse every *_results.json: {len(from_files):>7,} rows in {files_time * 1000:>9.1f} ms")
+        print(f"  ResultStore.query_probes:   {len(from_store):>7,} rows in {min(timings) * 1000:>9.1f} ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: write/read throughput and file size of the result encodings in
+recon_common.serialization, on the committed fixtures:
+
+    subdomain_checker/results_json.json      {url: [ip]} -> {"url", "ips"} records
+    dns_lab_tool/upm.es_full_results.json    {"results": [...]} entries
+
+The fixtures are small, so their records are repeated --repeat times.
+"json.dump" is the previous writer (json.dump(indent=...) of the whole
+document, json.load to read it back); every other row streams through
+ResultWriter and iter_records. zstd rows need the zstandard package.
+
+Usage:
+    python recon_common/benchmarks/serialization.py
+    python recon_common/benchmarks/serialization.py --repeat 1000
+"""
+
+import sys
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+# Make the repository root importable
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from recon_common.serialization import ResultWriter, iter_records
+
+SPECS = ['json', 'jsonl', 'jsonl.gz', 'jsonl.zst', 'bin', 'bin.gz', 'bin.zst']
+
+
+def load_fixtures():
+    with open(ROOT / 'subdomain_checker' / 'results_json.json') as f:
+        checker = [{'url': url, 'ips': ips} for url, ips in json.load(f).items()]
+    with open(ROOT / 'dns_lab_tool' / 'upm.es_full_results.json') as f:
+        dns = json.load(f)['results']
+    return {'results_json.json': (checker, 4), 'upm.es_full_results.json': (dns, 4)}
+
+
+def timed(function):
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+
+def bench_legacy(records, indent, path):
+    def write():
+        with open(path, 'w') as f:
+            json.dump({'results': records}, f, indent=indent)
+
+    def read():
+        with open(path) as f:
+            return len(json.load(f)['results'])
+
+    _, write_time = timed(write)
+    count, read_time = timed(read)
+    return write_time, read_time, count
+
+
+def bench_spec(records, indent, path, spec):
+    def write():
+        with ResultWriter(path, spec, indent=indent) as writer:
+            writer.write_many(records)
+
+    def read():
+        return sum(1 for _ in iter_records(path))
+
+    _, write_time = timed(write)
+    count, read_time = timed(read)
+    return write_time, read_time, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Result encodings: throughput and size')
+    parser.add_argument('--repeat', type=int, default=200, help='Times each fixture is repeated (default: 200)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (records, indent) in load_fixtures().items():
+            records = records * args.repeat
+            print(f"{name}: {len(records):,} records\n")
+            print(f"{'format':<10} {'size MB':>8} {'vs json':>8} {'write s':>8} {'rec/s':>11} "
+                  f"{'read s':>7} {'rec/s':>11}")
+
+            legacy = Path(tmp) / 'legacy.json'
+            write_time, read_time, count = bench_legacy(records, indent, legacy)
+            baseline = legacy.stat().st_size
+            rows = [('json.dump', baseline, write_time, read_time, count)]
+
+            for spec in SPECS:
+                path = Path(tmp) / f"out.{spec}"
+                try:
+                    write_time, read_time, count = bench_spec(records, indent, path, spec)
+                except ImportError as e:
+                    print(f"{spec:<10} skipped: {e}")
+                    continue
+                rows.append((spec, path.stat().st_size, write_time, read_time, count))
+
+            for spec, size, write_time, read_time, count in rows:
+                assert count == len(records), (spec, count)
+                print(f"{spec:<10} {size / 1e6:>8.2f} {baseline / size:>7.1f}x {write_time:>8.2f} "
+                      f"{len(records) / write_time:>11,.0f} {read_time:>7.2f} {len(records) / read_time:>11,.0f}")
+            print()
+
+
+if __name__ == '__main__':
+    main()
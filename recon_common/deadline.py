@@ -0,0 +1,192 @@
+"""
+Global scan deadline with budget-aware degradation.
+
+A scan given a deadline ("finish within 20 minutes") spreads the time it
+has left across the candidates still queued. Before each candidate is
+probed, ScanDeadline.plan() compares that per-candidate budget with what a
+probe costs at the configured timeouts and picks how to probe it:
+
+    full       configured timeouts, every protocol, title extraction
+    reduced    the same probe with timeouts shrunk to fit the budget
+    essential  primary protocol only (https), no title extraction,
+               timeouts shrunk as needed
+    (none)     the deadline is reached: no new probes are started
+
+Probes already running finish normally, so the results of a cut-short
+scan are partial but each one is complete; coverage() reports how many
+candidates were verified and how they were probed.
+"""
+import re
+import time
+from typing import Callable, Dict, Optional
+
+FULL = 'full'
+REDUCED = 'reduced'
+ESSENTIAL = 'essential'
+LEVELS = (FULL, REDUCED, ESSENTIAL)
+
+# Shortest timeout a shrunk request gets; the deadline counts as reached
+# when less than this is left
+MIN_TIMEOUT = 0.5
+
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*$')
+_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_duration(value) -> float:
+    """
+    Seconds in a duration: a number of seconds or a string such as
+    '90', '90s', '20m' or '1.5h'.
+
+    Raises:
+        ValueError: Not a positive duration
+    """
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = _DURATION.match(str(value).lower())
+        if match is None:
+            raise ValueError(f"Invalid duration {value!r} (e.g. 1200, 90s, 20m, 1.5h)")
+        seconds = float(match.group(1)) * _UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"Invalid duration {value!r}: must be positive")
+    return seconds
+
+
+class ProbePlan:
+    """How one candidate is probed."""
+
+    __slots__ = ('level', 'scale')
+
+    def __init__(self, level: str = FULL, scale: float = 1.0):
+        self.level = level
+        self.scale = scale
+
+    def timeout(self, base: float) -> float:
+        """A configured timeout, shrunk to this plan's budget."""
+        if self.scale >= 1:
+            return base
+        return max(MIN_TIMEOUT, base * self.scale)
+
+    @property
+    def secondary(self) -> bool:
+        """Whether protocols after the first one are tried."""
+        return self.level != ESSENTIAL
+
+    @property
+    def title(self) -> bool:
+        """Whether the page title is extracted."""
+        return self.level != ESSENTIAL
+
+    def __repr__(self) -> str:
+        return f"ProbePlan({self.level!r}, {self.scale:.2f})"
+
+
+FULL_PLAN = ProbePlan()
+
+
+class ScanDeadline:
+    """Time budget of one scan, spread across the candidates still queued."""
+
+    def __init__(self, seconds: float, full_cost: float, essential_cost: float, workers: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Start the clock.
+
+        Args:
+            seconds: Time the whole scan may take
+            full_cost: Worst-case seconds of one full probe at the
+                       configured timeouts (e.g. DNS + HTTPS + HTTP)
+            essential_cost: Worst-case seconds of an essential probe
+                            (e.g. DNS + HTTPS)
+            workers: Candidates probed at the same time
+            clock: Monotonic clock (for tests and simulations)
+        """
+        self.seconds = seconds
+        self.full_cost = full_cost
+        self.essential_cost = min(essential_cost, full_cost)
+        self.workers = max(1, workers)
+        self.clock = clock
+        self.started = clock()
+        self.reached = False
+        self.counts = dict.fromkeys(LEVELS, 0)
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def remaining(self) -> float:
+        return self.seconds - self.elapsed()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() < MIN_TIMEOUT
+
+    def budget(self, pending: Optional[int] = None) -> float:
+        """
+        Seconds the next probe may take.
+
+        Args:
+            pending: Candidates still queued, this one included (None when
+                     unknown, e.g. a stream: the next probe may then take
+                     whatever time is left)
+        """
+        remaining = self.remaining()
+        if pending is None:
+            return remaining
+        return min(remaining, remaining * self.workers / max(1, pending))
+
+    def plan(self, pending: Optional[int] = None) -> Optional[ProbePlan]:
+        """
+        Decide how the next candidate is probed.
+
+        Args:
+            pending: Candidates still queued, this one included (None when
+                     unknown)
+
+        Returns:
+            The ProbePlan, or None once the deadline is reached (the
+            candidate and the rest of the queue are left unverified)
+        """
+        if self.expired:
+            self.reached = True
+            return None
+        budget = self.budget(pending)
+        if budget >= self.full_cost:
+            plan = FULL_PLAN
+        elif budget >= self.essential_cost:
+            plan = ProbePlan(REDUCED, budget / self.full_cost)
+        else:
+            plan = ProbePlan(ESSENTIAL, budget / self.essential_cost)
+        self.counts[plan.level] += 1
+        return plan
+
+    @property
+    def planned(self) -> int:
+        """Candidates a plan was handed out for."""
+        return sum(self.counts.values())
+
+    def coverage(self, candidates: Optional[int] = None) -> Dict:
+        """
+        What the scan managed within its deadline.
+
+        Args:
+            candidates: Candidates the scan had (None when unknown)
+
+        Returns:
+            Dictionary with the deadline, elapsed time, verified and
+            unverified candidates, coverage percentage and the number of
+            candidates probed at each level
+        """
+        verified = self.planned
+        coverage = {
+            'deadline_seconds': self.seconds,
+            'elapsed_seconds': round(self.elapsed(), 1),
+            'deadline_reached': self.reached,
+            'candidates': candidates,
+            'verified': verified,
+            'unverified': None if candidates is None else max(0, candidates - verified),
+            'coverage_percentage': (verified / candidates * 100 if candidates else 100.0)
+                                   if candidates is not None else None,
+            'probes': dict(self.counts)
+        }
+        return coverage
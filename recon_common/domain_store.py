@@ -0,0 +1,206 @@
+"""
+Domain name store shared by subdomain_checker and subdomain_discovery.
+
+Names are kept as a trie of reversed labels (es -> upm -> etsit -> www),
+so a shared suffix such as `.etsit.upm.es` is stored once instead of in
+every name, and each label string is interned. Besides set-like
+insertion, deduplication and membership, the trie answers "all names
+under X" directly and iterates in hierarchical order (a parent before its
+children, siblings sorted), which keeps every zone's hosts together.
+"""
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+# Key marking a name that ends at an inner node (a leaf is stored as None)
+_END = None
+_MISSING = object()
+
+
+class DomainStore:
+    """Set of domain names stored as a reversed-label trie."""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, names: Optional[Iterable[str]] = None):
+        """
+        Args:
+            names: Optional initial names (duplicates are dropped)
+        """
+        self._root = {}
+        self._size = 0
+        if names is not None:
+            self.update(names)
+
+    @staticmethod
+    def _labels(name: str) -> List[str]:
+        """Interned labels of name from the TLD down; [] for an empty name."""
+        name = name.strip().rstrip('.').lower()
+        if not name:
+            return []
+        return [sys.intern(label) for label in reversed(name.split('.'))]
+
+    def _find(self, labels: List[str]):
+        """The node for labels (None for a leaf), or _MISSING."""
+        node = self._root
+        for label in labels:
+            if node is None:
+                return _MISSING
+            node = node.get(label, _MISSING)
+            if node is _MISSING:
+                return _MISSING
+        return node
+
+    def add(self, name: str) -> bool:
+        """
+        Insert a name (case-insensitive, trailing dot ignored).
+
+        Returns:
+            True if the name was not in the store yet
+        """
+        labels = self._labels(name)
+        if not labels:
+            return False
+
+        node = self._root
+        for label in labels[:-1]:
+            child = node.get(label, _MISSING)
+            if child is _MISSING:
+                child = node[label] = {}
+            elif child is None:
+                # A stored name gains its first descendant
+                child = node[label] = {_END: None}
+            node = child
+
+        last = labels[-1]
+        child = node.get(last, _MISSING)
+        if child is _MISSING:
+            node[last] = None
+        elif child is None or _END in child:
+            return False
+        else:
+            child[_END] = None
+        self._size += 1
+        return True
+
+    def update(self, names: Iterable[str]) -> int:
+        """
+        Insert several names.
+
+        Returns:
+            Number of names that were new
+        """
+        add = self.add
+        return sum(1 for name in names if add(name))
+
+    def discard(self, name: str) -> bool:
+        """
+        Remove a name if present, pruning branches left empty.
+
+        Returns:
+            True if the name was removed
+        """
+        labels = self._labels(name)
+        if not labels:
+            return False
+
+        path = []
+        node = self._root
+        for label in labels:
+            if node is None or label not in node:
+                return False
+            path.append((node, label))
+            node = node[label]
+
+        parent, label = path.pop()
+        if node is None:
+            del parent[label]
+        elif _END in node:
+            del node[_END]
+        else:
+            return False
+        self._size -= 1
+
+        # Walk back up: drop empty inner nodes, turn terminal-only nodes back into leaves
+        while path:
+            child = parent
+            parent, label = path.pop()
+            if not child:
+                del parent[label]
+            elif len(child) == 1 and _END in child:
+                parent[label] = None
+            else:
+                break
+        return True
+
+    def __contains__(self, name: str) -> bool:
+        labels = self._labels(name)
+        node = self._find(labels) if labels else _MISSING
+        return node is None or (node is not _MISSING and _END in node)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[str]:
+        return self._iter_node(self._root, '')
+
+    def __repr__(self) -> str:
+        return f"DomainStore({self._size} names)"
+
+    def _iter_node(self, node, name: str, include_self: bool = True) -> Iterator[str]:
+        """Names at and below node, parent first and siblings in label order."""
+        stack = [(node, name, include_self)]
+        while stack:
+            node, name, include = stack.pop()
+            if node is None:
+                if include:
+                    yield name
+                continue
+            if include and _END in node:
+                yield name
+            labels = sorted(label for label in node if label is not _END)
+            for label in reversed(labels):
+                stack.append((node[label], f"{label}.{name}" if name else label, True))
+
+    def under(self, suffix: str, include_self: bool = True) -> Iterator[str]:
+        """
+        Iterate over the names at or below suffix (e.g. every *.etsit.upm.es).
+
+        Args:
+            suffix: Parent name
+            include_self: Also yield suffix itself when it is stored
+        """
+        labels = self._labels(suffix)
+        node = self._find(labels) if labels else self._root
+        if node is _MISSING:
+            return iter(())
+        return self._iter_node(node, '.'.join(reversed(labels)), include_self)
+
+    def count_under(self, suffix: str, include_self: bool = True) -> int:
+        """Number of names at or below suffix."""
+        return sum(1 for _ in self.under(suffix, include_self))
+
+    def children(self, suffix: str = '') -> List[str]:
+        """
+        The names one label below suffix that have stored names at or under
+        them, in label order. Each one is a subtree that can be scheduled
+        as a unit (e.g. `under(child)` per worker).
+        """
+        labels = self._labels(suffix)
+        node = self._find(labels) if labels else self._root
+        if node is None or node is _MISSING:
+            return []
+        name = '.'.join(reversed(labels))
+        return [f"{label}.{name}" if name else label
+                for label in sorted(label for label in node if label is not _END)]
+
+    def copy(self) -> 'DomainStore':
+        """Independent copy (the interned labels are shared)."""
+        def copy_node(node):
+            if node is None:
+                return None
+            return {label: copy_node(child) for label, child in node.items()}
+
+        store = DomainStore()
+        store._root = copy_node(self._root)
+        store._size = self._size
+        return store
@@ -0,0 +1,165 @@
+"""
+Spill-to-disk deduplication and sorting of candidate domain names.
+
+Candidates are collected in a DomainStore while they fit in the memory
+budget. Above it, the store is written out as a sorted run and emptied;
+at the end the runs are k-way merged (dropping duplicates) into a single
+file that is read back lazily. Either way the names come out deduplicated
+and in the same order (DomainStore's reversed-label order), so callers do
+not need to know which path was taken.
+"""
+import heapq
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional, Union
+
+from recon_common.domain_store import DomainStore
+
+# Rough bytes held per unique name in a DomainStore, on top of its characters
+ENTRY_OVERHEAD = 100
+# Runs merged at once; more runs are merged in several passes
+MAX_FAN_IN = 128
+
+
+def sort_key(name: str):
+    """Order of DomainStore iteration: by labels from the TLD down."""
+    return name.split('.')[::-1]
+
+
+class SpilledDomains:
+    """Deduplicated names read lazily from the merged file on disk."""
+
+    def __init__(self, path: str, count: int, workdir: tempfile.TemporaryDirectory):
+        self.path = path
+        self._count = count
+        self._workdir = workdir  # removed with this object (or by close())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    def __repr__(self) -> str:
+        return f"SpilledDomains({self._count} names in {self.path})"
+
+    def copy(self) -> 'SpilledDomains':
+        """The merged file is never modified, so copies can share it."""
+        return self
+
+    def close(self):
+        """Delete the merged file now instead of when the object is collected."""
+        self._workdir.cleanup()
+
+
+class DomainCollector:
+    """Collects names in memory and spills sorted runs to disk above a budget."""
+
+    def __init__(self, memory_budget_mb: Optional[float] = 256, tmp_dir: Optional[str] = None):
+        """
+        Args:
+            memory_budget_mb: Approximate memory the in-memory names may use
+                              before a run is spilled (None disables spilling)
+            tmp_dir: Directory for the runs (system temp directory by default)
+        """
+        self.memory_budget = None if memory_budget_mb is None else memory_budget_mb * 1024 * 1024
+        self.tmp_dir = tmp_dir
+        self._store = DomainStore()
+        self._used = 0
+        self._workdir = None
+        self._runs = []
+
+    @property
+    def spilled(self) -> bool:
+        return bool(self._runs)
+
+    def add(self, name: str):
+        if self._store.add(name):
+            self._used += len(name) + ENTRY_OVERHEAD
+            if self.memory_budget is not None and self._used > self.memory_budget:
+                self._spill()
+
+    def update(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def _spill(self):
+        """Write the in-memory names as one sorted run and start over."""
+        if self._workdir is None:
+            self._workdir = tempfile.TemporaryDirectory(prefix='domains-', dir=self.tmp_dir)
+        path = os.path.join(self._workdir.name, f"run{len(self._runs):05d}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for name in self._store:
+                f.write(name + '\n')
+        self._runs.append(path)
+        self._store = DomainStore()
+        self._used = 0
+
+    def finish(self) -> Union[DomainStore, SpilledDomains]:
+        """
+        Returns:
+            The DomainStore when everything fit in the budget, otherwise
+            SpilledDomains backed by the merge of all runs
+        """
+        if not self._runs:
+            return self._store
+        if self._store:
+            self._spill()
+
+        runs = self._runs
+        self._runs = []
+        passes = 0
+        while len(runs) > MAX_FAN_IN:
+            passes += 1
+            merged_runs = []
+            for i in range(0, len(runs), MAX_FAN_IN):
+                path = os.path.join(self._workdir.name, f"pass{passes}-{i // MAX_FAN_IN:05d}.txt")
+                _merge_runs(runs[i:i + MAX_FAN_IN], path)
+                merged_runs.append(path)
+            runs = merged_runs
+
+        merged = os.path.join(self._workdir.name, 'merged.txt')
+        count = _merge_runs(runs, merged)
+        return SpilledDomains(merged, count, self._workdir)
+
+
+def _merge_runs(paths, out_path: str) -> int:
+    """K-way merge sorted run files into out_path, dropping duplicates; removes the runs."""
+    files = [open(path, 'r', encoding='utf-8') for path in paths]
+    count = 0
+    try:
+        with open(out_path, 'w', encoding='utf-8') as out:
+            previous = None
+            runs = [(line.rstrip('\n') for line in f) for f in files]
+            for name in heapq.merge(*runs, key=sort_key):
+                if name != previous:
+                    out.write(name + '\n')
+                    count += 1
+                    previous = name
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.remove(path)
+    return count
+
+
+def collect_domains(names: Iterable[str], memory_budget_mb: Optional[float] = 256,
+                    tmp_dir: Optional[str] = None) -> Union[DomainStore, SpilledDomains]:
+    """
+    Deduplicate and order names, spilling to disk above memory_budget_mb.
+
+    Args:
+        names: Candidate names (e.g. lines of a file or of stdin)
+        memory_budget_mb: See DomainCollector
+        tmp_dir: See DomainCollector
+
+    Returns:
+        DomainStore or SpilledDomains; both support len() and iterate in
+        the same order
+    """
+    collector = DomainCollector(memory_budget_mb, tmp_dir)
+    collector.update(names)
+    return collector.finish()
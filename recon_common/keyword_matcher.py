@@ -0,0 +1,88 @@
+"""
+Keyword Matcher Module
+Multi-pattern keyword matching (Aho-Corasick) for subdomain names.
+"""
+
+from typing import List
+
+
+class KeywordMatcher:
+    """Finds every configured keyword in a string in a single pass."""
+
+    def __init__(self, keywords: List[str], label_boundary: bool = False):
+        """
+        Compile the keywords into an Aho-Corasick automaton.
+
+        Args:
+            keywords: Keywords to look for (matched case-insensitively)
+            label_boundary: Only match keywords that span whole DNS labels
+                            (e.g. "vpn" matches vpn.upm.es but not vpnlab.upm.es)
+        """
+        self.keywords = [kw.lower() for kw in keywords]
+        self.label_boundary = label_boundary
+
+        # Trie: per-node transitions, failure links and (keyword index, length) outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].append((index, len(keyword)))
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        """Breadth-first pass that links each node to its longest proper suffix."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # Inherit the outputs reachable through the failure link
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text: str) -> List[str]:
+        """
+        Find the keywords contained in text.
+
+        Args:
+            text: String to search (e.g. a subdomain)
+
+        Returns:
+            Matching keywords, each once, in configuration order
+        """
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for index, length in out[node]:
+                if self.label_boundary:
+                    start = position - length + 1
+                    end = position + 1
+                    if (start > 0 and text[start - 1] != '.') or (end < len(text) and text[end] != '.'):
+                        continue
+                found.add(index)
+
+        return [self.keywords[index] for index in sorted(found)]
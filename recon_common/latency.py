@@ -0,0 +1,403 @@
+"""
+Per-phase latency tracking and adaptive timeouts for the verifiers.
+
+A probe goes through up to four phases, each with its own timeout:
+
+    dns       name resolution (the verifier's own lookup)
+    connect   TCP connection
+    tls       TLS handshake (HTTPS only)
+    ttfb      request sent -> response headers (the read timeout)
+
+timed_session() returns a requests.Session whose connections time the
+connect, tls and ttfb phases of every request made inside a
+ProbeTiming (see probe_timing()), and apply a separate TLS handshake
+timeout; urllib3 otherwise uses the connect timeout for the handshake.
+ProbeTiming.milliseconds() is what the verifiers store as the `timings`
+of each result, and PhaseTimings aggregates those into per-phase
+histograms.
+
+AdaptiveTimeouts keeps a LatencyHistogram per phase and, once a phase
+has min_samples observations, sets its timeout to a running percentile
+times a multiplier, between a floor and a ceiling: on a network where
+hosts answer in 200 ms, silent ones are given up on after a second or
+so instead of the configured timeout. Only answers are observed;
+requests cut off by a timeout are counted separately (counting them at
+the timeout would feed every cut-off back into a longer timeout). The
+floor is what keeps slow but live applications in: raise it if the
+report shows a phase cutting off hosts that should have answered.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb')
+
+# Bucket upper bounds: 1 ms to ~130 s, 4 buckets per doubling (~19% wide)
+BUCKET_BOUNDS = tuple(0.001 * 2 ** (i / 4) for i in range(69))
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: O(1) updates, percentiles within one bucket."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        index = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.add_counts(other.counts, other.total, other.max)
+
+    def add_counts(self, counts: Iterable[int], total: float, maximum: float):
+        """Add observations already counted per bucket (e.g. binned with NumPy)."""
+        with self._lock:
+            for index, count in enumerate(counts):
+                self.counts[index] += count
+                self.count += count
+            self.total += total
+            self.max = max(self.max, maximum)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile, at most the maximum (None if empty)."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = max(1, math.ceil(self.count * q / 100))
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self, percentiles: Iterable[float] = (50, 95, 99)) -> Dict:
+        """Count, total, mean, max and percentiles, in milliseconds."""
+        ms = lambda seconds: None if seconds is None else round(seconds * 1000, 1)
+        return {
+            'count': self.count,
+            'total_ms': ms(self.total),
+            'mean_ms': ms(self.mean),
+            **{f"p{q:g}_ms": ms(self.percentile(q)) for q in percentiles},
+            'max_ms': ms(self.max if self.count else None)
+        }
+
+    def buckets(self) -> List[List[float]]:
+        """Non-empty buckets as [upper bound in ms, count] (the last bound is the maximum)."""
+        return [[round((BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max) * 1000, 1), count]
+                for index, count in enumerate(self.counts) if count]
+
+
+class ProbeTiming:
+    """Phase durations of one probe's requests and the phase in progress."""
+
+    __slots__ = ('samples', 'phase', 'tls_timeout', '_started')
+
+    def __init__(self, tls_timeout: Optional[float] = None):
+        self.samples = []
+        self.phase = None
+        self.tls_timeout = tls_timeout
+        self._started = 0.0
+
+    def start(self, phase: str):
+        self.phase = phase
+        self._started = time.perf_counter()
+
+    def stop(self) -> float:
+        elapsed = time.perf_counter() - self._started
+        self.samples.append((self.phase, elapsed))
+        self.phase = None
+        return elapsed
+
+    def add(self, phase: str, seconds: float):
+        self.samples.append((phase, seconds))
+
+    @property
+    def phases(self) -> Dict[str, float]:
+        """Seconds spent in each phase, summed over the probe's requests."""
+        totals = {}
+        for phase, seconds in self.samples:
+            totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals
+
+    def milliseconds(self) -> Optional[Dict[str, float]]:
+        """Per-phase milliseconds in PHASES order (None if nothing was timed)."""
+        totals = self.phases
+        if not totals:
+            return None
+        return {phase: round(totals[phase] * 1000, 1) for phase in PHASES if phase in totals}
+
+
+_local = threading.local()
+
+
+def current_timing() -> Optional[ProbeTiming]:
+    """The ProbeTiming of the current thread's probe, if any."""
+    return getattr(_local, 'timing', None)
+
+
+def record_phase(phase: str, seconds: float):
+    """Add a phase timed outside the HTTP connections (e.g. DNS) to the current probe."""
+    timing = current_timing()
+    if timing is not None:
+        timing.add(phase, seconds)
+
+
+@contextmanager
+def probe_timing(tls_timeout: Optional[float] = None) -> Iterator[ProbeTiming]:
+    """
+    Time the requests this thread makes inside the block. Blocks nest: the
+    samples of an inner block (e.g. one request) are added to the outer
+    one (the whole probe) when it exits.
+    """
+    timing = ProbeTiming(tls_timeout)
+    previous = current_timing()
+    _local.timing = timing
+    try:
+        yield timing
+    finally:
+        _local.timing = previous
+        if previous is not None:
+            previous.samples.extend(timing.samples)
+
+
+class _TimedMixin:
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+        timing.start('connect')
+        sock = super()._new_conn()
+        timing.stop()
+        return sock
+
+    def getresponse(self):
+        timing = current_timing()
+        if timing is None:
+            return super().getresponse()
+        timing.start('ttfb')
+        response = super().getresponse()
+        timing.stop()
+        return response
+
+
+class TimedHTTPConnection(_TimedMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedMixin, HTTPSConnection):
+    def _new_conn(self):
+        sock = super()._new_conn()
+        timing = current_timing()
+        if timing is not None:
+            # The handshake runs on this socket right after it is returned
+            if timing.tls_timeout is not None:
+                sock.settimeout(timing.tls_timeout)
+            timing.start('tls')
+        return sock
+
+    def connect(self):
+        super().connect()
+        timing = current_timing()
+        if timing is not None and timing.phase == 'tls':
+            timing.stop()
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report their phases to probe_timing()."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def timed_session() -> requests.Session:
+    """A requests.Session with TimedAdapter mounted for http and https."""
+    session = requests.Session()
+    adapter = TimedAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def timed_get(url: str, **kwargs) -> requests.Response:
+    """requests.get (one session per call) with timed connections."""
+    with timed_session() as session:
+        return session.get(url, **kwargs)
+
+
+class PhaseTimings:
+    """Per-phase histograms of the `timings` of many results."""
+
+    def __init__(self):
+        self.histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.probes = 0
+
+    def add(self, timings: Optional[Dict[str, float]]):
+        """Add one result's timings (milliseconds per phase; None is skipped)."""
+        if timings is None:
+            return
+        self.probes += 1
+        for phase, ms in timings.items():
+            self.histograms[phase].add(ms / 1000)
+
+    def summary(self) -> Dict:
+        """
+        Aggregate timings.
+
+        Returns:
+            Dictionary with the number of timed probes and, per phase with
+            samples, its summary (milliseconds), its share of the time
+            spent in all phases and its histogram buckets
+        """
+        spent = sum(histogram.total for histogram in self.histograms.values())
+        return {
+            'probes': self.probes,
+            'phases': {
+                phase: {
+                    **histogram.summary(),
+                    'share_percentage': round(histogram.total / spent * 100, 1) if spent else 0.0,
+                    'histogram': histogram.buckets()
+                }
+                for phase, histogram in self.histograms.items() if histogram.count
+            }
+        }
+
+
+class AdaptiveTimeouts:
+    """Per-phase timeouts set from running latency percentiles."""
+
+    def __init__(self, defaults: Dict[str, float], floors: Optional[Dict[str, float]] = None,
+                 ceilings: Optional[Dict[str, float]] = None, percentile: float = 99,
+                 multiplier: float = 3.0, min_samples: int = 30, enabled: bool = True):
+        """
+        Args:
+            defaults: Timeout of each phase until it has min_samples
+                      observations (the configured, fixed timeouts)
+            floors: Shortest timeout of each phase
+            ceilings: Longest timeout of each phase
+            percentile: Percentile of the observed latencies the timeout follows
+            multiplier: Timeout = percentile * multiplier (then clamped)
+            min_samples: Observations needed before a phase adapts
+            enabled: False keeps the defaults (latencies are still tracked)
+        """
+        self.defaults = dict(defaults)
+        self.floors = floors or {}
+        self.ceilings = ceilings or {}
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.histograms = {phase: LatencyHistogram() for phase in PHASES}
+        self.cut_offs = dict.fromkeys(PHASES, 0)
+        self._used = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], defaults: Dict[str, float]) -> 'AdaptiveTimeouts':
+        """Build from an adaptive_timeouts config section (None: fixed defaults)."""
+        if config is None:
+            return cls(defaults, enabled=False)
+        return cls(defaults, floors=config.get('floor'), ceilings=config.get('ceiling'),
+                   percentile=config.get('percentile', 99), multiplier=config.get('multiplier', 3.0),
+                   min_samples=config.get('min_samples', 30), enabled=config.get('enabled', True))
+
+    def adapted(self, phase: str) -> bool:
+        """Whether a phase has enough observations to follow its percentile."""
+        return self.enabled and self.histograms[phase].count >= self.min_samples
+
+    def current(self, phase: str) -> float:
+        """Current timeout of a phase."""
+        if not self.adapted(phase):
+            return self.defaults[phase]
+        value = self.histograms[phase].percentile(self.percentile) * self.multiplier
+        return min(max(value, self.floors.get(phase, 0.0)), self.ceilings.get(phase, math.inf))
+
+    def timeout(self, phase: str) -> float:
+        """Timeout for the next use of a phase (recorded for the report)."""
+        value = self.current(phase)
+        with self._lock:
+            low, high = self._used.get(phase, (value, value))
+            self._used[phase] = (min(low, value), max(high, value))
+        return value
+
+    def observe(self, phase: str, seconds: float):
+        """Record how long a phase took."""
+        self.histograms[phase].add(seconds)
+
+    def observe_timing(self, timing: ProbeTiming):
+        """Record every completed phase of a probe's requests."""
+        for phase, seconds in timing.samples:
+            self.histograms[phase].add(seconds)
+
+    def cut_off(self, phase: str):
+        """Record a request abandoned by the timeout of a phase."""
+        with self._lock:
+            self.cut_offs[phase] += 1
+
+    @property
+    def observed(self) -> int:
+        """Requests and lookups seen so far (answered or cut off)."""
+        return sum(histogram.count for histogram in self.histograms.values()) + sum(self.cut_offs.values())
+
+    def report(self) -> Dict:
+        """
+        Timeouts chosen during the run.
+
+        Returns:
+            Dictionary with the adaptation settings and, per phase, the
+            latency percentiles, current timeout, range of timeouts used
+            and the number of requests each phase's timeout cut off
+        """
+        phases = []
+        for phase in PHASES:
+            if phase not in self.defaults:
+                continue
+            low, high = self._used.get(phase, (None, None))
+            phases.append({
+                'phase': phase,
+                **self.histograms[phase].summary(),
+                'timeout': round(self.current(phase), 3),
+                'timeout_min': None if low is None else round(low, 3),
+                'timeout_max': None if high is None else round(high, 3),
+                'adapted': self.adapted(phase),
+                'cut_off': self.cut_offs[phase]
+            })
+        return {
+            'adaptive': self.enabled,
+            'percentile': self.percentile,
+            'multiplier': self.multiplier,
+            'phases': phases
+        }
@@ -0,0 +1,99 @@
+"""
+Memory-mapped reading of large candidate files.
+
+The file is mapped instead of read, so opening it costs nothing whatever
+its size: lines are decoded one at a time as they are iterated, and the
+pages stay in the OS page cache instead of being copied into a list.
+The mapping can be split into byte-range shards aligned to line starts,
+so several workers can each walk their own part of the same file.
+"""
+import mmap
+import os
+from typing import Iterator, List, Optional, Tuple
+
+# Bytes decoded per step while iterating
+BLOCK_SIZE = 1 << 20
+
+
+class MappedLines:
+    """Non-blank, stripped lines of a file, read through mmap."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: File with one entry per line (UTF-8; invalid bytes are replaced)
+        """
+        self.path = str(path)
+        self._file = open(self.path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._count = None
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        if self._map is not None and hasattr(self._map, 'madvise'):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def __enter__(self) -> 'MappedLines':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def iter_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """
+        Lines that start in the byte range [start, end).
+
+        Args:
+            start: Byte offset of a line start (e.g. from shards())
+            end: End offset (defaults to the end of the file)
+        """
+        mm = self._map
+        if mm is None:
+            return
+        end = self.size if end is None else end
+        # Split one bounded block at a time; only the partial last line is carried over
+        remainder = b''
+        for pos in range(start, end, BLOCK_SIZE):
+            lines = (remainder + mm[pos:min(pos + BLOCK_SIZE, end)]).split(b'\n')
+            remainder = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if line:
+                    yield line.decode('utf-8', 'replace')
+        remainder = remainder.strip()
+        if remainder:
+            yield remainder.decode('utf-8', 'replace')
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_lines()
+
+    def __len__(self) -> int:
+        """Number of non-blank lines (counted on first use, then cached)."""
+        if self._count is None:
+            self._count = sum(1 for _ in self.iter_lines())
+        return self._count
+
+    def shards(self, count: int) -> List[Tuple[int, int]]:
+        """
+        Split the file into at most `count` byte ranges of similar size,
+        each starting at a line start, so that every line belongs to
+        exactly one range.
+
+        Returns:
+            List of (start, end) offsets for iter_lines()
+        """
+        if self._map is None:
+            return []
+        count = max(1, count)
+        bounds = [0]
+        for i in range(1, count):
+            pos = max(self.size * i // count, bounds[-1])
+            newline = self._map.find(b'\n', pos)
+            bounds.append(self.size if newline == -1 else newline + 1)
+        bounds.append(self.size)
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
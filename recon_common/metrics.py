@@ -0,0 +1,435 @@
+"""
+Live metrics of long-running scans, exported in the Prometheus text format.
+
+MetricsRegistry holds counters, gauges and histograms, each optionally
+split by labels. The scraper, both verifiers and the DNS scanner update
+the process-wide REGISTRY as they work (a few lock-protected additions
+per probe), whether or not anything reads it. MetricsExporter makes it
+visible while a scan runs:
+
+    port    GET http://127.0.0.1:<port>/metrics, for a Prometheus scrape
+    path    the same text rewritten every `interval` seconds (atomically,
+            so it can be read at any time, e.g. by node_exporter's
+            textfile collector) and once more when the scan ends
+
+The probe metrics shared by both verifiers are declared here:
+
+    recon_probes_total{tool,outcome}         live, not_live, no_dns, error
+    recon_probe_timeouts_total{tool,phase}   probes cut off, by phase
+    recon_probes_in_flight{tool}             probes running right now
+    recon_probe_queue_depth{tool}            probes waiting for a worker
+    recon_candidates_remaining{tool}         known candidates not verified yet
+    recon_probe_duration_seconds{tool}       time per probe
+    recon_probe_phase_seconds{tool,phase}    time per phase (result timings)
+
+and so are the subdomain source ones (crt.sh, subfinder):
+
+    recon_source_requests_total{source,outcome}   ok, timeout, error
+    recon_source_request_seconds{source}          time per query or run
+    recon_subdomains_discovered_total{source}     unique names found
+
+Throughput and error rates are rates of the counters, e.g.
+rate(recon_probes_total[1m]).
+"""
+import bisect
+import math
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the default histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _CounterValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self, metric):
+        self.value = 0.0
+        self._lock = metric._lock
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self, metric):
+        self.value = 0.0
+        self._lock = metric._lock
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    @contextmanager
+    def track_inprogress(self):
+        """Count the block as in progress while it runs."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramValue:
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, metric):
+        self.bounds = metric.buckets
+        self.counts = [0] * len(self.bounds)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = metric._lock
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations at or below it), ending with +Inf."""
+        total, rows = 0, []
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            rows.append((bound, total))
+        rows.append((math.inf, self.count))
+        return rows
+
+
+class Metric:
+    """A named metric family; labels() selects one of its series."""
+
+    kind = ''
+    _value_class = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwargs):
+        """
+        The series for these label values (positional, or by name).
+
+        Raises:
+            ValueError: Wrong number or names of label values
+        """
+        if kwargs:
+            if values or set(kwargs) != set(self.labelnames):
+                raise ValueError(f"{self.name} takes the labels {self.labelnames}")
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._value_class(self))
+        return series
+
+    def series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._series.items())
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """(sample name, label text, value) of every series."""
+        for values, series in self.series():
+            yield self.name, _label_text(self.labelnames, values), series.value
+
+
+class Counter(Metric):
+    kind = 'counter'
+    _value_class = _CounterValue
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+    _value_class = _GaugeValue
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._unlabelled().dec(amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    _value_class = _HistogramValue
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        names = self.labelnames + ('le',)
+        for values, series in self.series():
+            with series._lock:
+                rows, total, count = series.cumulative(), series.sum, series.count
+            for bound, cumulative in rows:
+                yield f"{self.name}_bucket", _label_text(names, values + (_format_value(bound),)), cumulative
+            labels = _label_text(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind} "
+                                 f"with labels {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """The counter called name, registered on first use."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """The gauge called name, registered on first use."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """The histogram called name, registered on first use."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            documentation = metric.documentation.replace('\\', '\\\\').replace('\n', '\\n')
+            lines.append(f"# HELP {metric.name} {documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+PROBES = REGISTRY.counter('recon_probes_total', 'Probes completed, by outcome (live, not_live, no_dns, error)',
+                          ('tool', 'outcome'))
+PROBE_TIMEOUTS = REGISTRY.counter('recon_probe_timeouts_total', 'Probe requests cut off by a timeout, by phase',
+                                  ('tool', 'phase'))
+PROBES_IN_FLIGHT = REGISTRY.gauge('recon_probes_in_flight', 'Probes running right now', ('tool',))
+PROBE_QUEUE_DEPTH = REGISTRY.gauge('recon_probe_queue_depth', 'Probes submitted to a worker pool and not started yet',
+                                   ('tool',))
+CANDIDATES_REMAINING = REGISTRY.gauge('recon_candidates_remaining', 'Known candidates not verified yet', ('tool',))
+PROBE_DURATION = REGISTRY.histogram('recon_probe_duration_seconds', 'Time to verify one candidate', ('tool',))
+PROBE_PHASE = REGISTRY.histogram('recon_probe_phase_seconds', 'Time spent in each phase of a probe',
+                                 ('tool', 'phase'))
+
+SOURCE_REQUESTS = REGISTRY.counter('recon_source_requests_total',
+                                   'Queries to subdomain sources, by outcome (ok, timeout, error)',
+                                   ('source', 'outcome'))
+SOURCE_REQUEST_DURATION = REGISTRY.histogram('recon_source_request_seconds', 'Time per subdomain source query',
+                                             ('source',), buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+SUBDOMAINS_DISCOVERED = REGISTRY.counter('recon_subdomains_discovered_total',
+                                         'Unique subdomains found by each source', ('source',))
+
+
+def record_probe(tool: str, outcome: str, seconds: float, timings: Optional[Dict[str, float]] = None):
+    """Count one finished probe with its duration and per-phase timings (milliseconds)."""
+    PROBES.labels(tool, outcome).inc()
+    PROBE_DURATION.labels(tool).observe(seconds)
+    for phase, ms in (timings or {}).items():
+        PROBE_PHASE.labels(tool, phase).observe(ms / 1000)
+
+
+def submit_queued(executor, tool: str, fn, *args):
+    """executor.submit(fn, *args), counted in recon_probe_queue_depth until it starts."""
+    depth = PROBE_QUEUE_DEPTH.labels(tool)
+
+    def run():
+        depth.dec()
+        return fn(*args)
+
+    depth.inc()
+    future = executor.submit(run)
+    # A cancelled probe never starts
+    future.add_done_callback(lambda done: done.cancelled() and depth.dec())
+    return future
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serve a registry over HTTP and/or snapshot it to a file while a scan runs."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port: Optional[int] = None,
+                 host: str = '127.0.0.1', path: Optional[str] = None, interval: float = 15.0):
+        """
+        Args:
+            registry: Metrics to export
+            port: Serve them on http://host:port/metrics (0: any free port)
+            host: Interface to listen on (local only by default)
+            path: File rewritten with them every interval seconds
+            interval: Seconds between file snapshots
+        """
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.path = Path(path) if path else None
+        self.interval = interval
+        self._server = None
+        self._threads = []
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict], port: Optional[int] = None,
+                    path: Optional[str] = None) -> Optional['MetricsExporter']:
+        """
+        Exporter for a `metrics` config section, with command line overrides.
+
+        Returns:
+            MetricsExporter (not started), or None when neither a port nor
+            a file is configured
+        """
+        config = config or {}
+        port = port if port is not None else config.get('port')
+        path = path or config.get('file')
+        if port is None and not path:
+            return None
+        return cls(port=port, host=config.get('host', '127.0.0.1'), path=path,
+                   interval=config.get('interval', 15))
+
+    @property
+    def url(self) -> Optional[str]:
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> 'MetricsExporter':
+        """
+        Start serving and snapshotting in daemon threads.
+
+        Raises:
+            OSError: The port cannot be bound
+        """
+        if self.port is not None:
+            handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True))
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.write_snapshot()
+            self._threads.append(threading.Thread(target=self._snapshot_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def write_snapshot(self):
+        """Replace the snapshot file with the current metrics."""
+        temporary = self.path.with_name(self.path.name + '.tmp')
+        temporary.write_text(self.registry.render(), encoding='utf-8')
+        os.replace(temporary, self.path)
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+
+    def close(self):
+        """Stop the threads; the snapshot file is left with the final values."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.path is not None:
+            self.write_snapshot()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
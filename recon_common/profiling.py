@@ -0,0 +1,445 @@
+"""
+Profiling of whole runs, split by pipeline stage (--profile DIR).
+
+StageProfiler divides a run into the stages its entry point enters with
+stage(name) (discovery, resolution, probing, analysis, output) and writes,
+for each one, to the profile directory:
+
+    <stage>.collapsed   wall-clock stack samples of every thread, one
+                        "thread;frame;frame;... count" line per stack:
+                        the input of flamegraph.pl, speedscope or inferno
+    <stage>.pstats      cProfile of the stage (python -m pstats, snakeviz)
+    <stage>.alloc.txt   allocation sites (tracemalloc) that grew the most
+                        during the stage
+
+plus summary.txt, the table returned by summary(): wall time, CPU time,
+stack samples, peak and retained traced memory of each stage. The time
+outside any stage is counted in `other`.
+
+stage() is a no-op unless a profiler is running, so the entry points wrap
+their stages unconditionally. Each thread has its own stages, which do not
+overlap within it: entering one pauses the stage it is nested in. Stages
+of different threads (the domains of a batch scan) run side by side, so
+their wall times add up to more than the run took. Work interleaved per
+candidate (the DNS lookup inside each probe) shows up in its stage's flame
+graph, not as a stage of its own.
+
+Threads outside any stage (thread pools) are sampled into the stage of the
+thread that started the profiler or, while that thread is outside any
+stage, into the stage most of the other staged threads are in; their CPU
+time counts in the starting thread's stage. Traced memory is process-wide,
+so peak, retained and allocation sites are only measured for the stages of
+the starting thread.
+
+cProfile only follows the thread that enabled it before Python 3.12, so
+worker threads started during a stage get their own profiler until the
+stage ends, and a stage entered from another thread profiles that thread
+alone; from 3.12 one profiler covers every thread and the stages of other
+threads have no .pstats. Threads already running when a stage of the
+starting thread begins (a pool shared by several stages) are only in the
+stack samples. Pool workers waiting for a task are not sampled.
+Profiling slows the run down (tracemalloc alone about doubles allocation
+costs), so timings are comparable between stages, not with normal runs.
+"""
+import cProfile
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Stage of the time spent outside the stages of the entry point
+OTHER = 'other'
+
+# Seconds between stack samples (100 Hz)
+DEFAULT_INTERVAL = 0.01
+
+# Allocation sites listed in each <stage>.alloc.txt
+ALLOCATION_SITES = 25
+
+# cProfile follows every thread from Python 3.12 (sys.monitoring)
+_PER_THREAD = sys.version_info < (3, 12)
+
+_ROOT = Path(__file__).resolve().parents[1].as_posix() + '/'
+_POOL_WORKER = ('_worker', 'concurrent/futures/thread.py')
+# Allocations of the profiler itself, left out of the memory figures
+_OWN_FILES = frozenset((__file__, cProfile.__file__, pstats.__file__, tracemalloc.__file__))
+
+# The running profiler, if any (one per process)
+_active: Optional['StageProfiler'] = None
+
+
+def stage(name: str):
+    """
+    Context manager that profiles its block as stage `name` of the calling
+    thread; does nothing when no profiler is running.
+    """
+    profiler = _active
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def _short_path(filename: str) -> str:
+    """Repository-relative path, package path, or bare name of a source file."""
+    path = filename.replace(os.sep, '/')
+    if path.startswith(_ROOT):
+        return path[len(_ROOT):]
+    for marker in ('/site-packages/', '/dist-packages/'):
+        if marker in path:
+            return path.split(marker, 1)[1]
+    return path.rsplit('/', 1)[-1]
+
+
+def _thread_label(name: str) -> str:
+    """Thread name without the per-thread counter (all pool workers merge)."""
+    name = re.sub(r'_\d+$', '', name)
+    return re.sub(r'^Thread-\d+', 'Thread', name).replace(';', ',')
+
+
+class _ThreadProfile(cProfile.Profile):
+    """cProfile of a worker thread, read from the profiler's thread."""
+
+    def create_stats(self):
+        # disable() would act on the calling thread, not the profiled one
+        self.snapshot_stats()
+
+
+class _Stage:
+    """Everything measured while one stage was running (all its segments)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.samples = Counter()
+        self.stats = pstats.Stats()
+        self.peak = 0
+        self.retained = 0
+        self.sites = Counter()
+        # Entered by the thread that started the profiler (memory is measured)
+        self.measured = False
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def top_site(self) -> Optional[tuple]:
+        grown = [(size, site) for site, size in self.sites.items() if size > 0]
+        return max(grown) if grown else None
+
+
+class _Segment:
+    """One uninterrupted run of a stage in one thread."""
+
+    def __init__(self, stage: _Stage, profile: Optional[cProfile.Profile]):
+        self.stage = stage
+        self.profile = profile
+        self.threads: List[cProfile.Profile] = []
+        self.wall = time.perf_counter()
+        self.cpu = 0.0
+        self.other_cpu = 0.0
+
+
+class StageProfiler:
+    """CPU, stack-sample and memory profile of each stage of a run."""
+
+    def __init__(self, output_dir: str, interval: float = DEFAULT_INTERVAL, memory: bool = True):
+        """
+        Args:
+            output_dir: Directory for the profile files (created if missing)
+            interval: Seconds between stack samples of all threads
+            memory: Trace allocations with tracemalloc
+        """
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.memory = memory
+        self.owner = None
+        self.stages: Dict[str, _Stage] = {}
+        # Stages entered and current segment of each thread (by thread id)
+        self._stacks: Dict[int, List[_Stage]] = {}
+        self._segments: Dict[int, _Segment] = {}
+        # CPU seconds of the segments of other threads, left out of the owner's
+        self._other_cpu = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started_tracing = False
+        self._labels = {}
+        # Traced bytes per allocation site at the last stage switch
+        self._sizes: Dict[str, int] = {}
+
+    # Stages
+
+    def _get(self, name: str) -> _Stage:
+        if name not in self.stages:
+            self.stages[name] = _Stage(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile the block as stage `name` of the calling thread (accumulates when re-entered)."""
+        ident = threading.get_ident()
+        stack = self._stacks.get(ident)
+        if stack and stack[-1].name == name:
+            yield
+            return
+        self._switch(ident, name)
+        try:
+            yield
+        finally:
+            self._switch(ident, None)
+
+    def _switch(self, ident: int, name: Optional[str]):
+        """End the calling thread's current segment and start the next one (None: back to the enclosing stage)."""
+        with self._lock:
+            stack = self._stacks.setdefault(ident, [])
+            if stack:
+                self._end_segment(ident)
+            if name is not None:
+                stack.append(self._get(name))
+            else:
+                stack.pop()
+            if stack:
+                self._begin_segment(ident, stack[-1])
+            else:
+                del self._stacks[ident]
+
+    def _begin_segment(self, ident: int, current: _Stage):
+        if ident != self.owner:
+            # Only this thread: its own cProfile where cProfile is per thread
+            segment = _Segment(current, cProfile.Profile() if _PER_THREAD else None)
+            segment.cpu = time.thread_time()
+        else:
+            if self.memory:
+                tracemalloc.reset_peak()
+            segment = _Segment(current, cProfile.Profile())
+            if _PER_THREAD:
+                threading.setprofile(self._thread_hook(segment))
+            segment.cpu = time.process_time()
+            segment.other_cpu = self._other_cpu
+        self._segments[ident] = segment
+        if segment.profile is not None:
+            segment.profile.enable()
+
+    def _end_segment(self, ident: int):
+        segment = self._segments.pop(ident)
+        current = segment.stage
+        if segment.profile is not None:
+            segment.profile.disable()
+        current.wall += time.perf_counter() - segment.wall
+        if ident != self.owner:
+            cpu = time.thread_time() - segment.cpu
+            current.cpu += cpu
+            self._other_cpu += cpu
+        else:
+            # process_time() covers every thread, including those in stages of their own
+            current.cpu += max(0.0, time.process_time() - segment.cpu - (self._other_cpu - segment.other_cpu))
+            if _PER_THREAD:
+                threading.setprofile(None)
+            if self.memory:
+                self._measure_segment(current)
+        for profile in (segment.profile, *segment.threads):
+            if profile is None:
+                continue
+            try:
+                current.stats.add(profile)
+            except TypeError:
+                # Nothing was called while it was enabled
+                pass
+
+    def _measure_segment(self, current: _Stage):
+        """Add the peak and allocation growth since the last switch of the owner to `current`."""
+        current.measured = True
+        _, peak = tracemalloc.get_traced_memory()
+        current.peak = max(current.peak, peak)
+        # One snapshot per switch: the end of this segment is the start of the next
+        sizes, before = self._measure(), self._sizes
+        for site, size in sizes.items():
+            if size != before.get(site, 0):
+                current.sites[site] += size - before.get(site, 0)
+        for site, size in before.items():
+            if site not in sizes:
+                current.sites[site] -= size
+        current.retained += sum(sizes.values()) - sum(before.values())
+        self._sizes = sizes
+
+    def _thread_hook(self, segment: _Segment):
+        """threading.setprofile() hook giving each new thread its own cProfile."""
+        def hook(frame, event, arg):
+            profile = _ThreadProfile()
+            with self._lock:
+                segment.threads.append(profile)
+            # Replaces this hook in the new thread
+            profile.enable()
+        return hook
+
+    @staticmethod
+    def _measure() -> Dict[str, int]:
+        """Traced bytes per allocation site (file:line), the profiler's own left out."""
+        sizes = Counter()
+        # Filtering the statistics is much cheaper than Snapshot.filter_traces()
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            frame = stat.traceback[0]
+            if frame.filename not in _OWN_FILES:
+                sizes[f"{_short_path(frame.filename)}:{frame.lineno}"] += stat.size
+        return sizes
+
+    # Stack samples
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _unstaged(self) -> Optional[_Stage]:
+        """Stage of the samples of threads outside any stage."""
+        owner = self._stacks.get(self.owner)
+        if owner is None:
+            return None
+        if owner[-1].name != OTHER:
+            return owner[-1]
+        staged = Counter(stack[-1].name for ident, stack in self._stacks.items() if ident != self.owner)
+        return self.stages[staged.most_common(1)[0][0]] if staged else owner[-1]
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if code.co_name == _POOL_WORKER[0] and code.co_filename.replace(os.sep, '/').endswith(
+                        _POOL_WORKER[1]):
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(self._frame_label(frame.f_code))
+                    frame = frame.f_back
+                frames.append(_thread_label(names.get(ident, 'thread')))
+                stacks.append((ident, ';'.join(reversed(frames))))
+            with self._lock:
+                unstaged = self._unstaged()
+                for ident, stack in stacks:
+                    staged = self._stacks.get(ident)
+                    current = staged[-1] if staged else unstaged
+                    if current is not None:
+                        current.samples[stack] += 1
+
+    # Lifecycle
+
+    def start(self) -> 'StageProfiler':
+        """Start profiling the calling thread's stages (the `other` stage first)."""
+        global _active
+        if _active is not None:
+            raise RuntimeError("A stage profiler is already running")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.owner = threading.get_ident()
+        with self._lock:
+            if self.memory:
+                self._sizes = self._measure()
+            self._stacks[self.owner] = [self._get(OTHER)]
+            self._begin_segment(self.owner, self.stages[OTHER])
+        self._sampler = threading.Thread(target=self._sample, name='stage-profiler', daemon=True)
+        self._sampler.start()
+        _active = self
+        return self
+
+    def close(self):
+        """Stop profiling and write the profile files and summary.txt."""
+        global _active
+        if _active is not self:
+            return
+        _active = None
+        self._stop.set()
+        self._sampler.join()
+        with self._lock:
+            self._end_segment(self.owner)
+            self._stacks.clear()
+            self._segments.clear()
+        if self._started_tracing:
+            tracemalloc.stop()
+        self.write()
+
+    def __enter__(self) -> 'StageProfiler':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Reports
+
+    def write(self):
+        """Write the profile files of every stage and summary.txt."""
+        for current in self.stages.values():
+            base = self.output_dir / re.sub(r'[^\w.-]', '_', current.name)
+            with open(f"{base}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in sorted(current.samples.items()):
+                    f.write(f"{stack} {count}\n")
+            if current.stats.stats:
+                current.stats.dump_stats(f"{base}.pstats")
+            if current.measured:
+                with open(f"{base}.alloc.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"{'Grown':>12}  Site\n")
+                    for site, size in current.sites.most_common(ALLOCATION_SITES):
+                        f.write(f"{_format_bytes(size):>12}  {site}\n")
+        with open(self.output_dir / 'summary.txt', 'w', encoding='utf-8') as f:
+            f.write(self.summary() + '\n')
+
+    def rows(self) -> List[Dict]:
+        """Per-stage totals, in the order the stages were first entered."""
+        total = sum(current.wall for current in self.stages.values()) or 1.0
+        rows = []
+        for current in self.stages.values():
+            top = current.top_site()
+            rows.append({
+                'stage': current.name,
+                'wall_seconds': current.wall,
+                'wall_percentage': current.wall / total * 100,
+                'cpu_seconds': current.cpu,
+                'samples': current.sample_count,
+                'peak_bytes': current.peak if current.measured else None,
+                'retained_bytes': current.retained if current.measured else None,
+                'top_site': top and {'site': top[1], 'bytes': top[0]},
+            })
+        return rows
+
+    def summary(self) -> str:
+        """Table of the wall time, CPU time and traced memory of each stage."""
+        rows = self.rows()
+        lines = [f"{'Stage':<12} {'Wall s':>8} {'Wall %':>7} {'CPU s':>8} {'Samples':>8} "
+                 f"{'Peak':>10} {'Retained':>10}  Top allocation site"]
+        for row in rows:
+            top = row['top_site']
+            site = f"{top['site']} (+{_format_bytes(top['bytes'])})" if top else '-'
+            memory = (f"{_format_bytes(row['peak_bytes']):>10} {_format_bytes(row['retained_bytes'], True):>10}"
+                      if row['peak_bytes'] is not None else f"{'-':>10} {'-':>10}")
+            lines.append(f"{row['stage']:<12} {row['wall_seconds']:>8.2f} {row['wall_percentage']:>6.1f}% "
+                         f"{row['cpu_seconds']:>8.2f} {row['samples']:>8} {memory}  {site}")
+        lines.append(f"{'total':<12} {sum(row['wall_seconds'] for row in rows):>8.2f} {100.0:>6.1f}% "
+                     f"{sum(row['cpu_seconds'] for row in rows):>8.2f} "
+                     f"{sum(row['samples'] for row in rows):>8}")
+        return '\n'.join(lines)
+
+
+def _format_bytes(size: int, signed: bool = False) -> str:
+    sign = ('+' if size >= 0 else '-') if signed else ('-' if size < 0 else '')
+    size = abs(size)
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{sign}{size:.0f} {unit}" if unit == 'B' else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+    return f"{sign}{size:.1f} GB"
@@ -0,0 +1,109 @@
+"""
+Compact result records shared by subdomain_checker and subdomain_discovery.
+
+Each probe used to allocate a fresh dict (plus a nested http_info dict).
+These slotted dataclasses store the same fields without a per-instance
+__dict__, still behave like those dicts (r['is_live'], r.get('ip'),
+r['ip'] = ...), and serialise to exactly the same JSON shape.
+
+`timings` holds the milliseconds a probe spent in each phase (dns,
+connect, tls, ttfb; see recon_common.latency), summed over its requests,
+or None when nothing was measured (replayed answers, older files).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class Record:
+    """Dict-style access for slotted dataclasses, in field order."""
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the original JSON shape (nested records included)."""
+        return {
+            key: value.to_dict() if isinstance(value, Record) else value
+            for key, value in self.items()
+        }
+
+
+def to_serializable(obj: Any) -> Dict[str, Any]:
+    """`default=` hook so json.dump can write records directly."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+@dataclass(slots=True, eq=True)
+class CheckResult(Record):
+    """One (subdomain, protocol) check from subdomain_checker's SubdomainVerifier."""
+    subdomain: str
+    url: str
+    protocol: str
+    is_live: bool = False
+    status_code: Optional[int] = None
+    ip: Optional[str] = None
+    error: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+
+
+@dataclass(slots=True, eq=True)
+class HttpInfo(Record):
+    """HTTP/HTTPS probe outcome from subdomain_discovery's SubdomainVerifier."""
+    accessible: bool = False
+    status_code: Optional[int] = None
+    protocol: Optional[str] = None
+    redirect_url: Optional[str] = None
+    title: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass(slots=True, eq=True)
+class VerificationResult(Record):
+    """Complete verification of one subdomain from subdomain_discovery."""
+    subdomain: str
+    dns_resolves: bool = False
+    is_live: bool = False
+    http_info: Optional[HttpInfo] = None
+    timings: Optional[Dict[str, float]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'VerificationResult':
+        """Rebuild a record from its JSON form (e.g. a previous *_results.json)."""
+        http_info = data.get('http_info')
+        return cls(
+            subdomain=data['subdomain'],
+            dns_resolves=data.get('dns_resolves', False),
+            is_live=data.get('is_live', False),
+            http_info=None if http_info is None else HttpInfo(
+                **{key: http_info.get(key, default) for key, default in HttpInfo().items()}
+            ),
+            timings=data.get('timings')
+        )
@@ -0,0 +1,242 @@
+"""
+Record/replay archive of the network answers the verifiers depend on.
+
+In record mode every HTTP response (status, final URL, redirect chain,
+headers and the first body_limit characters of the body), every DNS
+answer and every candidate list (subfinder, crt.sh) is stored in a
+SQLite file as it is obtained. In replay mode the same calls are
+answered from that file and nothing touches the network, so a scan can
+be re-analysed (new high_value_keywords, scoring, categories) in seconds,
+and a recorded scan doubles as a deterministic performance fixture.
+
+    responses    one row per (kind, key): 'http' + URL, 'dns' + name, ...
+                 with a JSON value and, for HTTP, the zlib-compressed body
+                 prefix
+
+Responses are returned in the shape the verifiers read (status_code, url,
+history, headers, text) in both modes, so a recorded run and its replay
+produce the same results. Request failures are stored by exception class
+and raised again on replay.
+"""
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+from recon_common.result_store import now_text
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+# Enough for the <title> of practically every page
+DEFAULT_BODY_LIMIT = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    value TEXT NOT NULL,
+    body BLOB,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+"""
+
+
+class ArchivedResponse:
+    """The parts of a requests.Response the verifiers use."""
+
+    __slots__ = ('status_code', 'url', 'history', 'headers', 'text')
+
+    def __init__(self, status_code: int, url: str, history: List['ArchivedResponse'] = (),
+                 headers: Optional[Dict[str, str]] = None, text: str = ''):
+        self.status_code = status_code
+        self.url = url
+        self.history = list(history)
+        self.headers = headers or {}
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+
+def _request_error(error_type: str, message: str) -> Exception:
+    """Rebuild a recorded requests exception (RequestException if the class is unknown)."""
+    import requests
+    cls = getattr(requests.exceptions, error_type, None)
+    if not (isinstance(cls, type) and issubclass(cls, requests.exceptions.RequestException)):
+        cls = requests.exceptions.RequestException
+    return cls(message)
+
+
+class ResponseArchive:
+    """SQLite archive that records or replays HTTP responses and lookups."""
+
+    def __init__(self, path: str, mode: str = REPLAY, body_limit: int = DEFAULT_BODY_LIMIT,
+                 batch_size: int = 500):
+        """
+        Open (and in record mode create) the archive.
+
+        Args:
+            path: SQLite file
+            mode: 'record' (query the network and store the answers) or
+                  'replay' (answer from the archive only)
+            body_limit: Characters of each response body kept
+            batch_size: Buffered answers written per transaction
+
+        Raises:
+            ValueError: Unknown mode
+            FileNotFoundError: Replaying an archive that does not exist
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown archive mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.path = str(path)
+        self.mode = mode
+        self.body_limit = body_limit
+        self.batch_size = batch_size
+        if mode == REPLAY:
+            # Never create an empty archive by mistake
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(f"Response archive not found: {self.path}")
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self.counts = {'recorded': 0, 'replayed': 0, 'missing': 0}
+
+    def __enter__(self) -> 'ResponseArchive':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def summary(self) -> str:
+        """One-line account of what was recorded or replayed."""
+        if self.replaying:
+            return (f"Replayed {self.counts['replayed']} answers from {self.path} "
+                    f"({self.counts['missing']} not in the archive)")
+        return f"Recorded {self.counts['recorded']} answers to {self.path}"
+
+    # -- storage ---------------------------------------------------------
+
+    def _put(self, kind: str, key: str, value: Any, body: Optional[str] = None):
+        row = (kind, key, now_text(), json.dumps(value),
+               zlib.compress(body.encode('utf-8')) if body else None)
+        with self._lock:
+            self._pending.append(row)
+            self.counts['recorded'] += 1
+            if len(self._pending) < self.batch_size:
+                return
+            pending, self._pending = self._pending, []
+            self._write(pending)
+
+    def _write(self, rows):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", rows)
+
+    def flush(self):
+        """Write every buffered answer in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                self._write(pending)
+
+    def _get(self, kind: str, key: str):
+        """(value, body) stored for kind/key, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT value, body FROM responses WHERE kind = ? AND key = ?",
+                                    (kind, key)).fetchone()
+            self.counts['replayed' if row else 'missing'] += 1
+        if row is None:
+            return None
+        value, body = row
+        return json.loads(value), zlib.decompress(body).decode('utf-8') if body else ''
+
+    # -- answers ---------------------------------------------------------
+
+    def store(self, kind: str, key: str, value: Any):
+        """Record the JSON-serialisable answer of a lookup (e.g. kind 'dns', key the host name)."""
+        self._put(kind, key, value)
+
+    def lookup(self, kind: str, key: str, missing: Any = None) -> Any:
+        """Replay a recorded answer (missing if the archive has none)."""
+        stored = self._get(kind, key)
+        return missing if stored is None else stored[0]
+
+    def call(self, kind: str, key: str, function: Callable[[], Any], missing: Any = None) -> Any:
+        """
+        Record or replay the JSON-serialisable answer of a lookup.
+
+        Args:
+            kind: Kind of lookup (e.g. 'dns', 'ip')
+            key: What was looked up (e.g. the host name)
+            function: Performs the lookup (only called in record mode)
+            missing: Answer replayed when the archive has none
+
+        Returns:
+            The answer
+        """
+        if self.replaying:
+            return self.lookup(kind, key, missing)
+        value = function()
+        self.store(kind, key, value)
+        return value
+
+    def fetch(self, get: Callable, url: str, **kwargs) -> ArchivedResponse:
+        """
+        Record or replay an HTTP GET.
+
+        Args:
+            get: The real request function (requests.get, Session.get),
+                 only called in record mode
+            url: Requested URL
+            **kwargs: Passed on to get
+
+        Returns:
+            ArchivedResponse (the body cut to body_limit characters)
+
+        Raises:
+            The recorded requests exception if the request failed, or
+            requests.exceptions.ConnectionError when replaying a URL that
+            is not in the archive
+        """
+        if self.replaying:
+            stored = self._get('http', url)
+            if stored is None:
+                raise _request_error('ConnectionError', f"{url} is not in the response archive")
+            value, body = stored
+            if 'error_type' in value:
+                raise _request_error(value['error_type'], value['error'])
+            return ArchivedResponse(value['status_code'], value['url'],
+                                    [ArchivedResponse(code, hop) for code, hop in value['history']],
+                                    value['headers'], body)
+
+        import requests
+        try:
+            response = get(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            self._put('http', url, {'error_type': type(e).__name__, 'error': str(e)})
+            raise
+        text = response.text[:self.body_limit]
+        history = [(hop.status_code, hop.url) for hop in response.history]
+        headers = dict(response.headers)
+        self._put('http', url, {'status_code': response.status_code, 'url': response.url,
+                                'history': history, 'headers': headers}, text)
+        return ArchivedResponse(response.status_code, response.url,
+                                [ArchivedResponse(code, hop) for code, hop in history], headers, text)
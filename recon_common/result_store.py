@@ -0,0 +1,494 @@
+"""
+SQLite store for scan results, shared by subdomain_checker and subdomain_discovery.
+
+One database keeps every run instead of a set of timestamped files per run:
+
+    runs         one row per scan (tool, domain, times, analysis JSON)
+    hosts        one row per subdomain, with its labels reversed
+                 (es.upm.etsit.www) so "everything under etsit.upm.es" is
+                 an index range scan
+    probes       one row per verification of a host in a run, with the
+                 milliseconds it spent in each phase (DNS, connect, TLS,
+                 time to first byte)
+    dns_records  A records seen for a host in a run
+
+Results are buffered and written in batches, each batch in a single
+transaction. The readers rebuild the records the tools already use, so
+the previous file formats can be exported from any stored run.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from recon_common.records import CheckResult, HttpInfo, VerificationResult
+
+# Time format of the TEXT columns (sorts chronologically)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Timestamp format used in the tools' file names and JSON
+FILE_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    total_candidates INTEGER,
+    analysis TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_domain_time ON runs (domain, started_at);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    reversed TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hosts_reversed ON hosts (reversed);
+
+CREATE TABLE IF NOT EXISTS probes (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    host_id INTEGER NOT NULL REFERENCES hosts (id),
+    seq INTEGER NOT NULL,
+    probed_at TEXT NOT NULL,
+    carried INTEGER NOT NULL DEFAULT 0,
+    dns_resolves INTEGER,
+    is_live INTEGER NOT NULL,
+    has_http_info INTEGER NOT NULL DEFAULT 0,
+    accessible INTEGER,
+    status_code INTEGER,
+    protocol TEXT,
+    url TEXT,
+    ip TEXT,
+    redirect_url TEXT,
+    title TEXT,
+    error TEXT,
+    dns_ms REAL,
+    connect_ms REAL,
+    tls_ms REAL,
+    ttfb_ms REAL
+);
+CREATE INDEX IF NOT EXISTS probes_run ON probes (run_id, seq);
+CREATE INDEX IF NOT EXISTS probes_host_time ON probes (host_id, probed_at);
+CREATE INDEX IF NOT EXISTS probes_status_time ON probes (status_code, probed_at);
+
+CREATE TABLE IF NOT EXISTS dns_records (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    host_id INTEGER NOT NULL REFERENCES hosts (id),
+    type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    seen_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS dns_records_run ON dns_records (run_id, host_id, type, value);
+CREATE INDEX IF NOT EXISTS dns_records_host ON dns_records (host_id, seen_at);
+"""
+
+# Phase timings of a probe (the `timings` of its record), one column per phase
+TIMING_PHASES = ('dns', 'connect', 'tls', 'ttfb')
+TIMING_COLUMNS = tuple(f"{phase}_ms" for phase in TIMING_PHASES)
+
+PROBE_COLUMNS = ('run_id', 'host_id', 'seq', 'probed_at', 'carried', 'dns_resolves', 'is_live',
+                 'has_http_info', 'accessible', 'status_code', 'protocol', 'url', 'ip',
+                 'redirect_url', 'title', 'error') + TIMING_COLUMNS
+
+
+def reverse_name(name: str) -> str:
+    """www.etsit.upm.es -> es.upm.etsit.www"""
+    return '.'.join(reversed(name.split('.')))
+
+
+def timing_values(timings: Optional[Dict[str, float]]) -> Tuple:
+    """A record's timings as TIMING_COLUMNS values."""
+    timings = timings or {}
+    return tuple(timings.get(phase) for phase in TIMING_PHASES)
+
+
+def row_timings(row) -> Optional[Dict[str, float]]:
+    """The timings of a probes row (None if none was measured)."""
+    timings = {phase: row[column] for phase, column in zip(TIMING_PHASES, TIMING_COLUMNS)
+               if row[column] is not None}
+    return timings or None
+
+
+def now_text() -> str:
+    return datetime.now().strftime(TIME_FORMAT)
+
+
+def from_file_timestamp(stamp: str) -> str:
+    """20260101_120000 -> 2026-01-01 12:00:00"""
+    return datetime.strptime(stamp, FILE_TIMESTAMP_FORMAT).strftime(TIME_FORMAT)
+
+
+def to_file_timestamp(text: str) -> str:
+    """2026-01-01 12:00:00 -> 20260101_120000"""
+    return datetime.strptime(text, TIME_FORMAT).strftime(FILE_TIMESTAMP_FORMAT)
+
+
+class ResultStore:
+    """SQLite-backed history of runs, hosts, probes and DNS records."""
+
+    def __init__(self, path: str, batch_size: int = 500):
+        """
+        Open (and create if needed) the database.
+
+        Args:
+            path: SQLite file
+            batch_size: Buffered probes written per transaction
+        """
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._host_ids = {}
+        self._probes = []  # pending (host name, probe values, addresses)
+        self._seq = {}     # run id -> next sequence number
+
+    def _migrate(self):
+        """Add the columns newer versions write to a database created by an older one."""
+        existing = {row['name'] for row in self.conn.execute("PRAGMA table_info(probes)")}
+        with self.conn:
+            for column in TIMING_COLUMNS:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE probes ADD COLUMN {column} REAL")
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # -- writing ---------------------------------------------------------
+
+    def start_run(self, tool: str, domain: str, started_at: Optional[str] = None) -> int:
+        """
+        Register a new run.
+
+        Args:
+            tool: Tool name (e.g. subdomain_discovery)
+            domain: Target domain or query
+            started_at: Start time (TIME_FORMAT, defaults to now)
+
+        Returns:
+            Run id
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (tool, domain, started_at) VALUES (?, ?, ?)",
+                (tool, domain, started_at or now_text())
+            )
+        self._seq[cursor.lastrowid] = 0
+        return cursor.lastrowid
+
+    def finish_run(self, run_id: int, total_candidates: Optional[int] = None,
+                   analysis: Optional[Dict] = None, default=None, finished_at: Optional[str] = None):
+        """
+        Flush pending probes and mark the run as finished.
+
+        Args:
+            run_id: Run to finish
+            total_candidates: Number of candidates the run started from
+            analysis: Analysis data to keep with the run (stored as JSON)
+            default: json `default=` hook for non-JSON values in analysis
+            finished_at: End time (TIME_FORMAT, defaults to now)
+        """
+        self.flush()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ?, total_candidates = ?, analysis = ? WHERE id = ?",
+                (finished_at or now_text(), total_candidates,
+                 None if analysis is None else json.dumps(analysis, default=default), run_id)
+            )
+
+    def discard_run(self, run_id: int):
+        """
+        Delete a run that will not be finished (nothing to verify, or the
+        scan failed), with its buffered and stored probes and DNS records.
+
+        Args:
+            run_id: Run to delete
+        """
+        with self._lock:
+            self._probes = [probe for probe in self._probes if probe[1][0] != run_id]
+            self._seq.pop(run_id, None)
+            with self.conn:
+                self.conn.execute("DELETE FROM dns_records WHERE run_id = ?", (run_id,))
+                self.conn.execute("DELETE FROM probes WHERE run_id = ?", (run_id,))
+                self.conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    def _next_seq(self, run_id: int) -> int:
+        seq = self._seq.get(run_id)
+        if seq is None:
+            row = self.conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM probes WHERE run_id = ?",
+                                    (run_id,)).fetchone()
+            seq = row[0] + sum(1 for _, values, _ in self._probes if values[0] == run_id)
+        self._seq[run_id] = seq + 1
+        return seq
+
+    def add_result(self, run_id: int, result, addresses: Optional[List[str]] = None,
+                   probed_at: Optional[str] = None, carried: bool = False):
+        """
+        Buffer a subdomain_discovery result (VerificationResult or its dict).
+
+        Args:
+            run_id: Run the result belongs to
+            result: Verification result
+            addresses: A records looked up for the host, if known
+            probed_at: When the host was probed (defaults to now)
+            carried: The result was carried forward from an earlier run
+        """
+        http_info = result.get('http_info')
+        info = http_info or {}
+        with self._lock:
+            values = (
+                run_id, None, self._next_seq(run_id), probed_at or now_text(), int(carried),
+                int(bool(result.get('dns_resolves'))), int(bool(result.get('is_live'))),
+                int(http_info is not None), int(bool(info.get('accessible'))) if http_info is not None else None,
+                info.get('status_code'), info.get('protocol'), None, None,
+                info.get('redirect_url'), info.get('title'), info.get('error'),
+                *timing_values(result.get('timings'))
+            )
+            self._probes.append((result['subdomain'], values, addresses))
+            pending = len(self._probes)
+        if pending >= self.batch_size:
+            self.flush()
+
+    def add_check(self, run_id: int, result):
+        """
+        Buffer a subdomain_checker result (CheckResult or its dict).
+
+        Args:
+            run_id: Run the result belongs to
+            result: Result of one (subdomain, protocol) check
+        """
+        ip = result.get('ip')
+        with self._lock:
+            values = (
+                run_id, None, self._next_seq(run_id), now_text(), 0,
+                None, int(bool(result.get('is_live'))), 0, None,
+                result.get('status_code'), result.get('protocol'), result.get('url'), ip,
+                None, None, result.get('error'), *timing_values(result.get('timings'))
+            )
+            self._probes.append((result['subdomain'], values, [ip] if ip else None))
+            pending = len(self._probes)
+        if pending >= self.batch_size:
+            self.flush()
+
+    def _resolve_host_ids(self, names: Iterable[str]):
+        missing = [name for name in set(names) if name not in self._host_ids]
+        if not missing:
+            return
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO hosts (name, reversed) VALUES (?, ?)",
+            [(name, reverse_name(name)) for name in missing]
+        )
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in self.conn.execute(f"SELECT id, name FROM hosts WHERE name IN ({placeholders})", chunk):
+                self._host_ids[row['name']] = row['id']
+
+    def flush(self):
+        """Write every buffered probe (and its DNS records) in one transaction."""
+        with self._lock:
+            pending, self._probes = self._probes, []
+            if not pending:
+                return
+            with self.conn:
+                self._resolve_host_ids(name for name, _, _ in pending)
+                probes = []
+                records = []
+                for name, values, addresses in pending:
+                    host_id = self._host_ids[name]
+                    probes.append(values[:1] + (host_id,) + values[2:])
+                    for address in addresses or ():
+                        records.append((values[0], host_id, 'A', address, values[3]))
+                self.conn.executemany(
+                    f"INSERT INTO probes ({', '.join(PROBE_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(PROBE_COLUMNS))})",
+                    probes
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO dns_records (run_id, host_id, type, value, seen_at) VALUES (?, ?, ?, ?, ?)",
+                    records
+                )
+
+    # -- reading ---------------------------------------------------------
+
+    def latest_run(self, domain: str, tool: Optional[str] = None, finished: bool = True) -> Optional[int]:
+        """
+        Id of the most recent run for domain (optionally for one tool).
+
+        Args:
+            domain: Target domain or query
+            tool: Only consider runs of this tool
+            finished: Only consider runs that completed
+        """
+        sql = "SELECT id FROM runs WHERE domain = ?"
+        params = [domain]
+        if tool:
+            sql += " AND tool = ?"
+            params.append(tool)
+        if finished:
+            sql += " AND finished_at IS NOT NULL"
+        row = self.conn.execute(sql + " ORDER BY started_at DESC, id DESC LIMIT 1", params).fetchone()
+        return row['id'] if row else None
+
+    def run_info(self, run_id: int) -> Optional[Dict]:
+        """The runs row as a dictionary (analysis decoded), or None."""
+        row = self.conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        info = dict(row)
+        info['analysis'] = json.loads(info['analysis']) if info['analysis'] else None
+        return info
+
+    def _run_rows(self, run_id: int):
+        self.flush()
+        return self.conn.execute(
+            "SELECT h.name, p.* FROM probes p JOIN hosts h ON h.id = p.host_id "
+            "WHERE p.run_id = ? ORDER BY p.seq", (run_id,)
+        )
+
+    def run_results(self, run_id: int) -> List[VerificationResult]:
+        """The subdomain_discovery results of a run, in verification order."""
+        results = []
+        for row in self._run_rows(run_id):
+            http_info = None
+            if row['has_http_info']:
+                http_info = HttpInfo(
+                    accessible=bool(row['accessible']), status_code=row['status_code'],
+                    protocol=row['protocol'], redirect_url=row['redirect_url'],
+                    title=row['title'], error=row['error']
+                )
+            results.append(VerificationResult(
+                subdomain=row['name'], dns_resolves=bool(row['dns_resolves']),
+                is_live=bool(row['is_live']), http_info=http_info, timings=row_timings(row)
+            ))
+        return results
+
+    def check_results(self, run_id: int) -> List[CheckResult]:
+        """The subdomain_checker results of a run, in completion order."""
+        return [
+            CheckResult(subdomain=row['name'], url=row['url'], protocol=row['protocol'],
+                        is_live=bool(row['is_live']), status_code=row['status_code'],
+                        ip=row['ip'], error=row['error'], timings=row_timings(row))
+            for row in self._run_rows(run_id)
+        ]
+
+    def host_metadata(self, run_id: int) -> Dict[str, Dict]:
+        """
+        Per-host probe time (file timestamp format) and A records of a run,
+        in the shape of the "rescan" section of *_results.json.
+        """
+        self.flush()
+        verified_at = {}
+        for row in self.conn.execute(
+                "SELECT h.name, p.probed_at FROM probes p JOIN hosts h ON h.id = p.host_id "
+                "WHERE p.run_id = ?", (run_id,)):
+            verified_at[row['name']] = to_file_timestamp(row['probed_at'])
+        addresses = {}
+        for row in self.conn.execute(
+                "SELECT h.name, d.value FROM dns_records d JOIN hosts h ON h.id = d.host_id "
+                "WHERE d.run_id = ? AND d.type = 'A'", (run_id,)):
+            addresses.setdefault(row['name'], []).append(row['value'])
+        # Hosts probed without any A record resolved to nothing
+        for name in verified_at:
+            addresses.setdefault(name, [])
+        return {'verified_at': verified_at, 'addresses': {k: sorted(v) for k, v in addresses.items()}}
+
+    def query_probes(self, suffix: Optional[str] = None, status_code: Optional[int] = None,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None,
+                     live: Optional[bool] = None, domain: Optional[str] = None,
+                     include_carried: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search probes across every run, newest first.
+
+        Args:
+            suffix: Only hosts at or under this name (e.g. etsit.upm.es)
+            status_code: Only this HTTP status code
+            since: Only probes at or after this time
+            until: Only probes before this time
+            live: Only live (True) or non-live (False) probes
+            domain: Only runs for this domain
+            include_carried: Also return results carried forward by incremental rescans
+            limit: Maximum number of rows
+
+        Returns:
+            List of dictionaries (subdomain, run_id, domain, probed_at and the probe columns)
+        """
+        sql = ("SELECT h.name AS subdomain, r.domain, r.tool, p.run_id, p.probed_at, p.carried, "
+               "p.dns_resolves, p.is_live, p.status_code, p.protocol, p.url, p.ip, "
+               "p.redirect_url, p.title, p.error, p.dns_ms, p.connect_ms, p.tls_ms, p.ttfb_ms "
+               "FROM probes p JOIN hosts h ON h.id = p.host_id JOIN runs r ON r.id = p.run_id WHERE 1")
+        params = []
+        if suffix:
+            reversed_suffix = reverse_name(suffix.strip().rstrip('.').lower())
+            # The name itself, or anything below it ('/' sorts right after '.')
+            sql += " AND (h.reversed = ? OR (h.reversed >= ? AND h.reversed < ?))"
+            params += [reversed_suffix, reversed_suffix + '.', reversed_suffix + '/']
+        if status_code is not None:
+            sql += " AND p.status_code = ?"
+            params.append(status_code)
+        if since is not None:
+            sql += " AND p.probed_at >= ?"
+            params.append(since.strftime(TIME_FORMAT))
+        if until is not None:
+            sql += " AND p.probed_at < ?"
+            params.append(until.strftime(TIME_FORMAT))
+        if live is not None:
+            sql += " AND p.is_live = ?"
+            params.append(int(live))
+        if domain:
+            sql += " AND r.domain = ?"
+            params.append(domain)
+        if not include_carried:
+            sql += " AND p.carried = 0"
+        sql += " ORDER BY p.probed_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        self.flush()
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def host_history(self, suffix: Optional[str] = None) -> Dict[str, Tuple[bool, bool]]:
+        """
+        What the latest run that probed each host saw, e.g. for ordering
+        the next scan by likely liveness.
+
+        Args:
+            suffix: Only hosts at or under this name (default: every host)
+
+        Returns:
+            Dictionary host name -> (resolved, live), where each is true if
+            any probe of the host in that run saw it (a checker probe counts
+            as resolved when it found an IP)
+        """
+        sql = ("SELECT h.name, max(coalesce(p.dns_resolves, p.ip IS NOT NULL)) AS resolved, "
+               "max(p.is_live) AS live FROM hosts h JOIN probes p ON p.host_id = h.id "
+               "WHERE p.run_id = (SELECT max(q.run_id) FROM probes q WHERE q.host_id = h.id)")
+        params = []
+        if suffix:
+            reversed_suffix = reverse_name(suffix.strip().rstrip('.').lower())
+            sql += " AND (h.reversed = ? OR (h.reversed >= ? AND h.reversed < ?))"
+            params += [reversed_suffix, reversed_suffix + '.', reversed_suffix + '/']
+        sql += " GROUP BY h.id"
+        self.flush()
+        return {row['name']: (bool(row['resolved']), bool(row['live']))
+                for row in self.conn.execute(sql, params)}
+
+
+def since_days(days: float) -> datetime:
+    """Start time for "the last N days" queries."""
+    return datetime.now() - timedelta(days=days)
@@ -0,0 +1,181 @@
+"""
+Liveness-likelihood ordering of candidate subdomains.
+
+Both verifiers used to probe candidates in discovery (or zone) order, so
+live hosts surfaced at random points of a long scan. LivenessScheduler
+scores every candidate with cheap signals and hands them out best first:
+
+    history    what the last run that probed the host saw (live, resolved,
+               or not even resolving)
+    keywords   high-value keyword hits (AssetAnalyzer's matcher)
+    labels     first labels that are usually served (www, portal, ...) vs.
+               ones that usually are not (dev, test, old, ...), generated
+               names (ip-10-0-0-1, host0042) and very deep names
+
+Complete candidate sets are never copied: they are split into a few
+priority tiers with one byte per name and read again once per tier, in
+their own order (so an on-disk SpilledDomains stays on disk). Streams
+(subfinder output) go through a heap fed by a background thread, so
+verification still starts with the first name and always takes the best
+one discovered so far.
+"""
+import heapq
+import re
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Score contributions
+HISTORY_LIVE = 50
+HISTORY_RESOLVED = 10
+HISTORY_UNRESOLVED = -30
+KEYWORD = 10
+MAX_KEYWORDS = 3
+LIVE_LABEL = 15
+UNLIKELY_LABEL = -10
+GENERATED_LABEL = -10
+DEEP_LABEL = -3
+DEEP_AFTER = 4
+
+# First labels that are usually served over HTTP
+LIVE_LABELS = frozenset({
+    'www', 'web', 'portal', 'intranet', 'mail', 'webmail', 'correo', 'moodle', 'campus',
+    'login', 'sso', 'auth', 'cas', 'vpn', 'api', 'app', 'apps', 'secretaria', 'biblioteca',
+    'blog', 'wiki', 'gitlab', 'git', 'jira', 'static', 'cdn', 'docs', 'admin',
+})
+# Labels that usually name short-lived or internal-only hosts
+UNLIKELY_LABELS = frozenset({
+    'dev', 'test', 'testing', 'old', 'staging', 'stage', 'pre', 'preprod', 'backup', 'bak',
+    'tmp', 'temp', 'demo', 'beta', 'qa', 'uat', 'legacy',
+})
+# ip-10-0-0-1, 10-0-0-1, host0042, pc123456
+GENERATED = re.compile(r'\d+[-.]\d+[-.]\d+|\d{4,}')
+
+# Tier lower bounds, best first; the last tier takes every lower score
+TIER_SCORES = (60, 40, 25, 15, 5, 0, -15)
+
+
+class LivenessScheduler:
+    """Orders candidate subdomains by how likely they are to be live."""
+
+    def __init__(self, history: Optional[Dict[str, Tuple[bool, bool]]] = None,
+                 keywords: Optional[Callable[[str], List[str]]] = None):
+        """
+        Args:
+            history: Host name -> (resolved, live) from the previous run
+                     (ResultStore.host_history or a results file)
+            keywords: Returns the high-value keywords a name matches
+                      (e.g. KeywordMatcher.find from recon_common.keyword_matcher)
+        """
+        self.history = history or {}
+        self.keywords = keywords
+
+    def score(self, name: str) -> int:
+        """Liveness score of one candidate (higher is probed earlier)."""
+        score = 0
+        seen = self.history.get(name)
+        if seen is not None:
+            resolved, live = seen
+            score += HISTORY_LIVE if live else HISTORY_RESOLVED if resolved else HISTORY_UNRESOLVED
+
+        if self.keywords is not None:
+            score += KEYWORD * min(len(self.keywords(name)), MAX_KEYWORDS)
+
+        labels = name.split('.')
+        first = labels[0]
+        if first in LIVE_LABELS:
+            score += LIVE_LABEL
+        elif any(part in UNLIKELY_LABELS for part in re.split(r'[-_]', first)):
+            score += UNLIKELY_LABEL
+        if GENERATED.search(first):
+            score += GENERATED_LABEL
+        if len(labels) > DEEP_AFTER:
+            score += DEEP_LABEL * (len(labels) - DEEP_AFTER)
+        return score
+
+    def tier(self, name: str) -> int:
+        """Index of the priority tier of a candidate (0 is probed first)."""
+        score = self.score(name)
+        for index, lower in enumerate(TIER_SCORES):
+            if score >= lower:
+                return index
+        return len(TIER_SCORES)
+
+    def order(self, candidates: Iterable[str]) -> Iterable[str]:
+        """
+        Candidates best first.
+
+        Args:
+            candidates: A complete, re-iterable set (DomainStore,
+                        SpilledDomains, list) or a stream of names
+
+        Returns:
+            For complete sets, a re-iterable with the same len(); for
+            streams, an iterator that starts as soon as the first name
+            arrives
+        """
+        if hasattr(candidates, '__len__'):
+            return TieredCandidates(candidates, self)
+        return self._stream(candidates)
+
+    def _stream(self, names: Iterable[str]) -> Iterator[str]:
+        heap = []
+        ready = threading.Condition()
+        state = {'done': False, 'error': None, 'stop': False}
+
+        def feed():
+            try:
+                for seq, name in enumerate(names):
+                    entry = (-self.score(name), seq, name)
+                    with ready:
+                        if state['stop']:
+                            return
+                        heapq.heappush(heap, entry)
+                        ready.notify()
+            except BaseException as e:
+                state['error'] = e
+            finally:
+                with ready:
+                    state['done'] = True
+                    ready.notify()
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            while True:
+                with ready:
+                    while not heap and not state['done']:
+                        ready.wait()
+                    if not heap:
+                        break
+                    name = heapq.heappop(heap)[2]
+                yield name
+        finally:
+            with ready:
+                state['stop'] = True
+        feeder.join()
+        if state['error'] is not None:
+            raise state['error']
+
+
+class TieredCandidates:
+    """A complete candidate set read back tier by tier (one byte of state per name)."""
+
+    def __init__(self, candidates: Iterable[str], scheduler: LivenessScheduler):
+        self.candidates = candidates
+        self.tiers = bytearray(scheduler.tier(name) for name in candidates)
+        self.counts = [self.tiers.count(tier) for tier in range(len(TIER_SCORES) + 1)]
+
+    def __len__(self) -> int:
+        return len(self.tiers)
+
+    def __iter__(self) -> Iterator[str]:
+        tiers = self.tiers
+        for tier, count in enumerate(self.counts):
+            if not count:
+                continue
+            for index, name in enumerate(self.candidates):
+                if tiers[index] == tier:
+                    yield name
+                    count -= 1
+                    if not count:
+                        break
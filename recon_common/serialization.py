@@ -0,0 +1,405 @@
+"""
+Compact result files: streaming writers and auto-detecting readers.
+
+Three encodings, each optionally compressed:
+
+    json   the original indented {"...": ..., "results": [...]} document
+           (same bytes as json.dump(..., indent=N))
+    jsonl  one compact record per line; document-level fields go on
+           {"_meta": {...}} lines before and/or after the records
+    bin    b"RCNB\\x01\\n" followed by pickle frames of plain containers:
+           {"_meta": {...}} dictionaries and lists of up to CHUNK_SIZE
+           records. Frames are loaded with a restricted unpickler that
+           refuses every class, so reading a file never runs code
+
+Compression is chosen by suffix when writing (.gz with gzip, .zst with
+zstd, which needs the optional `zstandard` package) and recognised from
+the magic bytes when reading, as are the encodings, so readers accept
+any of them whatever the file is called.
+"""
+import gzip
+import io
+import json
+import pickle
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from recon_common.records import Record, to_serializable
+
+ENCODINGS = ('json', 'jsonl', 'bin')
+COMPRESSIONS = {'gz': 'gzip', 'zst': 'zstd'}
+
+BINARY_MAGIC = b'RCNB\x01\n'
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Records per pickle frame in the binary encoding
+CHUNK_SIZE = 1024
+# gzip level: 6 keeps most of the size gain of 9 at a fraction of the time
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+META_KEY = '_meta'
+
+_SPEC = re.compile(r'^(json|jsonl|bin)(?:\.(gz|zst))?$')
+_PATH_SUFFIX = re.compile(r'\.(json|jsonl|bin)(?:\.(gz|zst))?$')
+
+
+def parse_format(spec: str) -> Tuple[str, Optional[str]]:
+    """
+    'jsonl.gz' -> ('jsonl', 'gzip'); 'bin' -> ('bin', None)
+
+    Raises:
+        ValueError: Unknown encoding or compression
+    """
+    match = _SPEC.match(spec or '')
+    if not match:
+        raise ValueError(f"Unknown results format: {spec!r} "
+                         f"(expected one of {', '.join(ENCODINGS)}, optionally with .gz or .zst)")
+    encoding, compression = match.groups()
+    return encoding, COMPRESSIONS.get(compression)
+
+
+def format_suffix(spec: str) -> str:
+    """File suffix for a format, e.g. 'jsonl.gz' -> '.jsonl.gz'."""
+    parse_format(spec)
+    return '.' + spec
+
+
+def path_format(path) -> str:
+    """Format implied by a file name ('x.jsonl.zst' -> 'jsonl.zst'); 'json' when there is none."""
+    match = _PATH_SUFFIX.search(str(path))
+    return match.group(0)[1:] if match else 'json'
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression needs the zstandard package (pip install zstandard)") from None
+    return zstandard
+
+
+def path_compression(path) -> Optional[str]:
+    """Compression implied by a file name: 'gzip' for .gz, 'zstd' for .zst, else None."""
+    return COMPRESSIONS.get(Path(path).suffix[1:])
+
+
+class _DeferredFlush(io.RawIOBase):
+    """
+    Writable stream over a compressor whose flush() does nothing: streaming
+    writers flush after every record, and a compressor sync point per
+    record would cost most of the compression. Everything is written on close.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+
+def open_output(path, compression: Optional[str] = None):
+    """Open path for binary writing, compressed with gzip or zstd if requested."""
+    if compression == 'gzip':
+        stream = gzip.open(path, 'wb', compresslevel=GZIP_LEVEL)
+    elif compression == 'zstd':
+        stream = _zstd().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(path, 'wb'), closefd=True)
+    else:
+        return open(path, 'wb')
+    return io.BufferedWriter(_DeferredFlush(stream))
+
+
+def open_input(path):
+    """Open path for binary reading, decompressing gzip or zstd transparently."""
+    f = open(path, 'rb')
+    magic = f.read(4)
+    f.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    if magic == ZSTD_MAGIC:
+        return io.BufferedReader(_zstd().ZstdDecompressor().stream_reader(f, closefd=True))
+    return f
+
+
+def open_text_input(path):
+    """open_input() decoded as UTF-8 text."""
+    return io.TextIOWrapper(open_input(path), encoding='utf-8')
+
+
+def open_text_output(path, compression: Optional[str] = None):
+    """open_output() encoded as UTF-8 text."""
+    return io.TextIOWrapper(open_output(path, compression), encoding='utf-8')
+
+
+# Longest first line inspected when telling JSONL from a JSON document
+DETECT_LINE_LIMIT = 1 << 20
+
+
+def detect_encoding(path) -> str:
+    """
+    Encoding of a results file (after decompression): 'bin', 'jsonl' or
+    'json'. Binary files are told by their magic, '.jsonl' files by their
+    name. Otherwise the file is JSONL when its first line is a complete,
+    newline-terminated JSON object that is a metadata line or is followed
+    by another object; anything else, a compact one-line document included,
+    is a JSON document.
+    """
+    with open_input(path) as f:
+        first = f.readline(DETECT_LINE_LIMIT)
+        if first.startswith(BINARY_MAGIC):
+            return 'bin'
+        if path_format(path).split('.')[0] == 'jsonl':
+            return 'jsonl'
+        if not (first.lstrip().startswith(b'{') and first.endswith(b'\n')):
+            return 'json'
+        try:
+            obj = json.loads(first)
+        except ValueError:
+            return 'json'
+        if not isinstance(obj, dict):
+            return 'json'
+        if list(obj) == [META_KEY]:
+            return 'jsonl'
+        second = f.readline(DETECT_LINE_LIMIT)
+        while second and not second.strip():
+            second = f.readline(DETECT_LINE_LIMIT)
+        return 'jsonl' if second.lstrip().startswith(b'{') else 'json'
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    """Only plain containers and scalars: any class reference is rejected."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a results file")
+
+
+def _plain(value):
+    """value with every slotted record replaced by its dictionary, for pickling."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {name: _plain(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+class ResultWriter:
+    """
+    Stream records to a results file in any of the encodings.
+
+    Usage:
+        with ResultWriter(path, 'jsonl.gz', meta={'domain': d}) as writer:
+            for result in results:
+                writer.write(result)
+            writer.close(meta={'analysis': analysis})
+    """
+
+    def __init__(self, target, spec: str = 'json', meta: Optional[Dict] = None,
+                 key: str = 'results', indent: Optional[int] = 2):
+        """
+        Args:
+            target: Output path, or an open file (binary for 'bin'; text or
+                    binary otherwise, compression is then up to the caller)
+            spec: Format, e.g. 'json', 'jsonl.gz', 'bin.zst'
+            meta: Document fields written before the records
+            key: Name of the record list in the json encoding
+            indent: Indentation of the json encoding
+        """
+        self.encoding, compression = parse_format(spec)
+        self.key = key
+        self.indent = indent
+        self.count = 0
+        self._closed = False
+        self._chunk = []
+        # One encoder per writer: json.dumps(default=...) builds a new one per call
+        self._encoder = json.JSONEncoder(indent=indent if self.encoding == 'json' else None,
+                                         default=to_serializable)
+        self._separator = ',' if indent is not None else ', '
+
+        if isinstance(target, (str, Path)):
+            raw = open_output(target, compression)
+            self._owned = True
+        else:
+            raw = target
+            self._owned = False
+        if self.encoding != 'bin' and not isinstance(raw, io.TextIOBase):
+            raw = io.TextIOWrapper(raw, encoding='utf-8')
+        self._f = raw
+
+        if self.encoding == 'bin':
+            self._f.write(BINARY_MAGIC)
+            if meta:
+                pickle.dump({META_KEY: _plain(meta)}, self._f, protocol=pickle.HIGHEST_PROTOCOL)
+        elif self.encoding == 'jsonl':
+            if meta:
+                self._f.write(json.dumps({META_KEY: meta}, default=to_serializable) + '\n')
+        else:
+            self._f.write('{')
+            for name, value in (meta or {}).items():
+                self._f.write(self._json_field(name, value) + self._separator)
+            self._f.write(self._json_break(1) + json.dumps(key) + ': [')
+
+    def __enter__(self) -> 'ResultWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _json_break(self, depth: int) -> str:
+        return '\n' + ' ' * (self.indent * depth) if self.indent is not None else ''
+
+    def _json_value(self, value, depth: int) -> str:
+        text = self._encoder.encode(value)
+        # Escaped strings never contain a raw newline, so this only re-indents structure
+        return text.replace('\n', self._json_break(depth)) if self.indent is not None else text
+
+    def _json_field(self, name: str, value) -> str:
+        return self._json_break(1) + json.dumps(name) + ': ' + self._json_value(value, 1)
+
+    def write(self, record):
+        """Append one record (dictionary or slotted record)."""
+        self.count += 1
+        if self.encoding == 'jsonl':
+            self._f.write(self._encoder.encode(record) + '\n')
+        else:
+            self._chunk.append(_plain(record) if self.encoding == 'bin' else record)
+            if len(self._chunk) >= CHUNK_SIZE:
+                self._flush_chunk()
+
+    def write_many(self, records: Iterable) -> int:
+        """Append every record; returns how many were written."""
+        before = self.count
+        for record in records:
+            self.write(record)
+        return self.count - before
+
+    def _flush_chunk(self):
+        if not self._chunk:
+            return
+        if self.encoding == 'bin':
+            pickle.dump(self._chunk, self._f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            # Encoding the chunk as one list is much cheaper than one encode()
+            # per record; the list's brackets are dropped and its items kept
+            text = self._json_value(self._chunk, 1)
+            written = self.count - len(self._chunk)
+            items = text[1:-len(self._json_break(1)) - 1]
+            self._f.write((self._separator if written else '') + items)
+        self._chunk = []
+
+    def flush(self):
+        """Push buffered records to the file (e.g. for a reader tailing it; not for compressed files)."""
+        self._flush_chunk()
+        self._f.flush()
+
+    def close(self, meta: Optional[Dict] = None):
+        """
+        Finish the file.
+
+        Args:
+            meta: Document fields written after the records (e.g. totals
+                  only known at the end)
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.encoding == 'bin':
+            self._flush_chunk()
+            if meta:
+                pickle.dump({META_KEY: _plain(meta)}, self._f, protocol=pickle.HIGHEST_PROTOCOL)
+        elif self.encoding == 'jsonl':
+            if meta:
+                self._f.write(json.dumps({META_KEY: meta}, default=to_serializable) + '\n')
+        else:
+            self._flush_chunk()
+            self._f.write((self._json_break(1) + ']') if self.count else ']')
+            for name, value in (meta or {}).items():
+                self._f.write(self._separator + self._json_field(name, value))
+            self._f.write(self._json_break(0) + '}')
+        if self._owned:
+            self._f.close()
+        else:
+            self._f.flush()
+
+
+def _iter_frames(path, key: str) -> Iterator[Tuple[str, Any]]:
+    """('meta', dict) and ('record', record) items of a results file, in file order."""
+    encoding = detect_encoding(path)
+    with open_input(path) as f:
+        if encoding == 'bin':
+            f.read(len(BINARY_MAGIC))
+            while True:
+                try:
+                    # One unpickler per frame: each frame has its own memo
+                    frame = _PlainUnpickler(f).load()
+                except EOFError:
+                    return
+                if isinstance(frame, dict):
+                    yield 'meta', frame.get(META_KEY, {})
+                else:
+                    for record in frame:
+                        yield 'record', record
+        elif encoding == 'jsonl':
+            for line in io.TextIOWrapper(f, encoding='utf-8'):
+                if not line.strip():
+                    continue
+                obj = json.loads(line)
+                if isinstance(obj, dict) and len(obj) == 1 and META_KEY in obj:
+                    yield 'meta', obj[META_KEY]
+                else:
+                    yield 'record', obj
+        else:
+            text = io.TextIOWrapper(f, encoding='utf-8').read()
+            if not text.strip():
+                # An empty JSONL file (nothing was written)
+                return
+            data = json.loads(text)
+            if isinstance(data, list):
+                for record in data:
+                    yield 'record', record
+                return
+            yield 'meta', {name: value for name, value in data.items() if name != key}
+            for record in data.get(key, ()):
+                yield 'record', record
+
+
+def iter_records(path, key: str = 'results') -> Iterator[Dict]:
+    """
+    Records of a results file in any encoding/compression, read lazily
+    (json documents are parsed whole).
+
+    Args:
+        path: Results file
+        key: Name of the record list in json documents
+    """
+    for kind, value in _iter_frames(path, key):
+        if kind == 'record':
+            yield value
+
+
+def read_document(path, key: str = 'results') -> Dict:
+    """
+    Load a results file in any encoding/compression as the original
+    document shape: its fields plus the records under `key`.
+    """
+    document = {}
+    records = []
+    for kind, value in _iter_frames(path, key):
+        if kind == 'record':
+            records.append(value)
+        else:
+            document.update(value)
+    document[key] = records
+    return document
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Checks of DomainStore against a plain set of names
+
+Run with: python -m pytest recon_common/test_domain_store.py
+      or: python recon_common/test_domain_store.py
+"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from recon_common.domain_store import DomainStore
+from recon_common.external_sort import sort_key
+
+
+def random_names(seed, count=2000):
+    """Names over few labels, so that many share suffixes and some are parents of others."""
+    rng = random.Random(seed)
+    labels = ['www', 'mail', 'vpn', 'a', 'b', 'etsit', 'upm', 'es', 'com']
+    return ['.'.join(rng.choice(labels) for _ in range(rng.randint(1, 4))) for _ in range(count)]
+
+
+def ordered(names):
+    return sorted(set(names), key=sort_key)
+
+
+def test_iterates_every_name_once_in_reversed_label_order():
+    for seed in range(5):
+        names = random_names(seed)
+        store = DomainStore(names)
+        assert len(store) == len(set(names))
+        assert list(store) == ordered(names)
+
+
+def test_parent_comes_before_its_children():
+    store = DomainStore(['www.etsit.upm.es', 'upm.es', 'etsit.upm.es', 'b.upm.es', 'a.etsit.upm.es', 'es'])
+    assert list(store) == ['es', 'upm.es', 'b.upm.es', 'etsit.upm.es', 'a.etsit.upm.es', 'www.etsit.upm.es']
+
+
+def test_names_are_normalised():
+    store = DomainStore()
+    assert store.add('WWW.UPM.ES.')
+    assert not store.add(' www.upm.es ')
+    assert 'www.upm.es.' in store and 'Www.Upm.Es' in store
+    assert list(store) == ['www.upm.es']
+
+
+def test_empty_names_are_ignored():
+    store = DomainStore()
+    assert not store.add('')
+    assert not store.add('.')
+    assert not store.add('   ')
+    assert len(store) == 0 and list(store) == []
+    assert '' not in store
+    assert not store.discard('')
+
+
+def test_membership_of_inner_nodes():
+    store = DomainStore(['www.etsit.upm.es'])
+    assert 'www.etsit.upm.es' in store
+    # Labels on the way to a stored name are not names themselves
+    assert 'etsit.upm.es' not in store and 'es' not in store
+    assert 'x.www.etsit.upm.es' not in store
+
+
+def test_under_matches_a_suffix_filter():
+    names = random_names(7)
+    store = DomainStore(names)
+    for suffix in ('upm.es', 'es', 'www.upm.es', 'a.b', 'nothing.here', 'www'):
+        expected = [n for n in ordered(names) if n == suffix or n.endswith('.' + suffix)]
+        assert list(store.under(suffix)) == expected
+        assert list(store.under(suffix, include_self=False)) == [n for n in expected if n != suffix]
+        assert store.count_under(suffix) == len(expected)
+    assert list(store.under('')) == ordered(names)
+
+
+def test_children_are_the_subtrees_one_label_below():
+    store = DomainStore(['www.etsit.upm.es', 'upm.es', 'mail.upm.es', 'vpn.com'])
+    assert store.children() == ['com', 'es']
+    assert store.children('upm.es') == ['etsit.upm.es', 'mail.upm.es']
+    assert store.children('mail.upm.es') == []
+    assert store.children('missing.es') == []
+
+
+def test_discard_matches_a_set():
+    for seed in range(5):
+        rng = random.Random(seed)
+        names = random_names(seed, 500)
+        store, expected = DomainStore(names), set(names)
+        for name in rng.sample(names, 300) + ['missing.name', 'upm']:
+            assert store.discard(name) == (name in expected)
+            expected.discard(name)
+            assert len(store) == len(expected)
+        assert list(store) == ordered(expected)
+        # Pruned branches take new names again
+        assert store.update(names) == len(set(names)) - len(expected)
+        assert list(store) == ordered(names)
+
+
+def test_copy_is_independent():
+    store = DomainStore(['www.upm.es', 'upm.es'])
+    copy = store.copy()
+    copy.add('mail.upm.es')
+    copy.discard('upm.es')
+    assert list(store) == ['upm.es', 'www.upm.es']
+    assert list(copy) == ['mail.upm.es', 'www.upm.es']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Checks of the spill-to-disk dedupe and sort against an in-memory DomainStore
+
+Run with: python -m pytest recon_common/test_external_sort.py
+      or: python recon_common/test_external_sort.py
+"""
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from recon_common import external_sort
+from recon_common.domain_store import DomainStore
+from recon_common.external_sort import DomainCollector, SpilledDomains, collect_domains, sort_key
+
+# A few entries per run, so that any input spills
+TINY_BUDGET_MB = 0.001
+
+
+def random_names(seed, count=3000):
+    """Names with repeats, mixed case and trailing dots, spread over every run."""
+    rng = random.Random(seed)
+    labels = ['www', 'mail', 'vpn', 'a', 'b', 'etsit', 'upm', 'es', 'com']
+    names = ['.'.join(rng.choice(labels) for _ in range(rng.randint(1, 4))) for _ in range(count)]
+    return [rng.choice([name, name.upper(), name + '.']) for name in names]
+
+
+def expected(names):
+    return sorted({name.lower().rstrip('.') for name in names}, key=sort_key)
+
+
+@contextmanager
+def max_fan_in(value):
+    saved = external_sort.MAX_FAN_IN
+    external_sort.MAX_FAN_IN = value
+    try:
+        yield
+    finally:
+        external_sort.MAX_FAN_IN = saved
+
+
+def test_spilled_output_matches_the_in_memory_store():
+    names = random_names(1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collector = DomainCollector(memory_budget_mb=TINY_BUDGET_MB, tmp_dir=tmp_dir)
+        collector.update(names)
+        assert collector.spilled
+        result = collector.finish()
+        try:
+            assert isinstance(result, SpilledDomains)
+            assert list(result) == list(DomainStore(names)) == expected(names)
+            assert len(result) == len(expected(names))
+            # Iterating twice reads the merged file again
+            assert list(result) == list(result.copy())
+        finally:
+            result.close()
+
+
+def test_merge_in_several_passes():
+    names = random_names(2)
+    with tempfile.TemporaryDirectory() as tmp_dir, max_fan_in(3):
+        result = collect_domains(names, memory_budget_mb=TINY_BUDGET_MB, tmp_dir=tmp_dir)
+        try:
+            assert list(result) == expected(names)
+            assert len(result) == len(expected(names))
+            # Only the final merge is left in the work directory
+            assert os.listdir(os.path.dirname(result.path)) == ['merged.txt']
+        finally:
+            result.close()
+
+
+def test_close_removes_the_runs():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = collect_domains(random_names(3, 500), memory_budget_mb=TINY_BUDGET_MB, tmp_dir=tmp_dir)
+        assert os.listdir(tmp_dir)
+        result.close()
+        assert os.listdir(tmp_dir) == []
+
+
+def test_without_budget_nothing_spills():
+    names = random_names(4)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = collect_domains(names, memory_budget_mb=None, tmp_dir=tmp_dir)
+        assert isinstance(result, DomainStore)
+        assert list(result) == expected(names)
+        assert os.listdir(tmp_dir) == []
+
+
+def test_empty_names_are_not_collected():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result = collect_domains(['', '.', 'upm.es', ''] * 50, memory_budget_mb=TINY_BUDGET_MB, tmp_dir=tmp_dir)
+        assert isinstance(result, DomainStore)
+        assert list(result) == ['upm.es']
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
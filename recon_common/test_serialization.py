@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Checks of the results file encodings, mainly how a file's encoding is detected
+
+Run with: python -m pytest recon_common/test_serialization.py
+      or: python recon_common/test_serialization.py
+"""
+import gzip
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from recon_common.serialization import ResultWriter, detect_encoding, iter_records, read_document
+
+RECORDS = [{'subdomain': 'www.upm.es', 'is_live': True}, {'subdomain': 'vpn.upm.es', 'is_live': False}]
+DOCUMENT = {'domain': 'upm.es', 'total_discovered': 2, 'results': RECORDS}
+
+
+def written(name, write):
+    """Path of a file called `name` in a fresh temporary directory, filled by write(path)."""
+    path = Path(tempfile.mkdtemp()) / name
+    write(path)
+    return path
+
+
+def text(content):
+    return lambda path: path.write_text(content)
+
+
+def test_compact_json_document_is_not_jsonl():
+    # json.dump() without indent, or jq -c: one line, newline-terminated
+    for name in ('results.json', 'results'):
+        path = written(name, text(json.dumps(DOCUMENT) + '\n'))
+        assert detect_encoding(path) == 'json'
+        assert read_document(path) == DOCUMENT
+
+
+def test_compressed_compact_document_is_not_jsonl():
+    path = written('results.json.gz', lambda p: p.write_bytes(gzip.compress((json.dumps(DOCUMENT) + '\n').encode())))
+    assert detect_encoding(path) == 'json'
+    assert list(iter_records(path)) == RECORDS
+
+
+def test_jsonl_is_detected_by_content():
+    for name in ('results.json', 'results.txt'):
+        path = written(name, text(''.join(json.dumps(record) + '\n' for record in RECORDS)))
+        assert detect_encoding(path) == 'jsonl'
+        assert list(iter_records(path)) == RECORDS
+
+
+def test_jsonl_extension_decides_a_single_record():
+    path = written('results.jsonl', text(json.dumps(RECORDS[0]) + '\n'))
+    assert detect_encoding(path) == 'jsonl'
+    assert list(iter_records(path)) == RECORDS[:1]
+
+
+def test_written_files_read_back():
+    for spec in ('json', 'jsonl', 'bin', 'jsonl.gz'):
+        def write(path):
+            with ResultWriter(path, spec, meta={'domain': 'upm.es'}) as writer:
+                writer.write_many(RECORDS)
+                writer.close(meta={'total_discovered': 2})
+        # Named without a suffix, so only the content tells the encoding
+        path = written('results', write)
+        assert detect_encoding(path) == spec.split('.')[0]
+        assert read_document(path) == DOCUMENT
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
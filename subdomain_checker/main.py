@@ -19,6 +19,16 @@ warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 from logger import setup_logger
 from crtsh_scraper import CrtShScraper
 from subdomain_verifier import SubdomainVerifier
+# subdomain_verifier puts the repository root on sys.path
+from recon_common.result_store import ResultStore
+from recon_common.keyword_matcher import KeywordMatcher
+from recon_common.replay import ResponseArchive, DEFAULT_BODY_LIMIT
+from recon_common.scheduling import LivenessScheduler
+from recon_common.deadline import ScanDeadline, parse_duration
+from recon_common.latency import AdaptiveTimeouts, PhaseTimings
+from recon_common.metrics import MetricsExporter
+from recon_common.profiling import StageProfiler, stage
+from recon_common.serialization import ResultWriter, open_text_output, parse_format, path_format
 
 
 def load_config(config_path: str = "config/config.yaml") -> Dict:
@@ -44,9 +54,21 @@ def load_config(config_path: str = "config/config.yaml") -> Dict:
 
 import json
 
+def timings_summary(results: list) -> Dict:
+    """Per-phase (dns, connect, tls, ttfb) timings of all the checks."""
+    timings = PhaseTimings()
+    for result in results:
+        timings.add(result['timings'])
+    return timings.summary()
+
+
 def save_results(live_results: list, output_file: str):
     """
-    Save live subdomain results to a file in JSON or TXT format
+    Save live subdomain results to a file in JSON, JSONL, binary or TXT format
+    
+    The format follows the extension: .txt (URLs), .jsonl or .bin (one
+    {"url", "ips"} record per live URL), anything else the {url: [ip]}
+    JSON document. A further .gz or .zst compresses the file.
     
     Args:
         live_results: List of result dictionaries
@@ -55,8 +77,15 @@ def save_results(live_results: list, output_file: str):
     try:
         # Determine format based on extension
         is_json = not output_file.lower().endswith('.txt')
+        spec = path_format(output_file)
+        encoding, compression = parse_format(spec)
         
-        if is_json:
+        if is_json and encoding != 'json':
+            with ResultWriter(output_file, spec) as writer:
+                for r in live_results:
+                    ip = r.get('ip')
+                    writer.write({'url': r['url'], 'ips': [ip] if ip else []})
+        elif is_json:
             output_data = {}
             for r in live_results:
                 url = r['url']
@@ -66,7 +95,7 @@ def save_results(live_results: list, output_file: str):
                 else:
                     output_data[url] = []
 
-            with open(output_file, 'w', encoding='utf-8') as f:
+            with open_text_output(output_file, compression) as f:
                 json.dump(output_data, f, indent=4)
         else:
             # TXT format: just the URLs, one per line
@@ -91,6 +120,11 @@ Ejemplos de uso:
   %(prog)s -q "%%.google.com"             # Buscar subdominios de google.com
   %(prog)s -q "%%.upm.es" -o results.json # Especificar archivo de salida
   %(prog)s -c mi_config.yaml              # Usar archivo de configuración personalizado
+  %(prog)s --export-run 3 -o run3.json    # Exportar una ejecución guardada en result_store
+  %(prog)s --record upm.archive           # Guardar las respuestas de red (crt.sh, IP, HTTP)
+  %(prog)s --replay upm.archive           # Repetir la ejecución sin tocar la red
+  %(prog)s --deadline 20m                 # Terminar en 20 minutos (resultados parciales si hace falta)
+  %(prog)s --profile perfil/              # Perfil de CPU y memoria por etapa (flame graphs)
         """
     )
     
@@ -119,6 +153,53 @@ Ejemplos de uso:
         action='store_true'
     )
     
+    parser.add_argument(
+        '--export-run',
+        help='Exportar los subdominios activos de una ejecución guardada en result_store (id) y salir',
+        type=int
+    )
+    
+    parser.add_argument(
+        '--deadline',
+        help='Tiempo máximo de la ejecución (ej: 1200, 20m, 1.5h); al acercarse se reducen los '
+             'timeouts y solo se comprueba el primer protocolo (default: scan_deadline de la configuración)',
+        metavar='DURACIÓN'
+    )
+    
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument(
+        '--record',
+        help='Guardar todas las respuestas de red en este archivo de respuestas',
+        metavar='ARCHIVO'
+    )
+    archive_group.add_argument(
+        '--replay',
+        help='Responder desde este archivo de respuestas en lugar de la red',
+        metavar='ARCHIVO'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        help='Publicar las métricas del escaneo (formato de texto de Prometheus) en '
+             'http://127.0.0.1:PUERTO/metrics (default: metrics.port de la configuración)',
+        type=int,
+        metavar='PUERTO'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        help='Reescribir este fichero con las métricas del escaneo cada metrics.interval segundos',
+        metavar='FICHERO'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        help='Perfilar la ejecución por etapas (descubrimiento, verificación, análisis, salida) y guardar '
+             'en este directorio las pilas en formato collapsed (flame graphs), los pstats de cProfile '
+             'y las asignaciones de memoria de cada etapa',
+        metavar='DIRECTORIO'
+    )
+    
     args = parser.parse_args()
     
     # Load configuration
@@ -134,20 +215,97 @@ Ejemplos de uso:
     log_level = getattr(__import__('logging'), config.get('log_level', 'INFO'))
     logger = setup_logger(level=log_level)
     
+    # Global time budget, counted from here (crt.sh search included)
+    deadline = None
+    if args.deadline or config.get('scan_deadline'):
+        try:
+            seconds = parse_duration(args.deadline or config['scan_deadline'])
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        timeout = config['verification_timeout']
+        deadline = ScanDeadline(seconds, timeout * len(config['protocols']), timeout,
+                                config.get('max_workers', 10))
+        logger.info(f"Tiempo límite: {seconds:.0f} s")
+    
+    # Record/replay of the network answers
+    archive = None
+    if args.record or args.replay:
+        try:
+            archive = ResponseArchive(args.record or args.replay, 'record' if args.record else 'replay',
+                                      config.get('archive_body_limit', DEFAULT_BODY_LIMIT))
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    
+    # SQLite history of every run (null in the config disables it).
+    # Replays are re-analyses of a recorded run, not new observations
+    store = (ResultStore(config['result_store'])
+             if config.get('result_store') and not (archive and archive.replaying) else None)
+    
+    if args.export_run is not None:
+        if store is None:
+            logger.error("No hay result_store configurado.")
+            sys.exit(1)
+        info = store.run_info(args.export_run)
+        if info is None or info['tool'] != 'subdomain_checker':
+            logger.error(f"No existe la ejecución {args.export_run} de subdomain_checker.")
+            sys.exit(1)
+        live_results = [r for r in store.check_results(args.export_run) if r['is_live']]
+        logger.info(f"Ejecución {args.export_run} ({info['domain']}, {info['started_at']}): "
+                    f"{len(live_results)} subdominios activos")
+        save_results(live_results, config['output_file'])
+        return
+    
+    # Live metrics of the scan (recon_common.metrics), while it runs
+    metrics = MetricsExporter.from_config(config.get('metrics'), args.metrics_port, args.metrics_file)
+    if metrics is not None:
+        try:
+            metrics.start()
+        except OSError as e:
+            logger.error(f"No se pueden publicar las métricas en el puerto {metrics.port}: {e}")
+            sys.exit(1)
+        if metrics.url:
+            logger.info(f"Métricas en {metrics.url}")
+        if metrics.path:
+            logger.info(f"Métricas en {metrics.path} (cada {metrics.interval:g} s)")
+    
+    # CPU and memory profile of each stage (recon_common.profiling)
+    profiler = StageProfiler(args.profile).start() if args.profile else None
+    try:
+        scan(config, args, logger, deadline, archive, store)
+    finally:
+        if metrics is not None:
+            metrics.close()
+        if profiler is not None:
+            profiler.close()
+            logger.info(f"Perfil por etapas guardado en {profiler.output_dir}:")
+            for line in profiler.summary().splitlines():
+                logger.info(f"  {line}")
+
+
+def scan(config: Dict, args, logger, deadline, archive, store):
+    """Discover, verify and save the live subdomains of config['search_query']."""
     logger.info("="*60)
     logger.info("Subdomain Checker - Iniciando...")
     logger.info("="*60)
     logger.info(f"Query de búsqueda: {config['search_query']}")
     
     # Step 1: Discover subdomains from crt.sh
-    scraper = CrtShScraper(
-        base_url=config['crt_sh_url'],
-        timeout=config['request_timeout'],
-        user_agent=config['user_agent']
-    )
+    with stage('discovery'):
+        scraper = CrtShScraper(
+            base_url=config['crt_sh_url'],
+            timeout=config['request_timeout'],
+            user_agent=config['user_agent'],
+            memory_budget_mb=config.get('memory_budget_mb', 256),
+            spill_dir=config.get('spill_dir'),
+            archive=archive
+        )
     
-    use_json_api = config.get('use_json_api', True)
-    subdomains = scraper.search_subdomains(config['search_query'], use_json_api=use_json_api)
+        use_json_api = config.get('use_json_api', True)
+        subdomains = scraper.search_subdomains(config['search_query'], use_json_api=use_json_api)
+        if archive is not None:
+            archive.flush()
     
     if not subdomains:
         logger.warning("No se encontraron subdominios.")
@@ -165,37 +323,103 @@ Ejemplos de uso:
     # Step 2: Verify which subdomains are live (if not disabled)
     if args.no_verify:
         logger.info("Verificación desactivada. Mostrando solo subdominios descubiertos:")
-        for subdomain in sorted(subdomains):
+        # Already deduplicated and grouped by parent domain (possibly read back from disk)
+        for subdomain in subdomains:
             print(f"  - {subdomain}")
         return
     
-    verifier = SubdomainVerifier(
-        timeout=config['verification_timeout'],
-        protocols=config['protocols'],
-        max_workers=config.get('max_workers', 10)
-    )
+    with stage('probing'):
+        timeout = config['verification_timeout']
+        verifier = SubdomainVerifier(
+            timeout=timeout,
+            protocols=config['protocols'],
+            max_workers=config.get('max_workers', 10),
+            archive=archive,
+            timeouts=AdaptiveTimeouts.from_config(config.get('adaptive_timeouts'),
+                                                  {'connect': timeout, 'tls': timeout, 'ttfb': timeout})
+        )
     
-    results = verifier.verify_subdomains(subdomains)
-    # Get the raw results dicts that have is_live=True
-    live_results = [r for r in results if r['is_live']]
-    live_urls = [r['url'] for r in live_results]
+        # Most likely live first: previous runs in result_store, high-value keywords and label patterns
+        candidates = subdomains
+        if config.get('schedule_by_liveness', True):
+            history = store.host_history(config['search_query'].replace('%.', '')) if store is not None else {}
+            keywords = KeywordMatcher(config.get('high_value_keywords', []),
+                                      label_boundary=config.get('keyword_label_boundary', False))
+            logger.info(f"Ordenando por probabilidad de estar activo ({len(history)} con historial)")
+            candidates = LivenessScheduler(history, keywords.find).order(subdomains)
     
-    # Display results
-    logger.info("="*60)
-    logger.info("RESULTADOS")
-    logger.info("="*60)
-    logger.info(f"Total subdominios descubiertos: {len(subdomains)}")
-    logger.info(f"Total subdominios activos (HTTP 200): {len(live_urls)}")
+        if store is not None:
+            run_id = store.start_run('subdomain_checker', config['search_query'])
+            logger.info(f"Guardando la ejecución {run_id} en {store.path}")
+            try:
+                # Results are inserted in batches while verification runs
+                results = verifier.verify_subdomains(candidates, lambda result: store.add_check(run_id, result),
+                                                     deadline)
+            except BaseException:
+                # No run is left without finished_at
+                store.discard_run(run_id)
+                logger.warning(f"La ejecución {run_id} no terminó; se elimina de {store.path}")
+                raise
+            analysis = {'timings': timings_summary(results)}
+            if deadline is not None:
+                analysis['coverage'] = deadline.coverage(len(subdomains))
+            if verifier.timeouts.observed:
+                analysis['timeouts'] = verifier.timeouts.report()
+            store.finish_run(run_id, len(subdomains), analysis)
+        else:
+            results = verifier.verify_subdomains(candidates, deadline=deadline)
+        if archive is not None:
+            archive.close()
+            logger.info(archive.summary())
+    
+    with stage('analysis'):
+        # Get the raw results dicts that have is_live=True
+        live_results = [r for r in results if r['is_live']]
+        live_urls = [r['url'] for r in live_results]
+    
+        # Display results
+        logger.info("="*60)
+        logger.info("RESULTADOS")
+        logger.info("="*60)
+        logger.info(f"Total subdominios descubiertos: {len(subdomains)}")
+        logger.info(f"Total subdominios activos (HTTP 200): {len(live_urls)}")
+        if deadline is not None:
+            coverage = deadline.coverage(len(subdomains))
+            probes = coverage['probes']
+            logger.info(f"Cobertura: {coverage['verified']}/{coverage['candidates']} subdominios verificados "
+                        f"({coverage['coverage_percentage']:.1f}%) en {coverage['elapsed_seconds']:.0f} s de "
+                        f"{coverage['deadline_seconds']:.0f} s; {probes['reduced']} con timeouts reducidos, "
+                        f"{probes['essential']} solo con {config['protocols'][0]}")
+            if coverage['deadline_reached']:
+                logger.warning(f"Resultados parciales: {coverage['unverified']} subdominios sin verificar")
+        timings = timings_summary(results)
+        if timings['phases']:
+            logger.info(f"Tiempo por fase ({timings['probes']} comprobaciones):")
+            for phase, row in timings['phases'].items():
+                logger.info(f"  {phase:<8} media {row['mean_ms']:.0f} ms, p50 {row['p50_ms']:.0f} ms, "
+                            f"p95 {row['p95_ms']:.0f} ms, p99 {row['p99_ms']:.0f} ms, máx {row['max_ms']:.0f} ms "
+                            f"({row['share_percentage']:.1f}% del tiempo)")
+        if verifier.timeouts.observed:
+            report = verifier.timeouts.report()
+            kind = (f"adaptativos, p{report['percentile']:g} x {report['multiplier']:g}" if report['adaptive']
+                    else "fijos")
+            logger.info(f"Timeouts por fase ({kind}):")
+            for row in report['phases']:
+                p50 = '-' if row['p50_ms'] is None else f"{row['p50_ms']:.0f} ms"
+                p99 = '-' if row['p99_ms'] is None else f"{row['p99_ms']:.0f} ms"
+                logger.info(f"  {row['phase']:<8} {row['timeout']:.2f} s (p50 {p50}, p99 {p99}, "
+                            f"{row['count']} respuestas): {row['cut_off']} comprobaciones cortadas")
     
-    if live_urls:
-        logger.info("\nSubdominios activos:")
-        for url in sorted(live_urls):
-            print(f"  ✓ {url}")
+    with stage('output'):
+        if live_urls:
+            logger.info("\nSubdominios activos:")
+            for url in sorted(live_urls):
+                print(f"  ✓ {url}")
         
-        # Save results (pass live_results instead of just URLs)
-        save_results(live_results, config['output_file'])
-    else:
-        logger.warning("No se encontraron subdominios activos.")
+            # Save results (pass live_results instead of just URLs)
+            save_results(live_results, config['output_file'])
+        else:
+            logger.warning("No se encontraron subdominios activos.")
     
     logger.info("\n✓ Proceso completado")
 
@@ -3,19 +3,29 @@ Crt.sh scraper module for subdomain discovery
 """
 import requests
 from bs4 import BeautifulSoup
-from typing import Set, List
+from typing import List
 import time
 import json
 import re
+import sys
+from pathlib import Path
 from logger import setup_logger
 
+# Shared domain store lives in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.domain_store import DomainStore
+from recon_common.external_sort import DomainCollector, collect_domains
+from recon_common.replay import ResponseArchive
+from recon_common.metrics import SOURCE_REQUESTS, SOURCE_REQUEST_DURATION, SUBDOMAINS_DISCOVERED
+
 logger = setup_logger()
 
 
 class CrtShScraper:
     """Scraper for crt.sh certificate transparency logs"""
     
-    def __init__(self, base_url: str = "https://crt.sh/", timeout: int = 30, user_agent: str = None):
+    def __init__(self, base_url: str = "https://crt.sh/", timeout: int = 30, user_agent: str = None,
+                 memory_budget_mb: float = 256, spill_dir: str = None, archive: ResponseArchive = None):
         """
         Initialize the scraper
         
@@ -23,16 +33,26 @@ class CrtShScraper:
             base_url: Base URL for crt.sh
             timeout: Request timeout in seconds
             user_agent: Custom User-Agent header
+            memory_budget_mb: Memory for discovered names before they are
+                              deduplicated on disk instead (None: never spill)
+            spill_dir: Directory for the on-disk runs (system temp by default)
+            archive: Optional response archive that records the names found
+                     per query, or replays them without querying crt.sh
         """
         self.base_url = base_url
         self.timeout = timeout
+        self.memory_budget_mb = memory_budget_mb
+        self.spill_dir = spill_dir
+        self.archive = archive
         self.headers = {
             'User-Agent': user_agent or 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # Responses already fetched, keyed by (query, use_json_api)
+        self._cache = {}
     
-    def search_subdomains(self, query: str, use_json_api: bool = True) -> Set[str]:
+    def search_subdomains(self, query: str, use_json_api: bool = True) -> DomainStore:
         """
         Search for subdomains using crt.sh
         
@@ -41,16 +61,39 @@ class CrtShScraper:
             use_json_api: If True, use JSON API (faster), else scrape HTML
             
         Returns:
-            Set of discovered subdomains
+            DomainStore of discovered subdomains (deduplicated, iterates
+            grouped by parent domain), or SpilledDomains in the same order
+            when they exceeded the memory budget
         """
+        key = (query, use_json_api)
+        if key in self._cache:
+            logger.info(f"Usando resultados en caché para: {query}")
+            return self._cache[key].copy()
+        
+        if self.archive is not None and self.archive.replaying:
+            logger.info(f"Reproduciendo los subdominios guardados para: {query}")
+            names = self.archive.lookup('crtsh', query)
+            if names is None:
+                logger.error(f"No hay resultados de crt.sh para {query} en {self.archive.path}")
+            return collect_domains(names or (), self.memory_budget_mb, self.spill_dir)
+        
         logger.info(f"Buscando subdominios para: {query}")
         
         if use_json_api:
-            return self._search_with_json_api(query)
+            subdomains = self._search_with_json_api(query)
         else:
-            return self._search_with_html_scraping(query)
+            subdomains = self._search_with_html_scraping(query)
+        SUBDOMAINS_DISCOVERED.labels('crtsh').inc(len(subdomains))
+        
+        if self.archive is not None:
+            self.archive.store('crtsh', query, list(subdomains))
+        
+        # Only cache useful answers so a timeout can be retried
+        if subdomains:
+            self._cache[key] = subdomains.copy()
+        return subdomains
     
-    def _search_with_json_api(self, query: str) -> Set[str]:
+    def _search_with_json_api(self, query: str) -> DomainStore:
         """
         Search using crt.sh JSON API (more efficient)
         
@@ -58,19 +101,14 @@ class CrtShScraper:
             query: Search query
             
         Returns:
-            Set of discovered subdomains
+            DomainStore of discovered subdomains
         """
         params = {'q': query, 'output': 'json'}
-        subdomains = set()
+        subdomains = DomainCollector(self.memory_budget_mb, self.spill_dir)
         
         try:
             logger.debug(f"Consultando API JSON de crt.sh...")
-            response = self.session.get(
-                self.base_url,
-                params=params,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
+            response = self._get(params)
             
             # Parse JSON response
             certificates = response.json()
@@ -93,24 +131,25 @@ class CrtShScraper:
                     
                     # Validar que es un dominio válido
                     if self._is_valid_domain(domain):
-                        subdomains.add(domain.lower())
+                        subdomains.add(domain)
             
+            subdomains = subdomains.finish()
             logger.info(f"Subdominios únicos extraídos: {len(subdomains)}")
             return subdomains
             
         except requests.Timeout:
             logger.error(f"Timeout al consultar crt.sh - La búsqueda '{query}' puede ser demasiado amplia")
             logger.info("Sugerencia: Prueba con un query más específico (ej: 'subdomain.domain.com' en vez de '%.domain.com')")
-            return subdomains
+            return subdomains.finish()
         except json.JSONDecodeError as e:
             logger.error(f"Error al parsear JSON: {e}")
             logger.info("Intentando con scraping HTML como alternativa...")
             return self._search_with_html_scraping(query)
         except requests.RequestException as e:
             logger.error(f"Error al consultar crt.sh: {e}")
-            return subdomains
+            return subdomains.finish()
     
-    def _search_with_html_scraping(self, query: str) -> Set[str]:
+    def _search_with_html_scraping(self, query: str) -> DomainStore:
         """
         Search by scraping HTML (fallback method)
         
@@ -118,19 +157,14 @@ class CrtShScraper:
             query: Search query
             
         Returns:
-            Set of discovered subdomains
+            DomainStore of discovered subdomains
         """
         params = {'q': query}
-        subdomains = set()
+        subdomains = DomainStore()
         
         try:
             logger.debug(f"Consultando crt.sh con scraping HTML...")
-            response = self.session.get(
-                self.base_url,
-                params=params,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
+            response = self._get(params)
             
             # Parse HTML con BeautifulSoup
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -145,7 +179,23 @@ class CrtShScraper:
             logger.error(f"Error al hacer scraping HTML: {e}")
             return subdomains
     
-    def extract_subdomains_from_table(self, soup: BeautifulSoup) -> Set[str]:
+    def _get(self, params: dict) -> requests.Response:
+        """Query crt.sh, counting the query and its duration in the source metrics."""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            outcome = 'ok'
+            return response
+        except requests.Timeout:
+            outcome = 'timeout'
+            raise
+        finally:
+            SOURCE_REQUESTS.labels('crtsh', outcome).inc()
+            SOURCE_REQUEST_DURATION.labels('crtsh').observe(time.perf_counter() - start)
+    
+    def extract_subdomains_from_table(self, soup: BeautifulSoup) -> DomainStore:
         """
         Extract subdomains from HTML table
         
@@ -153,16 +203,16 @@ class CrtShScraper:
             soup: BeautifulSoup object with parsed HTML
             
         Returns:
-            Set of subdomain names
+            DomainStore (or SpilledDomains) of subdomain names
         """
-        subdomains = set()
+        subdomains = DomainCollector(self.memory_budget_mb, self.spill_dir)
         
         # Buscar todas las tablas
         tables = soup.find_all('table')
         
         if not tables:
             logger.warning("No se encontraron tablas en el HTML")
-            return subdomains
+            return subdomains.finish()
         
         logger.debug(f"Encontradas {len(tables)} tablas en el HTML")
         
@@ -181,9 +231,9 @@ class CrtShScraper:
                     if self._is_valid_domain(text):
                         if text.startswith('*.'):
                             text = text[2:]
-                        subdomains.add(text.lower())
+                        subdomains.add(text)
         
-        return subdomains
+        return subdomains.finish()
     
     def _is_valid_domain(self, domain: str) -> bool:
         """
@@ -3,17 +3,34 @@ Subdomain verifier module
 """
 import requests
 import socket
-from typing import List, Dict, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Set, Iterable, Iterator, Callable, Optional
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from logger import setup_logger
 
+# Shared record types live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.records import CheckResult
+from recon_common.replay import ResponseArchive
+from recon_common.deadline import ScanDeadline, ProbePlan, FULL_PLAN
+from recon_common.latency import AdaptiveTimeouts, TimedAdapter, probe_timing, record_phase
+from recon_common.metrics import (PROBE_TIMEOUTS, PROBES_IN_FLIGHT, CANDIDATES_REMAINING, record_probe,
+                                  submit_queued)
+
 logger = setup_logger()
 
+# Label of this tool's series in the shared probe metrics
+TOOL = 'subdomain_checker'
+
 
 class SubdomainVerifier:
     """Verifies which subdomains are live and return HTTP 200"""
     
-    def __init__(self, timeout: int = 3, max_workers: int = 10, protocols: List[str] = None):
+    def __init__(self, timeout: int = 3, max_workers: int = 10, protocols: List[str] = None,
+                 archive: ResponseArchive = None, timeouts: AdaptiveTimeouts = None):
         """
         Initialize the verifier
         
@@ -21,50 +38,84 @@ class SubdomainVerifier:
             timeout: Request timeout in seconds
             max_workers: Maximum number of concurrent threads
             protocols: List of protocols to check (e.g., ['http', 'https'])
+            archive: Optional response archive that records every IP lookup
+                     and HTTP response, or replays them offline
+            timeouts: Per-phase (connect, tls, ttfb) timeouts, adapted to
+                      the observed latencies; fixed at timeout when omitted
         """
         self.timeout = timeout
         self.max_workers = max_workers
         self.protocols = protocols or ['https', 'http']
+        self.timeouts = timeouts or AdaptiveTimeouts(
+            {'connect': timeout, 'tls': timeout, 'ttfb': timeout}, enabled=False)
         self.session = requests.Session()
+        # Times the connect, TLS and TTFB phases of each check
+        adapter = TimedAdapter()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
         })
+        self.archive = archive
+        self._get = self.session.get if archive is None else partial(archive.fetch, self.session.get)
     
-    def check_subdomain(self, subdomain: str, protocol: str = 'https') -> Dict[str, any]:
+    def resolve_ip(self, subdomain: str) -> Optional[str]:
+        """
+        Resolve the IPv4 address of a subdomain
+        
+        Args:
+            subdomain: The subdomain to resolve
+            
+        Returns:
+            IP address, or None if it does not resolve
+        """
+        def lookup():
+            start = time.perf_counter()
+            try:
+                ip = socket.gethostbyname(subdomain)
+            except socket.error:
+                ip = None
+            elapsed = time.perf_counter() - start
+            if ip is not None:
+                self.timeouts.observe('dns', elapsed)
+            record_phase('dns', elapsed)
+            return ip
+        
+        if self.archive is not None:
+            return self.archive.call('ip', subdomain, lookup)
+        return lookup()
+    
+    def check_subdomain(self, subdomain: str, protocol: str = 'https',
+                        plan: ProbePlan = FULL_PLAN) -> CheckResult:
         """
         Check if a subdomain is live
         
         Args:
             subdomain: The subdomain to check
             protocol: Protocol to use (http or https)
+            plan: Probe plan of a scan with a deadline (shrinks the timeouts)
             
         Returns:
-            Dictionary with check results
+            CheckResult record (dict-style access, to_dict() for JSON),
+            with the time spent in each phase in timings
         """
         url = f"{protocol}://{subdomain}"
-        result = {
-            'subdomain': subdomain,
-            'url': url,
-            'protocol': protocol,
-            'is_live': False,
-            'status_code': None,
-            'ip': None,
-            'error': None
-        }
-        
+        result = CheckResult(subdomain=subdomain, url=url, protocol=protocol)
+        start = time.perf_counter()
+        with PROBES_IN_FLIGHT.labels(TOOL).track_inprogress(), probe_timing() as timing:
+            self._check(result, plan)
+        result['timings'] = timing.milliseconds()
+        outcome = 'error' if result['error'] else 'live' if result['is_live'] else 'not_live'
+        record_probe(TOOL, outcome, time.perf_counter() - start, result['timings'])
+        return result
+    
+    def _check(self, result: CheckResult, plan: ProbePlan):
+        url = result['url']
         try:
             # Resolve IP first
-            try:
-                result['ip'] = socket.gethostbyname(subdomain)
-            except socket.error:
-                pass
+            result['ip'] = self.resolve_ip(result['subdomain'])
 
-            response = self.session.get(
-                url,
-                timeout=self.timeout,
-                allow_redirects=True,
-                verify=False  # Ignorar errores SSL para testing
-            )
+            response = self._fetch(url, plan)
             
             result['status_code'] = response.status_code
             result['is_live'] = (response.status_code == 200)
@@ -77,15 +128,107 @@ class SubdomainVerifier:
         except requests.RequestException as e:
             result['error'] = str(e)
             logger.debug(f"✗ {url} - Error: {e}")
+    
+    def _fetch(self, url: str, plan: ProbePlan) -> requests.Response:
+        """GET a URL with per-phase timeouts, feeding its phase latencies back to them."""
+        limits = {phase: plan.timeout(self.timeouts.timeout(phase)) for phase in ('connect', 'tls', 'ttfb')}
+        with probe_timing(limits['tls']) as timing:
+            try:
+                return self._get(
+                    url,
+                    timeout=(limits['connect'], limits['ttfb']),
+                    allow_redirects=True,
+                    verify=False  # Ignorar errores SSL para testing
+                )
+            except requests.exceptions.Timeout:
+                if timing.phase is not None:
+                    self.timeouts.cut_off(timing.phase)
+                    PROBE_TIMEOUTS.labels(TOOL, timing.phase).inc()
+                raise
+            finally:
+                self.timeouts.observe_timing(timing)
+                # The time a failed phase took still counts in the result's timings
+                if timing.phase is not None:
+                    timing.stop()
+    
+    def iter_verify(self, subdomains: Iterable[str], executor: ThreadPoolExecutor = None,
+                    deadline: ScanDeadline = None) -> Iterator[Dict[str, any]]:
+        """
+        Verify subdomains concurrently, yielding each result as soon as it completes
         
-        return result
+        Args:
+            subdomains: Iterable of subdomains to verify
+            executor: Optional shared executor (e.g. one budget for several scans);
+                      a private pool of max_workers threads is used otherwise
+            deadline: Optional scan deadline: timeouts shrink and only the
+                      first protocol is checked as it approaches, and no
+                      check is started once it is reached
+            
+        Yields:
+            Result dictionaries in completion order
+        """
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                yield from self.iter_verify(subdomains, executor, deadline)
+            return
+        
+        total = len(subdomains) if hasattr(subdomains, '__len__') else None
+        if total is not None:
+            logger.info(f"Total de verificaciones a realizar: {total * len(self.protocols)}")
+        
+        # Submit lazily with a bounded number of checks in flight, so inputs
+        # read back from disk are never materialised as futures all at once
+        tasks = self._tasks(subdomains, total, deadline)
+        # With a deadline every check starts as soon as it is planned (no
+        # queue), so its shrunk timeout still fits in the time left
+        window = self.max_workers * (4 if deadline is None else 1)
+        pending = set()
+        for subdomain, protocol, plan in tasks:
+            pending.add(submit_queued(executor, TOOL, self.check_subdomain, subdomain, protocol, plan))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        
+        for future in as_completed(pending):
+            yield future.result()
+    
+    def _tasks(self, subdomains: Iterable[str], total: Optional[int],
+               deadline: Optional[ScanDeadline]) -> Iterator[tuple]:
+        """(subdomain, protocol, plan) of every check, as the deadline allows."""
+        # Shared by concurrent scans (batch mode), so each adds its own count
+        remaining = CANDIDATES_REMAINING.labels(TOOL)
+        left = total or 0
+        remaining.inc(left)
+        try:
+            for index, subdomain in enumerate(subdomains):
+                if left:
+                    remaining.dec()
+                    left -= 1
+                if deadline is None:
+                    for protocol in self.protocols:
+                        yield subdomain, protocol, FULL_PLAN
+                    continue
+                plan = deadline.plan(None if total is None else total - index)
+                if plan is None:
+                    logger.warning(f"Tiempo límite alcanzado tras {index} subdominios; "
+                                   f"el resto queda sin verificar")
+                    return
+                for protocol in self.protocols if plan.secondary else self.protocols[:1]:
+                    yield subdomain, protocol, plan
+        finally:
+            remaining.dec(left)
     
-    def verify_subdomains(self, subdomains: Set[str]) -> List[Dict[str, any]]:
+    def verify_subdomains(self, subdomains: Set[str], on_result: Callable = None,
+                          deadline: ScanDeadline = None) -> List[Dict[str, any]]:
         """
         Verify multiple subdomains concurrently
         
         Args:
             subdomains: Set of subdomains to verify
+            on_result: Optional callback run on each result as it completes
+                       (e.g. to record it in a result store)
+            deadline: Optional scan deadline (see iter_verify)
             
         Returns:
             List of results for all checks
@@ -93,25 +236,16 @@ class SubdomainVerifier:
         logger.info(f"Verificando {len(subdomains)} subdominios...")
         
         results = []
-        tasks = []
-        
-        # Create tasks for all subdomain/protocol combinations
-        for subdomain in subdomains:
-            for protocol in self.protocols:
-                tasks.append((subdomain, protocol))
-        
-        logger.info(f"Total de verificaciones a realizar: {len(tasks)}")
-        
-        # Execute checks concurrently
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_task = {
-                executor.submit(self.check_subdomain, subdomain, protocol): (subdomain, protocol)
-                for subdomain, protocol in tasks
-            }
-            
-            for future in as_completed(future_to_task):
-                result = future.result()
-                results.append(result)
+        start = time.monotonic()
+        first_live = False
+        for result in self.iter_verify(subdomains, deadline=deadline):
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+            if result['is_live'] and not first_live:
+                first_live = True
+                logger.info(f"Primer subdominio activo tras {len(results)} comprobaciones "
+                            f"({time.monotonic() - start:.1f} s): {result['url']}")
         
         # Filter only live subdomains
         live_results = [r for r in results if r['is_live']]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: verify the same hosts with fixed timeouts and with adaptive
+per-phase timeouts (recon_common.latency.AdaptiveTimeouts).
+
+The "network" is made of local servers:
+    answering  HTTP server answering in 50-150 ms (most hosts), or in
+               1.5 s for a few slow applications
+    silent     accepts connections but never answers (TLS and TTFB
+               cut-offs)
+    dropping   listening socket with a full backlog, so new connections
+               are never accepted (connect cut-offs)
+
+Hosts are addressed as 127.0.0.1:<port>/<name> and DNS is skipped, as in
+benchmarks/replay.py. Fixed timeouts wait the full http_timeout on every
+silent or dropping host; adaptive ones drop to a multiple of the observed
+latency (within the configured floor) once enough answers are seen.
+No host here completes a TLS handshake (the answering server is plain
+HTTP), so the tls phase keeps its default and only its cut-offs count.
+
+Usage:
+    python benchmarks/adaptive_timeouts.py
+    python benchmarks/adaptive_timeouts.py --hosts 600 --dead 0.2
+"""
+
+import sys
+import argparse
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Make the tool root importable (same layout as test_quick.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yaml
+
+from src.subdomain_verifier import SubdomainVerifier
+from recon_common.latency import AdaptiveTimeouts
+
+SLOW_LATENCY = 1.5
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(SLOW_LATENCY if self.path.startswith('/slow') else random.uniform(0.05, 0.15))
+        body = f"<html><head><title>{self.path[1:]}</title></head></html>".encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def silent_server() -> int:
+    """Accept every connection and never send a byte."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1024)
+    accepted = []
+    threading.Thread(target=lambda: [accepted.append(server.accept()) for _ in iter(int, 1)],
+                     daemon=True).start()
+    return server.getsockname()[1]
+
+
+def dropping_server() -> tuple:
+    """A port whose (tiny) backlog is already full: new connections time out."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(0)
+    port = server.getsockname()[1]
+    fillers = []
+    for _ in range(4):
+        client = socket.socket()
+        client.setblocking(False)
+        client.connect_ex(('127.0.0.1', port))
+        fillers.append(client)
+    time.sleep(0.2)
+    return port, (server, fillers)
+
+
+def run(hosts, workers, timeouts):
+    verifier = SubdomainVerifier(http_timeout=3, dns_timeout=2, timeouts=timeouts)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda host: verifier.verify_subdomain(host, skip_dns=True), hosts))
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixed vs adaptive per-phase timeouts")
+    parser.add_argument('--hosts', type=int, default=300, help='Hosts to verify (default: 300)')
+    parser.add_argument('--dead', type=float, default=0.15,
+                        help='Fraction of silent and of dropping hosts (each, default: 0.15)')
+    parser.add_argument('--slow', type=float, default=0.02,
+                        help=f'Fraction of slow ({SLOW_LATENCY} s) applications (default: 0.02)')
+    parser.add_argument('--workers', type=int, default=20, help='Verification threads (default: 20)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    silent = silent_server()
+    dropping, _keep = dropping_server()
+
+    random.seed(7)
+    dead, slow = int(args.hosts * args.dead), int(args.hosts * args.slow)
+    hosts = ([f"127.0.0.1:{silent}/silent{i}" for i in range(dead)]
+             + [f"127.0.0.1:{dropping}/dropping{i}" for i in range(dead)]
+             + [f"127.0.0.1:{port}/slow{i}" for i in range(slow)])
+    hosts += [f"127.0.0.1:{port}/www{i}" for i in range(args.hosts - len(hosts))]
+    random.shuffle(hosts)
+
+    config = yaml.safe_load(open(Path(__file__).resolve().parent.parent / 'config' / 'config.yaml'))
+    defaults = {'dns': 2, 'connect': 3, 'tls': 3, 'ttfb': 3}
+    print(f"{args.hosts} hosts: {dead} silent, {dead} dropping, {slow} slow ({SLOW_LATENCY} s), "
+          f"{args.workers} workers, http_timeout 3 s\n")
+    for name, section in (('fixed', None), ('adaptive', config['adaptive_timeouts'])):
+        timeouts = AdaptiveTimeouts.from_config(section, defaults)
+        results, elapsed = run(hosts, args.workers, timeouts)
+        live = sum(1 for r in results if r['is_live'])
+        slow_live = sum(1 for r in results if r['is_live'] and '/slow' in r['subdomain'])
+        print(f"{name:<9} {elapsed:>6.1f} s   {live} live ({slow_live}/{slow} slow applications)")
+        for row in timeouts.report()['phases']:
+            if row['phase'] == 'dns':
+                continue
+            print(f"          {row['phase']:<8} timeout {row['timeout']:.2f} s "
+                  f"(p99 {row['p99_ms'] or 0:.0f} ms), {row['cut_off']} cut off")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Aho-Corasick KeywordMatcher vs. the previous per-keyword `in` loop
+used by AssetAnalyzer.is_high_value_target.
+
+Usage:
+    python benchmarks/keyword_matcher.py
+    python benchmarks/keyword_matcher.py --hosts 100000 --keywords 10 100 1000 5000
+"""
+
+import sys
+import argparse
+import random
+import string
+import time
+from pathlib import Path
+
+# The matcher lives in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from recon_common.keyword_matcher import KeywordMatcher
+
+
+def loop_match(keywords, subdomain):
+    """The original implementation, kept here as the baseline."""
+    subdomain_lower = subdomain.lower()
+    return [keyword for keyword in keywords if keyword in subdomain_lower]
+
+
+def random_label(rng, min_len=3, max_len=10):
+    return ''.join(rng.choices(string.ascii_lowercase + string.digits, k=rng.randint(min_len, max_len)))
+
+
+def make_hosts(rng, count, keywords):
+    hosts = []
+    for _ in range(count):
+        labels = [random_label(rng) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.2:
+            labels[0] = rng.choice(keywords) + labels[0]
+        hosts.append('.'.join(labels) + '.upm.es')
+    return hosts
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KeywordMatcher benchmark")
+    parser.add_argument('--hosts', type=int, default=20000, help='Synthetic hosts to match')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[10, 100, 1000, 5000],
+                        help='Keyword list sizes to test')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'keywords':>9} {'loop (s)':>10} {'automaton (s)':>14} {'speedup':>8}")
+
+    for size in args.keywords:
+        keywords = list(dict.fromkeys(random_label(rng, 3, 8) for _ in range(size)))
+        hosts = make_hosts(rng, args.hosts, keywords)
+        matcher = KeywordMatcher(keywords)
+
+        expected, loop_time = timed(lambda: [loop_match(keywords, h) for h in hosts])
+        actual, matcher_time = timed(lambda: [matcher.find(h) for h in hosts])
+        assert actual == expected, "KeywordMatcher disagrees with the baseline loop"
+
+        print(f"{len(keywords):>9} {loop_time:>10.3f} {matcher_time:>14.3f} {loop_time / matcher_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
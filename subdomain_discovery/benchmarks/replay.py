@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: verify a set of hosts against the network while recording a
+ResponseArchive, then replay the archive (with the server stopped) and
+re-analyse the replayed results with a different keyword list.
+
+The "network" is a local HTTP server with a mix of 200/403/401/404 pages
+and redirects. Hosts are addressed as 127.0.0.1:<port>/<name> so every
+one has its own URL; DNS is skipped (skip_dns=True) because none of them
+resolve. Each host costs a failed HTTPS attempt (TLS against the plain
+HTTP server) and an HTTP request, as an HTTP-only host does in a real
+scan; most of the recording time is the verifier's own per-request TLS
+setup. Use --latency to add a per-response delay closer to a remote
+network.
+
+Usage:
+    python benchmarks/replay.py
+    python benchmarks/replay.py --hosts 5000 --latency 0.05
+"""
+
+import sys
+import argparse
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Make the tool root importable (same layout as test_quick.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.subdomain_verifier import SubdomainVerifier
+from src.asset_analyzer import AssetAnalyzer, IncrementalAnalysis
+from recon_common.replay import ResponseArchive
+
+LABELS = ['www', 'intranet', 'admin', 'vpn', 'lab', 'moodle', 'correo', 'dev']
+STATUS_CODES = [200, 200, 200, 403, 401, 302, 404]
+
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            if self.path.endswith('/login'):
+                code = 200
+            else:
+                code = STATUS_CODES[sum(map(ord, self.path)) % len(STATUS_CODES)]
+            self.send_response(code)
+            if code == 302:
+                self.send_header('Location', self.path + '/login')
+            body = f"<html><head><title>{self.path[1:]} ({code})</title></head><body>{'x' * 2000}</body></html>"
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def verify_all(verifier, hosts, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda host: verifier.verify_subdomain(host, skip_dns=True), hosts))
+
+
+def analyze(results, keywords):
+    analysis = IncrementalAnalysis(AssetAnalyzer(keywords, [200, 401, 403]))
+    for result in results:
+        analysis.update(result)
+    return analysis.snapshot()
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResponseArchive record/replay benchmark")
+    parser.add_argument('--hosts', type=int, default=2000, help='Hosts to verify (default: 2000)')
+    parser.add_argument('--workers', type=int, default=20, help='Verification threads (default: 20)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    hosts = [f"127.0.0.1:{port}/{LABELS[i % len(LABELS)]}{i}" for i in range(args.hosts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'responses.archive'
+        with ResponseArchive(path, 'record') as archive:
+            recorded, record_time = timed(lambda: verify_all(
+                SubdomainVerifier(http_timeout=5, archive=archive), hosts, args.workers))
+        server.shutdown()
+        server.server_close()
+
+        with ResponseArchive(path, 'replay') as archive:
+            replayed, replay_time = timed(lambda: verify_all(
+                SubdomainVerifier(http_timeout=5, archive=archive), hosts, args.workers))
+            assert archive.counts['missing'] == 0, archive.summary()
+        # Timings describe the network of a live run, so replays leave them out
+        without_timings = lambda results: [{**r.to_dict(), 'timings': None} for r in results]
+        assert without_timings(recorded) == without_timings(replayed)
+
+        before, analyze_time = timed(lambda: analyze(replayed, ['intranet', 'admin']))
+        after, reanalyze_time = timed(lambda: analyze(replayed, ['vpn', 'correo', 'dev']))
+
+        live = sum(1 for r in replayed if r['is_live'])
+        print(f"{args.hosts:,} hosts ({live:,} live), {args.workers} workers, "
+              f"latency {args.latency * 1000:.0f} ms, archive {path.stat().st_size / 1e6:.1f} MB\n")
+        print(f"record (network + archive): {record_time:>7.2f} s")
+        print(f"replay (server stopped):    {replay_time:>7.2f} s  ({record_time / replay_time:.1f}x faster), "
+              f"identical results")
+        print(f"analysis, 2 keywords:       {analyze_time:>7.2f} s  -> {before['high_value_total']} high-value")
+        print(f"re-analysis, 3 keywords:    {reanalyze_time:>7.2f} s  -> {after['high_value_total']} high-value")
+
+
+if __name__ == '__main__':
+    main()
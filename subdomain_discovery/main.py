@@ -13,47 +13,119 @@ Usage:
     python main.py verify -i subdomains.txt
     cat subdomains.txt | python main.py verify
     
+    # Stream: verify lines as they arrive, JSONL results on stdout
+    subfinder -d www.upm.es | python main.py verify --stream | jq .
+    
     # Run full analysis
     python main.py analyze www.upm.es
+    
+    # Search every stored run, re-export a run to the usual files
+    python main.py query --suffix etsit.upm.es --status 403 --days 30
+    python main.py export www.upm.es
 """
 
+import os
 import sys
 import argparse
 import yaml
 from pathlib import Path
 import subprocess
 import json
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from contextlib import contextmanager
 from datetime import datetime
+import threading
+import time
+from queue import Queue, Full
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
 from src.logger import setup_logger
-from src.subdomain_verifier import SubdomainVerifier
-from src.asset_analyzer import AssetAnalyzer
+from src.subdomain_verifier import SubdomainVerifier, TOOL
+from src.asset_analyzer import AssetAnalyzer, IncrementalAnalysis
+from src.rescan import IncrementalRescan, latest_results_file
+from recon_common.records import to_serializable
+from recon_common.result_store import ResultStore, from_file_timestamp, to_file_timestamp, since_days
+from recon_common.domain_store import DomainStore
+from recon_common.external_sort import collect_domains
+from recon_common.mapped_input import MappedLines
+from recon_common.serialization import ResultWriter, format_suffix, iter_records
+from recon_common.scheduling import LivenessScheduler
+from recon_common.deadline import ScanDeadline, FULL_PLAN, parse_duration
+from recon_common.replay import ResponseArchive, DEFAULT_BODY_LIMIT
+from recon_common.latency import AdaptiveTimeouts
+from recon_common.metrics import (CANDIDATES_REMAINING, SOURCE_REQUESTS, SOURCE_REQUEST_DURATION,
+                                  SUBDOMAINS_DISCOVERED, MetricsExporter, submit_queued)
+from recon_common.profiling import StageProfiler, stage
+
+# Analysis entries kept with a run besides its metrics (stored, exported)
+RUN_EXTRAS = ('coverage', 'timeouts')
 
 
 class SubdomainDiscoveryTool:
     """Main tool orchestrator for subdomain discovery and analysis."""
     
-    def __init__(self, config_path: str = "config/config.yaml"):
-        """Initialize the tool with configuration."""
+    def __init__(self, config_path: str = "config/config.yaml", record: str = None, replay: str = None):
+        """
+        Initialize the tool with configuration.
+        
+        Args:
+            config_path: Path to the YAML config
+            record: Response archive to record every network answer to
+            replay: Response archive to answer from instead of the network
+        """
         self.config_path = Path(config_path)
         self.load_config()
         self.setup_logging()
         
+        self.archive = None
+        if record or replay:
+            try:
+                self.archive = ResponseArchive(record or replay, 'record' if record else 'replay',
+                                               self.config.get('archive_body_limit', DEFAULT_BODY_LIMIT))
+            except FileNotFoundError as e:
+                self.logger.error(str(e))
+                sys.exit(1)
+            self.logger.info(f"{'Recording network answers to' if record else 'Replaying network answers from'} "
+                             f"{self.archive.path}")
+        
         # Initialize components
+        http_timeout = self.config['http_timeout']
         self.verifier = SubdomainVerifier(
-            http_timeout=self.config['http_timeout'],
+            http_timeout=http_timeout,
             dns_timeout=self.config['dns_timeout'],
-            headers=self.config.get('http_headers', {})
+            headers=self.config.get('http_headers', {}),
+            archive=self.archive,
+            timeouts=AdaptiveTimeouts.from_config(self.config.get('adaptive_timeouts'), {
+                'dns': self.config['dns_timeout'],
+                'connect': http_timeout, 'tls': http_timeout, 'ttfb': http_timeout
+            })
         )
         
         self.analyzer = AssetAnalyzer(
             high_value_keywords=self.config['high_value_keywords'],
-            interesting_status_codes=self.config['interesting_status_codes']
+            interesting_status_codes=self.config['interesting_status_codes'],
+            keyword_label_boundary=self.config.get('keyword_label_boundary', False),
+            high_value_top_k=self.config.get('high_value_top_k', 20),
+            keep_all_high_value=self.config.get('keep_all_high_value', True)
         )
+        
+        # SQLite history of every run (null in the config disables it).
+        # Replays are re-analyses of a recorded scan, not new observations
+        self.store = None
+        self.run_id = None
+        # Set by start_deadline (scan_deadline / --deadline)
+        self.deadline = None
+        # Set by start_metrics (metrics / --metrics-port, --metrics-file)
+        self.metrics = None
+        # Set by start_profile (--profile)
+        self.profiler = None
+        if self.config.get('result_store') and not (self.archive and self.archive.replaying):
+            store_path = Path(self.config['result_store'])
+            store_path.parent.mkdir(parents=True, exist_ok=True)
+            self.store = ResultStore(store_path, self.config.get('result_store_batch_size', 500))
     
     def load_config(self):
         """Load configuration from YAML file."""
@@ -67,162 +139,653 @@ class SubdomainDiscoveryTool:
             print(f"ERROR: Invalid YAML configuration: {e}")
             sys.exit(1)
     
-    def setup_logging(self):
+    def setup_logging(self, console_stream=None):
         """Setup logging configuration."""
         self.logger = setup_logger(
             log_file=self.config.get('log_file', 'subdomain_discovery.log'),
-            log_level=self.config.get('log_level', 'INFO')
+            log_level=self.config.get('log_level', 'INFO'),
+            console_stream=console_stream
         )
     
-    def run_subfinder(self, domain: str, output_file: str = None) -> List[str]:
+    def close(self):
+        """Write what is still buffered (response archive, result store)."""
+        if self.archive is not None:
+            self.archive.close()
+            self.logger.info(self.archive.summary())
+        if self.store is not None:
+            self.store.flush()
+        if self.metrics is not None:
+            self.metrics.close()
+        if self.profiler is not None:
+            self.profiler.close()
+            self.logger.info(f"Stage profile written to {self.profiler.output_dir}:")
+            for line in self.profiler.summary().splitlines():
+                self.logger.info(f"  {line}")
+    
+    def start_profile(self, output_dir: str):
         """
-        Run subfinder to discover subdomains.
+        Profile the run stage by stage (recon_common.profiling): collapsed
+        stacks, cProfile stats and allocation sites of each stage are
+        written to output_dir when the tool is closed.
+        """
+        self.profiler = StageProfiler(output_dir).start()
+        self.logger.info(f"Profiling stages to {self.profiler.output_dir}")
+    
+    def start_metrics(self, port: Optional[int] = None, path: Optional[str] = None):
+        """
+        Export the scan's live metrics (recon_common.metrics) while it runs,
+        as configured in `metrics` or overridden from the command line.
         
         Args:
-            domain: Target domain
-            output_file: Optional file to save raw subfinder output
+            port: Serve them on http://127.0.0.1:<port>/metrics
+            path: Rewrite this file with them every `interval` seconds
+        """
+        self.metrics = MetricsExporter.from_config(self.config.get('metrics'), port, path)
+        if self.metrics is None:
+            return
+        try:
+            self.metrics.start()
+        except OSError as e:
+            self.logger.error(f"Cannot serve metrics on port {self.metrics.port}: {e}")
+            sys.exit(1)
+        if self.metrics.url:
+            self.logger.info(f"Serving metrics on {self.metrics.url}")
+        if self.metrics.path:
+            self.logger.info(f"Writing metrics to {self.metrics.path} every {self.metrics.interval:g} s")
+    
+    def start_deadline(self, deadline, workers: int = 1):
+        """
+        Give the rest of the run a time budget: the remaining time is spread
+        across the queued candidates and, as the deadline approaches,
+        timeouts shrink, then only HTTPS is tried and titles are skipped,
+        and finally verification stops with partial results.
+        
+        Args:
+            deadline: Seconds, or a duration such as '20m' or '1.5h'
+            workers: Candidates verified at the same time
+        """
+        seconds = parse_duration(deadline)
+        dns_timeout = self.config['dns_timeout']
+        http_timeout = self.config['http_timeout']
+        # Worst cases: DNS + HTTPS + HTTP, and DNS + HTTPS only
+        self.deadline = ScanDeadline(seconds, dns_timeout + 2 * http_timeout, dns_timeout + http_timeout, workers)
+        self.logger.info(f"Scan deadline: {seconds:.0f} s")
+    
+    def collect(self, lines) -> DomainStore:
+        """
+        Deduplicate and order candidate subdomains. Above the configured
+        memory_budget_mb they are sorted on disk and read back lazily.
+        
+        Args:
+            lines: Candidate names, one per item (blank items are skipped)
             
         Returns:
-            List of discovered subdomains
+            DomainStore, or SpilledDomains iterating in the same order
         """
+        return collect_domains(lines, self.config.get('memory_budget_mb', 256),
+                               self.config.get('spill_dir'))
+    
+    @staticmethod
+    def write_lines(f, names):
+        """Write names newline-separated without joining them in memory."""
+        for i, name in enumerate(names):
+            f.write(('\n' if i else '') + name)
+    
+    @contextmanager
+    def recording_run(self, domain: str):
+        """
+        Register a run in the result store (if enabled) for the block. A run
+        the block leaves unfinished (nothing discovered, an error) is deleted,
+        so the store keeps no run without finished_at.
+        """
+        if self.store is not None:
+            self.run_id = self.store.start_run('subdomain_discovery', domain)
+            self.logger.info(f"Recording run {self.run_id} in {self.store.path}")
+        try:
+            yield
+        finally:
+            if self.store is not None and self.run_id is not None:
+                self.store.discard_run(self.run_id)
+                self.logger.warning(f"Run {self.run_id} did not finish; removed from the result store")
+                self.run_id = None
+    
+    def finish_run(self, total_candidates: int, analysis: Dict, high_value_assets: List, timestamp: str):
+        """Mark the current run as finished in the result store, with its analysis."""
+        if self.store is not None and self.run_id is not None:
+            self.store.finish_run(self.run_id, total_candidates, {
+                'metrics': analysis['metrics'],
+                'high_value_assets': high_value_assets,
+                **{key: analysis[key] for key in RUN_EXTRAS if key in analysis}
+            }, default=to_serializable, finished_at=from_file_timestamp(timestamp))
+            self.logger.info(f"Saved run {self.run_id} to result store: {self.store.path}")
+            self.run_id = None
+    
+    def record(self, result, addresses: List[str] = None, probed_at: str = None, carried: bool = False):
+        """Queue a result for the current run's next batched insert."""
+        if self.store is not None and self.run_id is not None:
+            self.store.add_result(self.run_id, result, addresses, probed_at, carried)
+    
+    def stream_subfinder(self, domain: str, found: DomainStore = None) -> Iterator[str]:
+        """
+        Run subfinder and yield each new subdomain as soon as it is printed.
+        
+        subfinder's output is drained by a reader thread, so discovery never
+        waits for the consumer (e.g. verification). When subfinder_timeout
+        expires it is terminated (SIGTERM, then SIGKILL) and every name
+        found up to that point is still yielded.
+        
+        Args:
+            domain: Target domain
+            found: Optional DomainStore that collects every discovered name
+            
+        Yields:
+            Discovered subdomains (deduplicated, lower case)
+        """
+        found = DomainStore() if found is None else found
+        if self.archive is None:
+            yield from self._run_subfinder(domain, found)
+        elif self.archive.replaying:
+            names = self.archive.lookup('subfinder', domain)
+            if names is None:
+                self.logger.error(f"No subfinder output for {domain} in {self.archive.path}")
+                return
+            for name in names:
+                if found.add(name):
+                    yield name
+            self.logger.info(f"Replayed {len(found)} subdomains discovered by subfinder")
+        else:
+            names = []
+            for name in self._run_subfinder(domain, found):
+                names.append(name)
+                yield name
+            self.archive.store('subfinder', domain, names)
+    
+    def _run_subfinder(self, domain: str, found: DomainStore) -> Iterator[str]:
+        """stream_subfinder against the real subfinder binary."""
         self.logger.info(f"Running subfinder for domain: {domain}")
         
+        # Check if subfinder is installed
+        result = subprocess.run(
+            ['which', 'subfinder'],
+            capture_output=True,
+            text=True
+        )
+        
+        if result.returncode != 0:
+            self.logger.error("subfinder not found. Please install it first.")
+            self.logger.error("Run: go install -v github.com/projectdiscovery/subfinder/v2/cmd/subfinder@latest")
+            return
+        
+        # Run subfinder
+        cmd = ['subfinder', '-d', domain, '-silent']
+        timeout = self.config.get('subfinder_timeout', 300)
+        if self.deadline is not None:
+            timeout = max(0, min(timeout, self.deadline.remaining()))
+        
+        self.logger.info(f"Executing: {' '.join(cmd)}")
+        started = time.perf_counter()
         try:
-            # Check if subfinder is installed
-            result = subprocess.run(
-                ['which', 'subfinder'],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                self.logger.error("subfinder not found. Please install it first.")
-                self.logger.error("Run: go install -v github.com/projectdiscovery/subfinder/v2/cmd/subfinder@latest")
-                return []
-            
-            # Run subfinder
-            cmd = ['subfinder', '-d', domain, '-silent']
-            
-            self.logger.info(f"Executing: {' '.join(cmd)}")
-            result = subprocess.run(
+            process = subprocess.Popen(
                 cmd,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=300  # 5 minute timeout
+                bufsize=1
             )
+        except OSError as e:
+            self.logger.error(f"Error running subfinder: {e}")
+            SOURCE_REQUESTS.labels('subfinder', 'error').inc()
+            return
+        
+        discovered = SUBDOMAINS_DISCOVERED.labels('subfinder')
+        names = Queue()
+        finished = object()
+        stderr_lines = []
+        timed_out = threading.Event()
+        
+        def read_stdout():
+            try:
+                for line in process.stdout:
+                    name = line.strip().rstrip('.').lower()
+                    if name and found.add(name):
+                        discovered.inc()
+                        names.put(name)
+            finally:
+                names.put(finished)
+        
+        def read_stderr():
+            for line in process.stderr:
+                stderr_lines.append(line)
+        
+        def stop(reason_timeout: bool):
+            if process.poll() is not None:
+                return
+            if reason_timeout:
+                timed_out.set()
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        
+        readers = [threading.Thread(target=read_stdout, daemon=True),
+                   threading.Thread(target=read_stderr, daemon=True)]
+        for reader in readers:
+            reader.start()
+        timer = threading.Timer(timeout, stop, args=(True,))
+        timer.daemon = True
+        timer.start()
+        
+        drained = False
+        try:
+            while True:
+                name = names.get()
+                if name is finished:
+                    drained = True
+                    break
+                yield name
+        finally:
+            timer.cancel()
+            if not drained:
+                # The consumer stopped early; don't leave subfinder running
+                stop(False)
+            for reader in readers:
+                reader.join()
+        
+        returncode = process.wait()
+        outcome = 'timeout' if timed_out.is_set() else 'error' if returncode != 0 else 'ok'
+        SOURCE_REQUESTS.labels('subfinder', outcome).inc()
+        SOURCE_REQUEST_DURATION.labels('subfinder').observe(time.perf_counter() - started)
+        if timed_out.is_set():
+            self.logger.warning(f"subfinder timed out after {timeout} seconds; "
+                                f"keeping the {len(found)} subdomains found so far")
+        elif returncode != 0:
+            self.logger.error(f"subfinder failed with return code {returncode}")
+            if stderr_lines:
+                self.logger.error(f"Error: {''.join(stderr_lines[-20:])}")
+        
+        self.logger.info(f"subfinder discovered {len(found)} subdomains")
+    
+    def run_subfinder(self, domain: str, output_file: str = None) -> DomainStore:
+        """
+        Run subfinder to discover subdomains.
+        
+        Args:
+            domain: Target domain
+            output_file: Optional file to save raw subfinder output
             
-            if result.returncode != 0:
-                self.logger.error(f"subfinder failed with return code {result.returncode}")
-                if result.stderr:
-                    self.logger.error(f"Error: {result.stderr}")
-                return []
-            
-            # Parse output
-            subdomains = [line.strip() for line in result.stdout.split('\n') if line.strip()]
-            
-            self.logger.info(f"subfinder discovered {len(subdomains)} subdomains")
-            
-            # Save to file if requested
-            if output_file:
-                output_path = Path(output_file)
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(output_path, 'w') as f:
-                    f.write('\n'.join(subdomains))
-                self.logger.info(f"Saved raw subfinder output to: {output_file}")
-            
-            return subdomains
+        Returns:
+            DomainStore of discovered subdomains (what was found before a
+            timeout or failure is kept)
+        """
+        subdomains = DomainStore()
+        for _ in self.stream_subfinder(domain, subdomains):
+            pass
+        
+        # Save to file if requested
+        if output_file and subdomains:
+            output_path = Path(output_file)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, 'w') as f:
+                self.write_lines(f, subdomains)
+            self.logger.info(f"Saved raw subfinder output to: {output_file}")
+        
+        return subdomains
+    
+    def prioritize(self, candidates: Iterable[str], domain: str = None,
+                   rescan: IncrementalRescan = None) -> Iterable[str]:
+        """
+        Order candidates by predicted liveness (unless schedule_by_liveness
+        is false): previous results, high-value keywords and label patterns.
+        
+        Args:
+            candidates: Complete set or stream of candidate subdomains
+            domain: Target domain whose history is used (None: every
+                    host in the result store)
+            rescan: Incremental rescan whose previous scan is the history
             
-        except subprocess.TimeoutExpired:
-            self.logger.error("subfinder timed out after 5 minutes")
-            return []
-        except Exception as e:
-            self.logger.error(f"Error running subfinder: {e}")
-            return []
+        Returns:
+            The candidates, most likely live first
+        """
+        if not self.config.get('schedule_by_liveness', True):
+            return candidates
+        
+        if rescan is not None:
+            history = {name: (bool(result.get('dns_resolves')), bool(result.get('is_live')))
+                       for name, result in rescan.previous.items()}
+        elif self.store is not None:
+            history = self.store.host_history(domain)
+        else:
+            previous = latest_results_file(Path(self.config.get('output_dir', 'output')), domain) if domain else None
+            history = {result['subdomain']: (bool(result.get('dns_resolves')), bool(result.get('is_live')))
+                       for result in iter_records(previous)} if previous is not None else {}
+        
+        self.logger.info(f"Ordering candidates by predicted liveness ({len(history)} hosts with history)")
+        return LivenessScheduler(history, self.analyzer.keyword_matcher.find).order(candidates)
     
-    def verify_subdomains(self, subdomains: List[str]) -> List[Dict]:
+    def verify_subdomains(self, subdomains: Iterable[str], analysis: IncrementalAnalysis = None,
+                          rescan: IncrementalRescan = None, found: DomainStore = None) -> List[Dict]:
         """
         Verify which subdomains are live.
         
         Args:
-            subdomains: List of subdomains to verify
+            subdomains: Subdomains to verify (a DomainStore is verified subtree
+                        by subtree; a stream is verified as names arrive)
+            analysis: Optional incremental analysis updated with each result
+            rescan: Optional incremental rescan deciding which subdomains are
+                    probed again and which results are carried forward
+            found: For a stream, the DomainStore it adds every discovered
+                   name to (tells a deadline how many are still queued)
             
         Returns:
-            List of verification results
+            List of verification results (partial if the deadline is reached)
         """
-        self.logger.info(f"Verifying {len(subdomains)} subdomains...")
+        total = len(subdomains) if hasattr(subdomains, '__len__') else None
+        if total is None:
+            self.logger.info("Verifying subdomains as they are discovered...")
+        else:
+            self.logger.info(f"Verifying {total} subdomains...")
         
         results = []
-        total = len(subdomains)
+        start = time.monotonic()
+        first_live = None
+        remaining = CANDIDATES_REMAINING.labels(TOOL)
         
         for i, subdomain in enumerate(subdomains, 1):
-            if i % 10 == 0 or i == total:
+            if total is None:
+                if i % 10 == 0:
+                    self.logger.info(f"Progress: {i} subdomains verified")
+            elif i % 10 == 0 or i == total:
                 self.logger.info(f"Progress: {i}/{total} subdomains verified")
             
-            result = self.verifier.verify_subdomain(subdomain, skip_dns=False)
+            queued = total if total is not None else len(found) if found is not None else None
+            plan = FULL_PLAN
+            if self.deadline is not None:
+                plan = self.deadline.plan(None if queued is None else queued - i + 1)
+                if plan is None:
+                    self.logger.warning(f"Scan deadline reached after {i - 1} subdomains; "
+                                        f"the rest are left unverified")
+                    break
+            
+            if rescan is not None:
+                result = rescan.verify(subdomain, plan)
+                self.record(result, rescan.addresses[subdomain],
+                            from_file_timestamp(rescan.verified_at[subdomain]),
+                            subdomain in rescan.carried)
+            elif self.store is not None:
+                # Look the A records up once, for the probe and the store
+                addresses = self.verifier.resolve_addresses(subdomain, plan)
+                result = self.verifier.verify_subdomain(subdomain, skip_dns=False, addresses=addresses, plan=plan)
+                self.record(result, addresses)
+            else:
+                result = self.verifier.verify_subdomain(subdomain, skip_dns=False, plan=plan)
             results.append(result)
+            if queued is not None:
+                remaining.set(queued - i)
+            if analysis is not None:
+                analysis.update(result)
             
             if result['is_live']:
                 status = result['http_info']['status_code']
                 protocol = result['http_info']['protocol']
                 self.logger.debug(f"✓ {subdomain} - {protocol.upper()} {status}")
+                if first_live is None:
+                    first_live = time.monotonic() - start
+                    self.logger.info(f"First live asset after {i} probes ({first_live:.1f} s): {subdomain}")
         
         live_count = sum(1 for r in results if r['is_live'])
-        self.logger.info(f"Verification complete: {live_count}/{total} live assets found")
+        self.logger.info(f"Verification complete: {live_count}/{len(results)} live assets found")
+        if rescan is not None:
+            probed, carried = rescan.counts()
+            self.logger.info(f"Incremental rescan: {probed} probed, {carried} carried forward")
         
         return results
     
-    def analyze_results(self, results: List[Dict], total_candidates: int) -> Dict:
+    def verify_mapped(self, lines: MappedLines, workers: int = 1,
+                      analysis: IncrementalAnalysis = None) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Verify a memory-mapped input file as it is read, without loading or
+        deduplicating it first. The file is split into newline-aligned byte
+        ranges and each worker thread verifies its own range.
+        
+        Args:
+            lines: Mapped input file
+            workers: Number of shards / worker threads
+            analysis: Optional incremental analysis updated with each result
+            
+        Returns:
+            List of verification results (in completion order) and the number
+            of lines in the file, counted by the shards as they read it (None
+            when the scan deadline stopped them before the end)
+        """
+        shards = lines.shards(workers)
+        self.logger.info(f"Verifying {lines.path} ({lines.size} bytes) in {len(shards)} shard(s)...")
+        
+        finished = object()
+        # Bounded, so workers never run far ahead of the analysis
+        queue = Queue(maxsize=max(1, len(shards)) * 64)
+        stop = threading.Event()
+        
+        def put(item):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=0.5)
+                    return
+                except Full:
+                    continue
+        
+        def verify_shard(start, end):
+            """Verify the lines of one byte range; returns how many there were (None if cut short)."""
+            count = 0
+            try:
+                for subdomain in lines.iter_lines(start, end):
+                    if stop.is_set():
+                        return None
+                    plan = FULL_PLAN
+                    if self.deadline is not None:
+                        # The number of lines is unknown: only the time left bounds a probe
+                        plan = self.deadline.plan()
+                        if plan is None:
+                            return None
+                    count += 1
+                    addresses = self.verifier.resolve_addresses(subdomain, plan) if self.store is not None else None
+                    put((self.verifier.verify_subdomain(subdomain, skip_dns=False, addresses=addresses, plan=plan),
+                         addresses))
+            finally:
+                put(finished)
+            return count
+        
+        results = []
+        live_count = 0
+        with ThreadPoolExecutor(max_workers=max(1, len(shards))) as executor:
+            futures = [executor.submit(verify_shard, start, end) for start, end in shards]
+            try:
+                pending = len(futures)
+                while pending:
+                    item = queue.get()
+                    if item is finished:
+                        pending -= 1
+                        continue
+                    result, addresses = item
+                    results.append(result)
+                    self.record(result, addresses)
+                    if analysis is not None:
+                        analysis.update(result)
+                    if result['is_live']:
+                        live_count += 1
+                    if len(results) % 10 == 0:
+                        self.logger.info(f"Progress: {len(results)} subdomains verified")
+            finally:
+                # Release workers blocked on a full queue if we stop early
+                stop.set()
+            counts = [future.result() for future in futures]
+        
+        if self.deadline is not None and self.deadline.reached:
+            self.logger.warning(f"Scan deadline reached after {len(results)} subdomains; "
+                                f"the rest of {lines.path} is left unverified")
+        self.logger.info(f"Verification complete: {live_count}/{len(results)} live assets found")
+        return results, None if None in counts else sum(counts)
+    
+    def analyze_results(self, results: List[Dict], total_candidates: Optional[int],
+                        analysis: IncrementalAnalysis = None) -> Dict:
         """
         Analyze verification results and generate report.
         
         Args:
             results: Verification results
-            total_candidates: Total number of candidates discovered
+            total_candidates: Total number of candidates discovered (None:
+                              unknown, e.g. a streamed file)
+            analysis: Incremental analysis already fed during verification;
+                      when omitted, results are analyzed in a single pass
             
         Returns:
-            Dictionary with analysis data
+            Dictionary with analysis data (and the deadline coverage, if
+            the run had a deadline)
         """
         self.logger.info("Analyzing results...")
         
-        # Calculate metrics
-        metrics = self.analyzer.calculate_efficiency_metrics(total_candidates, results)
+        if analysis is None:
+            analysis = self.analyzer.incremental()
+            for result in results:
+                analysis.update(result)
         
-        # Categorize by status
-        categorized = self.analyzer.categorize_by_status(results)
+        coverage = None
+        if self.deadline is not None:
+            coverage = self.deadline.coverage(total_candidates)
+            if coverage['deadline_reached']:
+                # Rates describe what was verified; coverage says how much that is
+                total_candidates = len(results)
+                self.logger.warning(f"Partial results: {self.describe_coverage(coverage)}")
+        if total_candidates is None:
+            total_candidates = len(results)
         
-        # Identify high-value assets
-        high_value_assets = self.analyzer.identify_high_value_assets(results)
+        snapshot = analysis.snapshot(total_candidates)
+        metrics = snapshot['metrics']
+        categorized = snapshot['categorized']
+        high_value_assets = snapshot['high_value_assets']
         
-        self.logger.info(f"Found {len(high_value_assets)} high-value targets")
+        self.logger.info(f"Found {snapshot['high_value_total']} high-value targets")
         self.logger.info(f"Live asset rate: {metrics['live_asset_rate']:.2f}%")
         self.logger.info(f"Noise filtered: {metrics['noise_percentage']:.2f}%")
+        if metrics['timings']['phases']:
+            self.logger.info(f"Phase timings: {self.describe_timings(metrics['timings'])}")
+        timeouts = self.verifier.timeouts
+        if timeouts.observed:
+            self.logger.info(f"Phase timeouts: {self.describe_timeouts(timeouts.report())}")
         
         return {
             'metrics': metrics,
             'categorized': categorized,
-            'high_value_assets': high_value_assets
+            'category_counts': snapshot['category_counts'],
+            'high_value_assets': high_value_assets,
+            'high_value_total': snapshot['high_value_total'],
+            # Complete ordering, only sorted when the JSON is written
+            'all_high_value_assets': analysis.all_high_value_assets,
+            **({'coverage': coverage} if coverage is not None else {}),
+            **({'timeouts': timeouts.report()} if timeouts.observed else {})
         }
     
-    def save_results(self, domain: str, subdomains: List[str], 
-                    results: List[Dict], analysis: Dict):
+    @staticmethod
+    def describe_coverage(coverage: Dict) -> str:
+        """One-line account of what a run with a deadline verified."""
+        probes = coverage['probes']
+        if coverage['candidates'] is not None:
+            verified = (f"{coverage['verified']}/{coverage['candidates']} candidates verified "
+                        f"({coverage['coverage_percentage']:.1f}%)")
+        else:
+            verified = f"{coverage['verified']} candidates verified"
+        return (f"{verified} in {coverage['elapsed_seconds']:.0f} s of a {coverage['deadline_seconds']:.0f} s "
+                f"deadline; {probes['reduced']} with reduced timeouts, {probes['essential']} HTTPS only "
+                f"without title")
+    
+    @staticmethod
+    def describe_timings(timings: Dict) -> str:
+        """One-line account of where the probes of a run spent their time."""
+        return ", ".join(f"{phase} p50 {row['p50_ms']:.0f} ms / p99 {row['p99_ms']:.0f} ms "
+                         f"({row['share_percentage']:.0f}%)"
+                         for phase, row in timings['phases'].items())
+    
+    @staticmethod
+    def describe_timeouts(timeouts: Dict) -> str:
+        """One-line account of the per-phase timeouts of a run."""
+        return ", ".join(f"{row['phase']} {row['timeout']:.2f} s ({row['cut_off']} cut off)"
+                         for row in timeouts['phases'])
+    
+    def save_results(self, domain: str, subdomains: Optional[DomainStore], 
+                    results: List[Dict], analysis: Dict, rescan: IncrementalRescan = None,
+                    total_candidates: Optional[int] = None):
         """
-        Save all results to output files.
+        Save all results: finish the run in the result store and, unless
+        export_files is false, write the usual output files.
         
         Args:
             domain: Target domain
-            subdomains: Original list of discovered subdomains
+            subdomains: Discovered subdomains (None when the input file is
+                        verified as it is, with verify --stream)
             results: Verification results
             analysis: Analysis data
+            rescan: Incremental rescan of this run; its per-host metadata is
+                    saved with the results and its diff to *_diff.json
+            total_candidates: Number of candidates when subdomains is None
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        high_value_assets = analysis['all_high_value_assets']()
+        if subdomains is not None:
+            total_candidates = len(subdomains)
+        
+        self.finish_run(total_candidates, analysis, high_value_assets, timestamp)
+        
+        diff = None
+        if rescan is not None:
+            diff = rescan.diff(subdomains)
+            self.logger.info(f"Changes since the previous scan: {len(diff['new'])} new, "
+                             f"{len(diff['removed'])} removed, {len(diff['changed'])} changed")
+        
+        if self.config.get('export_files', True):
+            report = self.write_files(domain, timestamp, subdomains, total_candidates, results, analysis,
+                                      high_value_assets, rescan.metadata() if rescan is not None else None,
+                                      diff)
+        else:
+            report = self.generate_report(analysis)
+        
+        # Print report to console
+        print("\n" + report)
+    
+    def generate_report(self, analysis: Dict) -> str:
+        """Text report of an analysis."""
+        return self.analyzer.generate_report(
+            analysis['metrics'],
+            analysis['categorized'],
+            analysis['high_value_assets'],
+            analysis['high_value_total'],
+            analysis.get('coverage'),
+            analysis.get('timeouts'),
+            analysis.get('category_counts')
+        )
+    
+    def write_files(self, domain: str, timestamp: str, subdomains: Optional[Iterable[str]],
+                    total_discovered: Optional[int],
+                    results: List[Dict], analysis: Dict, high_value_assets: List,
+                    rescan_metadata: Dict = None, diff: Dict = None) -> str:
+        """
+        Write the output files of a run to output_dir:
+        {domain}_{timestamp}_raw.txt, _live.txt, _results.<results_format>,
+        _report.txt (and _diff.json for incremental rescans). Without
+        subdomains (verify --stream) there is no _raw.txt: the input file
+        is the raw list.
+        
+        Returns:
+            The text report
+        """
         output_dir = Path(self.config.get('output_dir', 'output'))
         output_dir.mkdir(parents=True, exist_ok=True)
         
         # Save raw subdomains
-        raw_file = output_dir / f"{domain}_{timestamp}_raw.txt"
-        with open(raw_file, 'w') as f:
-            f.write('\n'.join(subdomains))
-        self.logger.info(f"Saved raw subdomains to: {raw_file}")
+        if subdomains is not None:
+            raw_file = output_dir / f"{domain}_{timestamp}_raw.txt"
+            with open(raw_file, 'w') as f:
+                self.write_lines(f, subdomains)
+            self.logger.info(f"Saved raw subdomains to: {raw_file}")
         
         # Save live subdomains
         live_subdomains = [r['subdomain'] for r in results if r['is_live']]
@@ -231,81 +794,213 @@ class SubdomainDiscoveryTool:
             f.write('\n'.join(live_subdomains))
         self.logger.info(f"Saved live subdomains to: {live_file}")
         
-        # Save detailed results as JSON
-        json_file = output_dir / f"{domain}_{timestamp}_results.json"
-        with open(json_file, 'w') as f:
-            json.dump({
-                'domain': domain,
-                'timestamp': timestamp,
-                'total_discovered': len(subdomains),
-                'results': results,
+        # Save detailed results (json: the indented document; jsonl/bin, optionally compressed)
+        results_format = self.config.get('results_format', 'json')
+        results_file = output_dir / f"{domain}_{timestamp}_results{format_suffix(results_format)}"
+        with ResultWriter(results_file, results_format, meta={
+            'domain': domain,
+            'timestamp': timestamp,
+            'total_discovered': total_discovered
+        }) as writer:
+            writer.write_many(results)
+            writer.close(meta={
                 'analysis': {
                     'metrics': analysis['metrics'],
-                    'high_value_assets': analysis['high_value_assets']
-                }
-            }, f, indent=2)
-        self.logger.info(f"Saved detailed results to: {json_file}")
+                    'high_value_assets': high_value_assets,
+                    **{key: analysis[key] for key in RUN_EXTRAS if key in analysis}
+                },
+                **({'rescan': rescan_metadata} if rescan_metadata is not None else {})
+            })
+        self.logger.info(f"Saved detailed results to: {results_file}")
         
-        # Generate and save report
-        report = self.analyzer.generate_report(
-            analysis['metrics'],
-            analysis['categorized'],
-            analysis['high_value_assets']
-        )
+        if diff is not None:
+            diff_file = output_dir / f"{domain}_{timestamp}_diff.json"
+            with open(diff_file, 'w') as f:
+                json.dump(diff, f, indent=2)
+            self.logger.info(f"Saved rescan diff to: {diff_file}")
         
+        # Generate and save report
+        report = self.generate_report(analysis)
         report_file = output_dir / f"{domain}_{timestamp}_report.txt"
         with open(report_file, 'w') as f:
             f.write(report)
         self.logger.info(f"Saved analysis report to: {report_file}")
         
-        # Print report to console
-        print("\n" + report)
+        return report
     
-    def discover_and_analyze(self, domain: str):
+    def export_run(self, domain: str, run_id: int = None):
         """
-        Complete workflow: discover, verify, and analyze.
+        Write the output files of a stored run (default: the latest
+        finished run for the domain), as save_results would have.
         
         Args:
             domain: Target domain
+            run_id: Run to export
         """
-        self.logger.info(f"Starting full discovery and analysis for: {domain}")
+        if self.store is None:
+            self.logger.error("No result_store configured")
+            sys.exit(1)
+        if run_id is None:
+            run_id = self.store.latest_run(domain, 'subdomain_discovery')
+        info = self.store.run_info(run_id) if run_id is not None else None
+        if info is None or info['tool'] != 'subdomain_discovery':
+            self.logger.error(f"No stored subdomain_discovery run found for {domain}")
+            sys.exit(1)
         
-        # Step 1: Discover subdomains with subfinder
-        subdomains = self.run_subfinder(domain)
-        if not subdomains:
-            self.logger.error("No subdomains discovered. Exiting.")
-            return
+        self.logger.info(f"Exporting run {run_id} ({info['domain']}, {info['finished_at'] or info['started_at']})")
+        results = self.store.run_results(run_id)
+        total = info['total_candidates'] if info['total_candidates'] is not None else len(results)
+        stored = info['analysis'] or {}
+        coverage = stored.get('coverage')
+        # A run cut short by its deadline: rates over what it verified, as in the original report
+        analysis = self.analyze_results(results, len(results) if coverage and coverage['deadline_reached'] else total)
+        for key in RUN_EXTRAS:
+            if key in stored:
+                analysis[key] = stored[key]
+        report = self.write_files(
+            info['domain'], to_file_timestamp(info['finished_at'] or info['started_at']),
+            DomainStore(r['subdomain'] for r in results), total, results, analysis,
+            stored.get('high_value_assets', analysis['all_high_value_assets']()),
+            self.store.host_metadata(run_id)
+        )
+        print("\n" + report)
+    
+    def query(self, suffix: str = None, status_code: int = None, days: float = None,
+              live: bool = None, limit: int = None, db: str = None, output=None):
+        """
+        Print stored probes matching the filters as JSON lines, newest first.
+        
+        Args:
+            suffix: Only subdomains at or under this name
+            status_code: Only this HTTP status code
+            days: Only probes from the last N days
+            live: Only live (True) or non-live (False) probes
+            limit: Maximum number of rows
+            db: Query this store instead of the configured one (e.g. subdomain_checker's)
+            output: Stream for the JSONL rows (default: stdout)
+        """
+        if db is not None:
+            if not Path(db).is_file():
+                self.logger.error(f"Result store not found: {db}")
+                sys.exit(1)
+            store = ResultStore(db)
+        elif self.store is not None:
+            store = self.store
+        else:
+            self.logger.error("No result_store configured")
+            sys.exit(1)
+        output = output or sys.stdout
+        rows = store.query_probes(suffix=suffix, status_code=status_code,
+                                       since=since_days(days) if days is not None else None,
+                                       live=live, limit=limit)
+        for row in rows:
+            output.write(json.dumps(row) + '\n')
+        self.logger.info(f"{len(rows)} probes matched")
+    
+    def start_rescan(self, domain: str) -> IncrementalRescan:
+        """
+        Prepare an incremental rescan against the latest stored run for the
+        domain, or else its latest results file (a first scan probes everything).
         
-        # Step 2: Verify subdomains
-        results = self.verify_subdomains(subdomains)
+        Args:
+            domain: Target domain
+            
+        Returns:
+            IncrementalRescan for this run
+        """
+        ttl_hours = self.config.get('rescan_ttl_hours', 24)
+        run_id = self.store.latest_run(domain, 'subdomain_discovery') if self.store is not None else None
+        if run_id is not None:
+            info = self.store.run_info(run_id)
+            source = f"{self.store.path}#run={run_id}"
+            self.logger.info(f"Incremental rescan against: {source}")
+            return IncrementalRescan(self.verifier, ttl_hours=ttl_hours, source=source, previous_data={
+                'timestamp': to_file_timestamp(info['finished_at']),
+                'results': self.store.run_results(run_id),
+                'rescan': self.store.host_metadata(run_id)
+            })
         
-        # Step 3: Analyze results
-        analysis = self.analyze_results(results, len(subdomains))
+        previous = latest_results_file(Path(self.config.get('output_dir', 'output')), domain)
+        if previous is None:
+            self.logger.info(f"No previous results for {domain}; every subdomain will be probed")
+        else:
+            self.logger.info(f"Incremental rescan against: {previous}")
+        return IncrementalRescan(self.verifier, previous, ttl_hours)
+    
+    def discover_and_analyze(self, domain: str, incremental_rescan: bool = False):
+        """
+        Complete workflow: discover, verify, and analyze.
         
-        # Step 4: Save results
-        self.save_results(domain, subdomains, results, analysis)
+        Args:
+            domain: Target domain
+            incremental_rescan: Only probe subdomains that are new, older than
+                                rescan_ttl_hours or whose DNS answers changed
+                                since the latest saved results
+        """
+        self.logger.info(f"Starting full discovery and analysis for: {domain}")
+        rescan = self.start_rescan(domain) if incremental_rescan else None
+        with self.recording_run(domain):
+            # Steps 1-2: Discover subdomains with subfinder and verify each one
+            # as soon as it is printed (analysis is updated as results arrive),
+            # so both are profiled as the probing stage
+            subdomains = DomainStore()
+            incremental = self.analyzer.incremental()
+            with stage('probing'):
+                candidates = self.prioritize(self.stream_subfinder(domain, subdomains), domain, rescan)
+                results = self.verify_subdomains(candidates, incremental, rescan, found=subdomains)
+            if not subdomains:
+                self.logger.error("No subdomains discovered. Exiting.")
+                return
+            
+            # Step 3: Analyze results
+            with stage('analysis'):
+                analysis = self.analyze_results(results, len(subdomains), incremental)
+            
+            # Step 4: Save results
+            with stage('output'):
+                self.save_results(domain, subdomains, results, analysis, rescan)
         
         self.logger.info("Complete workflow finished successfully!")
     
-    def verify_from_file(self, input_file: str):
+    def verify_from_file(self, input_file: str, stream: bool = False, workers: int = 1):
         """
         Verify subdomains from a file.
         
         Args:
             input_file: Path to file containing subdomains (one per line)
+            stream: Start verifying straight from the memory-mapped file,
+                    skipping deduplication (for huge, already-unique lists)
+            workers: Worker threads (byte-range shards) when streaming
         """
         try:
-            with open(input_file, 'r') as f:
-                subdomains = [line.strip() for line in f if line.strip()]
-            
-            self.logger.info(f"Loaded {len(subdomains)} subdomains from {input_file}")
-            
-            results = self.verify_subdomains(subdomains)
-            analysis = self.analyze_results(results, len(subdomains))
-            
-            # Extract domain from filename or use generic name
-            domain = Path(input_file).stem
-            self.save_results(domain, subdomains, results, analysis)
+            with MappedLines(input_file) as lines, self.recording_run(Path(input_file).stem):
+                # Extract domain from filename or use generic name
+                domain = Path(input_file).stem
+                incremental = self.analyzer.incremental()
+                
+                if stream:
+                    with stage('probing'):
+                        results, total = self.verify_mapped(lines, workers, incremental)
+                    with stage('analysis'):
+                        analysis = self.analyze_results(results, total, incremental)
+                    with stage('output'):
+                        # The input file is the raw list: it is not read again
+                        self.save_results(domain, None, results, analysis, total_candidates=total)
+                    return
+                
+                with stage('input'):
+                    subdomains = self.collect(lines)
+                # The mapping is only needed to read the candidates
+                lines.close()
+                
+                self.logger.info(f"Loaded {len(subdomains)} subdomains from {input_file}")
+                
+                with stage('probing'):
+                    results = self.verify_subdomains(self.prioritize(subdomains), incremental)
+                with stage('analysis'):
+                    analysis = self.analyze_results(results, len(subdomains), incremental)
+                with stage('output'):
+                    self.save_results(domain, subdomains, results, analysis)
             
         except FileNotFoundError:
             self.logger.error(f"File not found: {input_file}")
@@ -315,11 +1010,8 @@ class SubdomainDiscoveryTool:
         """Verify subdomains from stdin (pipe)."""
         self.logger.info("Reading subdomains from stdin...")
         
-        subdomains = []
-        for line in sys.stdin:
-            line = line.strip()
-            if line:
-                subdomains.append(line)
+        with stage('input'):
+            subdomains = self.collect(sys.stdin)
         
         if not subdomains:
             self.logger.error("No subdomains received from stdin")
@@ -327,10 +1019,95 @@ class SubdomainDiscoveryTool:
         
         self.logger.info(f"Received {len(subdomains)} subdomains from stdin")
         
-        results = self.verify_subdomains(subdomains)
-        analysis = self.analyze_results(results, len(subdomains))
+        incremental = self.analyzer.incremental()
+        with self.recording_run("stdin"):
+            with stage('probing'):
+                results = self.verify_subdomains(self.prioritize(subdomains), incremental)
+            with stage('analysis'):
+                analysis = self.analyze_results(results, len(subdomains), incremental)
+            
+            with stage('output'):
+                self.save_results("stdin", subdomains, results, analysis)
+    
+    def stream_stdin(self, workers: int = 10, output=None):
+        """
+        Verify stdin lines as they arrive and write each result as one JSON
+        line as soon as it completes, so the tool can sit in the middle of
+        a pipeline (subfinder | main.py verify --stream | jq ...).
+        Duplicate lines are skipped; messages go to the log, not stdout.
+        With the result store enabled the results are recorded as a "stdin"
+        run, finished (with its metrics) when stdin ends or the next tool
+        in the pipeline exits.
         
-        self.save_results("stdin", subdomains, results, analysis)
+        Args:
+            workers: Verifications running at the same time
+            output: Stream for the JSONL results (default: stdout)
+        """
+        output = output or sys.stdout
+        seen = DomainStore()
+        # At most 2 * workers lines read ahead of the verifications
+        slots = threading.BoundedSemaphore(workers * 2)
+        lock = threading.Lock()
+        closed = threading.Event()
+        counts = {'verified': 0, 'live': 0}
+        analysis = self.analyzer.incremental()
+        
+        def verify(subdomain, plan):
+            addresses = self.verifier.resolve_addresses(subdomain, plan) if self.store is not None else None
+            return self.verifier.verify_subdomain(subdomain, skip_dns=False, addresses=addresses, plan=plan), addresses
+        
+        def emit(future):
+            try:
+                if future.cancelled():
+                    return
+                result, addresses = future.result()
+                line = json.dumps(result, default=to_serializable)
+                with lock:
+                    self.record(result, addresses)
+                    analysis.update(result)
+                    if closed.is_set():
+                        return
+                    output.write(line + '\n')
+                    output.flush()
+                    counts['verified'] += 1
+                    counts['live'] += result['is_live']
+            except BrokenPipeError:
+                # The next tool in the pipeline has exited
+                closed.set()
+            except Exception as e:
+                self.logger.error(f"Verification failed: {e}")
+            finally:
+                slots.release()
+        
+        self.logger.info(f"Streaming verification from stdin ({workers} workers)...")
+        with self.recording_run("stdin"):
+            with stage('probing'), ThreadPoolExecutor(max_workers=workers) as executor:
+                for line in sys.stdin:
+                    if closed.is_set():
+                        break
+                    subdomain = line.strip().rstrip('.').lower()
+                    if not seen.add(subdomain):
+                        continue
+                    plan = FULL_PLAN
+                    if self.deadline is not None:
+                        plan = self.deadline.plan()
+                        if plan is None:
+                            self.logger.warning("Scan deadline reached; the rest of stdin is left unverified")
+                            break
+                    slots.acquire()
+                    submit_queued(executor, TOOL, verify, subdomain, plan).add_done_callback(emit)
+                if closed.is_set():
+                    executor.shutdown(wait=True, cancel_futures=True)
+            
+            snapshot = analysis.snapshot(len(seen))
+            self.finish_run(len(seen), snapshot, analysis.all_high_value_assets(),
+                            datetime.now().strftime("%Y%m%d_%H%M%S"))
+        
+        if closed.is_set():
+            # Keep the interpreter from failing again when it flushes stdout at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), output.fileno())
+            return
+        self.logger.info(f"Stream complete: {counts['live']}/{counts['verified']} live assets found")
 
 
 def main():
@@ -351,6 +1128,25 @@ Examples:
   
   # Pipe subfinder output
   subfinder -d www.upm.es | python main.py verify
+  
+  # Stream JSONL results as they complete
+  subfinder -d www.upm.es | python main.py verify --stream | jq -c 'select(.is_live)'
+  
+  # All 403s seen under etsit.upm.es in the last month (result store)
+  python main.py query --suffix etsit.upm.es --status 403 --days 30
+  
+  # Write the output files of the latest stored run
+  python main.py export www.upm.es
+  
+  # Finish within a 20-minute maintenance window (partial results if needed)
+  python main.py analyze www.upm.es --deadline 20m
+  
+  # Record every network answer, then re-analyse offline with new rules
+  python main.py analyze www.upm.es --record output/upm.archive
+  python main.py analyze www.upm.es --replay output/upm.archive
+  
+  # Where the time and memory go, stage by stage (flame graph input)
+  python main.py analyze www.upm.es --profile output/profile
         """
     )
     
@@ -359,6 +1155,11 @@ Examples:
     # Analyze command (full workflow)
     analyze_parser = subparsers.add_parser('analyze', help='Full discovery and analysis')
     analyze_parser.add_argument('domain', help='Target domain (e.g., www.upm.es)')
+    analyze_parser.add_argument('--incremental', action='store_true',
+                               help='Only re-probe new, stale or DNS-changed subdomains since the last scan')
+    analyze_parser.add_argument('--deadline', metavar='DURATION',
+                               help='Finish within this time (e.g. 1200, 20m, 1.5h), with partial results '
+                                    'if needed (default: scan_deadline from the config)')
     analyze_parser.add_argument('-c', '--config', default='config/config.yaml',
                                help='Path to config file')
     
@@ -372,9 +1173,51 @@ Examples:
     # Verify command
     verify_parser = subparsers.add_parser('verify', help='Verify subdomains from file or stdin')
     verify_parser.add_argument('-i', '--input', help='Input file with subdomains')
+    verify_parser.add_argument('--stream', action='store_true',
+                              help='With -i: verify the file as it is read (memory-mapped, no deduplication). '
+                                   'From stdin: verify lines as they arrive and print JSONL results to stdout')
+    verify_parser.add_argument('-w', '--workers', type=int,
+                              help='With --stream: worker threads (default: 1 per file shard, 10 for stdin)')
+    verify_parser.add_argument('--deadline', metavar='DURATION',
+                              help='Finish within this time (e.g. 1200, 20m, 1.5h), with partial results '
+                                   'if needed (default: scan_deadline from the config)')
     verify_parser.add_argument('-c', '--config', default='config/config.yaml',
                               help='Path to config file')
     
+    # Record/replay of the network answers (subfinder, DNS, HTTP)
+    for command_parser in (analyze_parser, discover_parser, verify_parser):
+        archive_group = command_parser.add_mutually_exclusive_group()
+        archive_group.add_argument('--record', metavar='ARCHIVE',
+                                   help='Store every network answer in this response archive')
+        archive_group.add_argument('--replay', metavar='ARCHIVE',
+                                   help='Answer from this response archive instead of the network')
+        command_parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                                    help='Serve live scan metrics (Prometheus text format) on '
+                                         'http://127.0.0.1:PORT/metrics')
+        command_parser.add_argument('--metrics-file', metavar='PATH',
+                                    help='Rewrite PATH with the live scan metrics every metrics.interval seconds')
+        command_parser.add_argument('--profile', metavar='DIR',
+                                    help='Profile each stage (CPU, collapsed stacks for flame graphs, '
+                                         'allocations) and write the results to DIR')
+    
+    # Query command (result store)
+    query_parser = subparsers.add_parser('query', help='Search the probes of every stored run')
+    query_parser.add_argument('--suffix', help='Only subdomains at or under this name (e.g. etsit.upm.es)')
+    query_parser.add_argument('--status', type=int, help='Only this HTTP status code')
+    query_parser.add_argument('--days', type=float, help='Only probes from the last N days')
+    query_parser.add_argument('--live', action='store_true', default=None, help='Only live assets')
+    query_parser.add_argument('--limit', type=int, help='Maximum number of rows')
+    query_parser.add_argument('--db', help='Result store to query (default: result_store from the config)')
+    query_parser.add_argument('-c', '--config', default='config/config.yaml',
+                             help='Path to config file')
+    
+    # Export command (result store)
+    export_parser = subparsers.add_parser('export', help='Write the output files of a stored run')
+    export_parser.add_argument('domain', help='Target domain')
+    export_parser.add_argument('--run', type=int, help='Run id (default: latest finished run for the domain)')
+    export_parser.add_argument('-c', '--config', default='config/config.yaml',
+                              help='Path to config file')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -382,22 +1225,52 @@ Examples:
         sys.exit(1)
     
     # Initialize tool
-    tool = SubdomainDiscoveryTool(config_path=args.config)
+    tool = SubdomainDiscoveryTool(config_path=args.config, record=getattr(args, 'record', None),
+                                  replay=getattr(args, 'replay', None))
+    try:
+        run_command(tool, args)
+    finally:
+        tool.close()
+
+
+def run_command(tool: SubdomainDiscoveryTool, args):
+    """Execute the parsed command."""
+    if args.command == 'verify' and args.stream and not args.input:
+        # stdout carries the results
+        tool.setup_logging(console_stream=sys.stderr)
+    if args.command in ('analyze', 'discover', 'verify'):
+        tool.start_metrics(getattr(args, 'metrics_port', None), getattr(args, 'metrics_file', None))
+        if getattr(args, 'profile', None):
+            tool.start_profile(args.profile)
+    
+    if args.command in ('analyze', 'verify'):
+        deadline = getattr(args, 'deadline', None) or tool.config.get('scan_deadline')
+        if deadline:
+            if args.command == 'verify' and args.stream:
+                workers = args.workers or (1 if args.input else 10)
+            else:
+                workers = 1
+            try:
+                tool.start_deadline(deadline, workers)
+            except ValueError as e:
+                tool.logger.error(str(e))
+                sys.exit(1)
     
-    # Execute command
     if args.command == 'analyze':
-        tool.discover_and_analyze(args.domain)
+        tool.discover_and_analyze(args.domain, args.incremental)
     
     elif args.command == 'discover':
-        subdomains = tool.run_subfinder(args.domain, output_file=args.output)
-        print(f"\nDiscovered {len(subdomains)} subdomains")
-        if not args.output:
-            for subdomain in subdomains:
-                print(subdomain)
+        with stage('discovery'):
+            subdomains = tool.run_subfinder(args.domain, output_file=args.output)
+        with stage('output'):
+            print(f"\nDiscovered {len(subdomains)} subdomains")
+            if not args.output:
+                for subdomain in subdomains:
+                    print(subdomain)
     
     elif args.command == 'verify':
         if args.input:
-            tool.verify_from_file(args.input)
+            tool.verify_from_file(args.input, args.stream, args.workers or 1)
         else:
             # Read from stdin
             if sys.stdin.isatty():
@@ -405,7 +1278,18 @@ Examples:
                 print("Usage: python main.py verify -i <file>")
                 print("   or: cat subdomains.txt | python main.py verify")
                 sys.exit(1)
-            tool.verify_from_stdin()
+            if args.stream:
+                tool.stream_stdin(args.workers or 10)
+            else:
+                tool.verify_from_stdin()
+    
+    elif args.command == 'query':
+        # stdout carries the rows
+        tool.setup_logging(console_stream=sys.stderr)
+        tool.query(args.suffix, args.status, args.days, args.live, args.limit, args.db)
+    
+    elif args.command == 'export':
+        tool.export_run(args.domain, args.run)
 
 
 if __name__ == '__main__':
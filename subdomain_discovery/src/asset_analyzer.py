@@ -3,23 +3,46 @@ Asset Analyzer Module
 Analyzes discovered live assets to identify high-value targets and calculate metrics.
 """
 
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional
 import re
+import sys
+from pathlib import Path
+
+from .ranking import TopKRanking
+
+# Shared latency histograms and keyword matcher live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.keyword_matcher import KeywordMatcher
+from recon_common.latency import PHASES, BUCKET_BOUNDS, PhaseTimings
+
+# Results kept per status category by IncrementalAnalysis (the report lists the first 10 403s)
+CATEGORY_SAMPLE = 10
 
 
 class AssetAnalyzer:
     """Analyzes discovered assets for prioritization and metrics."""
     
-    def __init__(self, high_value_keywords: List[str], interesting_status_codes: List[int]):
+    def __init__(self, high_value_keywords: List[str], interesting_status_codes: List[int],
+                 keyword_label_boundary: bool = False, high_value_top_k: int = 20,
+                 keep_all_high_value: bool = True):
         """
         Initialize the analyzer with configuration.
         
         Args:
             high_value_keywords: Keywords that indicate high-value targets
             interesting_status_codes: HTTP status codes of interest
+            keyword_label_boundary: Only match keywords spanning whole DNS labels
+            high_value_top_k: Number of best-scoring high-value assets ranked (and reported)
+            keep_all_high_value: Keep every high-value asset so the complete
+                                 ordering can be produced on demand
         """
         self.high_value_keywords = [kw.lower() for kw in high_value_keywords]
         self.interesting_status_codes = interesting_status_codes
+        self.high_value_top_k = high_value_top_k
+        self.keep_all_high_value = keep_all_high_value
+        
+        # Compiled once so matching cost does not grow with the keyword count
+        self.keyword_matcher = KeywordMatcher(self.high_value_keywords, label_boundary=keyword_label_boundary)
     
     def is_high_value_target(self, subdomain: str) -> tuple[bool, List[str]]:
         """
@@ -31,15 +54,47 @@ class AssetAnalyzer:
         Returns:
             Tuple of (is_high_value, matching_keywords)
         """
-        subdomain_lower = subdomain.lower()
-        matching_keywords = []
-        
-        for keyword in self.high_value_keywords:
-            if keyword in subdomain_lower:
-                matching_keywords.append(keyword)
+        matching_keywords = self.keyword_matcher.find(subdomain)
         
         return len(matching_keywords) > 0, matching_keywords
     
+    @staticmethod
+    def status_key(result: Dict) -> str:
+        """
+        Key of a live result in status_distribution: the status code as a
+        string ('unknown' without one), as it reads back from JSON.
+        """
+        status_code = result.get('http_info', {}).get('status_code')
+        return str(status_code) if status_code is not None else 'unknown'
+    
+    def status_category(self, result: Dict) -> Optional[str]:
+        """
+        Return the categorize_by_status bucket for a single result.
+        
+        Args:
+            result: One verification result
+            
+        Returns:
+            Category key, or None if the result belongs to no category
+        """
+        if not result.get('is_live'):
+            return 'unreachable' if result.get('dns_resolves') else None
+        
+        http_info = result.get('http_info', {})
+        status_code = http_info.get('status_code')
+        
+        if status_code == 200:
+            return 'active_200'
+        elif status_code == 403:
+            return 'forbidden_403'
+        elif status_code == 401:
+            return 'unauthorized_401'
+        elif status_code in [301, 302, 303, 307, 308]:
+            return 'redirects'
+        elif status_code:
+            return 'other_live'
+        return None
+    
     def categorize_by_status(self, results: List[Dict]) -> Dict[str, List[Dict]]:
         """
         Categorize live assets by HTTP status code.
@@ -60,86 +115,113 @@ class AssetAnalyzer:
         }
         
         for result in results:
-            if not result.get('is_live'):
-                if result.get('dns_resolves'):
-                    categorized['unreachable'].append(result)
-                continue
-            
-            http_info = result.get('http_info', {})
-            status_code = http_info.get('status_code')
-            
-            if status_code == 200:
-                categorized['active_200'].append(result)
-            elif status_code == 403:
-                categorized['forbidden_403'].append(result)
-            elif status_code == 401:
-                categorized['unauthorized_401'].append(result)
-            elif status_code in [301, 302, 303, 307, 308]:
-                categorized['redirects'].append(result)
-            elif status_code:
-                categorized['other_live'].append(result)
+            category = self.status_category(result)
+            if category:
+                categorized[category].append(result)
         
         return categorized
     
-    def identify_high_value_assets(self, results: List[Dict]) -> List[Dict]:
+    def score_asset(self, result: Dict) -> Optional[Dict]:
+        """
+        Score a single result as a high-value asset.
+        
+        Args:
+            result: One verification result
+            
+        Returns:
+            High-value asset entry with its priority score, or None if the
+            result is not live or matches no keyword
+        """
+        if not result.get('is_live'):
+            return None
+        
+        subdomain = result['subdomain']
+        is_high_value, keywords = self.is_high_value_target(subdomain)
+        
+        if not is_high_value:
+            return None
+        
+        http_info = result.get('http_info', {})
+        status_code = http_info.get('status_code')
+        
+        # Calculate priority score
+        priority_score = 0
+        priority_reasons = []
+        
+        # Keywords add base value
+        priority_score += len(keywords) * 10
+        priority_reasons.extend([f"Keyword: {kw}" for kw in keywords])
+        
+        # 403 is especially interesting (restricted internal asset)
+        if status_code == 403:
+            priority_score += 20
+            priority_reasons.append("403 Forbidden - Restricted access")
+        elif status_code == 401:
+            priority_score += 15
+            priority_reasons.append("401 Unauthorized - Auth required")
+        elif status_code == 200:
+            priority_score += 10
+            priority_reasons.append("200 OK - Fully accessible")
+        
+        return {
+            'subdomain': subdomain,
+            'keywords': keywords,
+            'status_code': status_code,
+            'protocol': http_info.get('protocol'),
+            'title': http_info.get('title'),
+            'priority_score': priority_score,
+            'priority_reasons': priority_reasons,
+            'http_info': http_info
+        }
+    
+    def identify_high_value_assets(self, results: List[Dict], top_k: Optional[int] = None) -> List[Dict]:
         """
         Identify high-value assets from verification results.
         
         Args:
             results: List of verification results
+            top_k: Only return the top_k best-scoring assets (O(n log K))
             
         Returns:
-            List of high-value assets with priority scores
+            List of high-value assets with priority scores, highest first
         """
-        high_value_assets = []
+        ranking = TopKRanking(top_k if top_k is not None else len(results), keep_all=False)
         
         for result in results:
-            if not result.get('is_live'):
-                continue
-            
-            subdomain = result['subdomain']
-            is_high_value, keywords = self.is_high_value_target(subdomain)
-            
-            if not is_high_value:
-                continue
-            
-            http_info = result.get('http_info', {})
-            status_code = http_info.get('status_code')
-            
-            # Calculate priority score
-            priority_score = 0
-            priority_reasons = []
-            
-            # Keywords add base value
-            priority_score += len(keywords) * 10
-            priority_reasons.extend([f"Keyword: {kw}" for kw in keywords])
-            
-            # 403 is especially interesting (restricted internal asset)
-            if status_code == 403:
-                priority_score += 20
-                priority_reasons.append("403 Forbidden - Restricted access")
-            elif status_code == 401:
-                priority_score += 15
-                priority_reasons.append("401 Unauthorized - Auth required")
-            elif status_code == 200:
-                priority_score += 10
-                priority_reasons.append("200 OK - Fully accessible")
+            asset = self.score_asset(result)
+            if asset:
+                ranking.push(asset['priority_score'], asset)
+        
+        return ranking.top()
+    
+    def build_metrics(self, total_candidates: int, dns_resolved: int, live_assets: int,
+                      status_distribution: Dict, timings: Optional[PhaseTimings] = None) -> Dict[str, any]:
+        """
+        Build the efficiency metrics dictionary from aggregated counts.
+        
+        Args:
+            total_candidates: Total number of subdomains discovered
+            dns_resolved: Number of results whose DNS resolved
+            live_assets: Number of live results
+            status_distribution: Live results per HTTP status code
+            timings: Per-phase timings of the results
             
-            high_value_assets.append({
-                'subdomain': subdomain,
-                'keywords': keywords,
-                'status_code': status_code,
-                'protocol': http_info.get('protocol'),
-                'title': http_info.get('title'),
-                'priority_score': priority_score,
-                'priority_reasons': priority_reasons,
-                'http_info': http_info
-            })
-        
-        # Sort by priority score (highest first)
-        high_value_assets.sort(key=lambda x: x['priority_score'], reverse=True)
-        
-        return high_value_assets
+        Returns:
+            Dictionary with efficiency metrics (timings: per-phase latency
+            summaries and histograms, see PhaseTimings.summary)
+        """
+        return {
+            'total_candidates': total_candidates,
+            'dns_resolved': dns_resolved,
+            'live_assets': live_assets,
+            'dead_domains': total_candidates - dns_resolved,
+            'dns_resolution_rate': (dns_resolved / total_candidates * 100) if total_candidates > 0 else 0,
+            'live_asset_rate': (live_assets / total_candidates * 100) if total_candidates > 0 else 0,
+            'noise_filtered': total_candidates - live_assets,
+            'noise_percentage': ((total_candidates - live_assets) / total_candidates * 100) if total_candidates > 0 else 0,
+            'status_distribution': status_distribution,
+            'timings': (timings or PhaseTimings()).summary()
+        }
     
     def calculate_efficiency_metrics(self, total_candidates: int, 
                                      results: List[Dict]) -> Dict[str, any]:
@@ -156,46 +238,221 @@ class AssetAnalyzer:
         live_assets = [r for r in results if r.get('is_live')]
         dns_resolved = [r for r in results if r.get('dns_resolves')]
         
-        metrics = {
-            'total_candidates': total_candidates,
-            'dns_resolved': len(dns_resolved),
-            'live_assets': len(live_assets),
-            'dead_domains': total_candidates - len(dns_resolved),
-            'dns_resolution_rate': (len(dns_resolved) / total_candidates * 100) if total_candidates > 0 else 0,
-            'live_asset_rate': (len(live_assets) / total_candidates * 100) if total_candidates > 0 else 0,
-            'noise_filtered': total_candidates - len(live_assets),
-            'noise_percentage': ((total_candidates - len(live_assets)) / total_candidates * 100) if total_candidates > 0 else 0
-        }
-        
         # Calculate status code distribution
         status_distribution = {}
         for result in live_assets:
-            status = result.get('http_info', {}).get('status_code', 'unknown')
+            status = self.status_key(result)
             status_distribution[status] = status_distribution.get(status, 0) + 1
         
-        metrics['status_distribution'] = status_distribution
+        timings = PhaseTimings()
+        for result in results:
+            timings.add(result.get('timings'))
         
-        return metrics
+        return self.build_metrics(total_candidates, len(dns_resolved), len(live_assets), status_distribution,
+                                  timings)
+    
+    def table_metrics(self, table, total_candidates: Optional[int] = None) -> Dict[str, any]:
+        """
+        Vectorised calculate_efficiency_metrics over a ResultTable.
+        
+        Args:
+            table: ResultTable with the verification results
+            total_candidates: Total number of subdomains discovered
+                              (defaults to the number of rows)
+            
+        Returns:
+            Dictionary with efficiency metrics
+        """
+        import numpy as np
+        from .result_table import IS_LIVE, DNS_RESOLVES, HAS_TIMINGS, NO_STATUS
+        
+        live = table.mask(IS_LIVE)
+        dns_resolved = table.mask(DNS_RESOLVES)
+        if total_candidates is None:
+            total_candidates = len(table)
+        
+        codes, counts = np.unique(table.status_code[live], return_counts=True)
+        status_distribution = {
+            ('unknown' if code == NO_STATUS else str(int(code))): int(count)
+            for code, count in zip(codes, counts)
+        }
+        
+        # Same buckets as LatencyHistogram.add (bisect_left == searchsorted 'left')
+        timings = PhaseTimings()
+        timings.probes = int(table.mask(HAS_TIMINGS).sum())
+        for phase in PHASES:
+            values = table.columns[f"{phase}_ms"]
+            seconds = values[~np.isnan(values)].astype(np.float64) / 1000
+            if len(seconds):
+                buckets = np.bincount(np.searchsorted(BUCKET_BOUNDS, seconds, side='left'),
+                                      minlength=len(BUCKET_BOUNDS) + 1)
+                timings.histograms[phase].add_counts(buckets.tolist(), float(seconds.sum()), float(seconds.max()))
+        
+        return self.build_metrics(total_candidates, int(dns_resolved.sum()), int(live.sum()),
+                                  status_distribution, timings)
+    
+    def categorize_table(self, table) -> Dict[str, 'np.ndarray']:
+        """
+        Vectorised categorize_by_status over a ResultTable.
+        
+        Args:
+            table: ResultTable with the verification results
+            
+        Returns:
+            Dictionary mapping the categorize_by_status keys to arrays of row
+            indices (use table.to_results(indices) to get the result dicts)
+        """
+        import numpy as np
+        from .result_table import IS_LIVE, DNS_RESOLVES, NO_STATUS
+        
+        live = table.mask(IS_LIVE)
+        status = table.status_code
+        redirect = np.isin(status, [301, 302, 303, 307, 308])
+        known = (status == 200) | (status == 403) | (status == 401) | redirect
+        
+        masks = {
+            'active_200': live & (status == 200),
+            'forbidden_403': live & (status == 403),
+            'unauthorized_401': live & (status == 401),
+            'redirects': live & redirect,
+            'other_live': live & ~known & (status != NO_STATUS) & (status != 0),
+            'unreachable': ~live & table.mask(DNS_RESOLVES)
+        }
+        return {category: np.flatnonzero(mask) for category, mask in masks.items()}
+    
+    def identify_high_value_table(self, table, top_k: Optional[int] = None) -> List[Dict]:
+        """
+        Vectorised identify_high_value_assets over a ResultTable. Keywords are
+        matched once per distinct subdomain and scores are computed per column.
+        
+        Args:
+            table: ResultTable with the verification results
+            top_k: Only return the top_k best-scoring assets
+            
+        Returns:
+            List of high-value assets with priority scores, highest first
+        """
+        import numpy as np
+        from .result_table import IS_LIVE
+        
+        keyword_counts = np.array(
+            [len(self.keyword_matcher.find(subdomain)) for subdomain in table.pools['subdomain'].values],
+            dtype=np.int32
+        )
+        row_keywords = keyword_counts[table.subdomain] if len(keyword_counts) else np.zeros(len(table), np.int32)
+        
+        status = table.status_code
+        score = row_keywords * 10 + np.select(
+            [status == 403, status == 401, status == 200], [20, 15, 10], default=0
+        )
+        rows = np.flatnonzero(table.mask(IS_LIVE) & (row_keywords > 0))
+        scores = score[rows]
+        
+        if top_k is not None and top_k < len(rows):
+            # Keep everything scoring at least the K-th best score (ties included), then sort that
+            threshold = -np.partition(-scores, top_k - 1)[top_k - 1]
+            keep = scores >= threshold
+            rows, scores = rows[keep], scores[keep]
+        
+        # Stable, so equal scores keep row order like the list-based ranking
+        order = np.argsort(-scores, kind='stable')[:top_k]
+        return [self.score_asset(table.row(int(i))) for i in rows[order]]
+    
+    def incremental(self) -> 'IncrementalAnalysis':
+        """
+        Start an incremental analysis that is fed one result at a time.
+        
+        Returns:
+            IncrementalAnalysis bound to this analyzer's configuration
+        """
+        return IncrementalAnalysis(self)
     
     def generate_report(self, metrics: Dict, categorized: Dict, 
-                       high_value_assets: List[Dict]) -> str:
+                       high_value_assets: List[Dict], high_value_total: Optional[int] = None,
+                       coverage: Optional[Dict] = None, timeouts: Optional[Dict] = None,
+                       category_counts: Optional[Dict[str, int]] = None) -> str:
         """
         Generate a comprehensive analysis report.
         
         Args:
             metrics: Efficiency metrics
             categorized: Categorized assets by status
-            high_value_assets: High-value assets with priorities
+            high_value_assets: High-value assets with priorities, highest first
+            high_value_total: Number of high-value assets found, when
+                              high_value_assets only holds the top K
+            coverage: Coverage of a run with a deadline (ScanDeadline.coverage)
+            timeouts: Per-phase timeouts of the run (AdaptiveTimeouts.report)
+            category_counts: Assets per category, when categorized only holds
+                             a sample of each
             
         Returns:
             Formatted report string
         """
+        if high_value_total is None:
+            high_value_total = len(high_value_assets)
+        if category_counts is None:
+            category_counts = {category: len(assets) for category, assets in categorized.items()}
+
         report_lines = []
         report_lines.append("=" * 80)
         report_lines.append("SUBDOMAIN DISCOVERY AND ANALYSIS REPORT")
         report_lines.append("=" * 80)
         report_lines.append("")
         
+        # Scan deadline (every figure below covers the verified candidates only)
+        if coverage is not None:
+            report_lines.append("SCAN DEADLINE AND COVERAGE")
+            report_lines.append("-" * 80)
+            report_lines.append(f"Deadline: {coverage['deadline_seconds']:.0f} s "
+                                f"({'reached' if coverage['deadline_reached'] else 'not reached'}, "
+                                f"{coverage['elapsed_seconds']:.0f} s elapsed)")
+            if coverage['candidates'] is not None:
+                report_lines.append(f"Verified: {coverage['verified']}/{coverage['candidates']} candidates "
+                                    f"({coverage['coverage_percentage']:.2f}%), "
+                                    f"{coverage['unverified']} left unverified")
+            else:
+                report_lines.append(f"Verified: {coverage['verified']} candidates")
+            probes = coverage['probes']
+            report_lines.append(f"Full probes: {probes['full']}")
+            report_lines.append(f"Reduced timeouts: {probes['reduced']}")
+            report_lines.append(f"HTTPS only, no title: {probes['essential']}")
+            report_lines.append("")
+        
+        # Timeouts chosen per phase and how many requests each one cut off
+        if timeouts is not None:
+            if timeouts['adaptive']:
+                report_lines.append(f"PHASE TIMEOUTS (adaptive: p{timeouts['percentile']:g} latency "
+                                    f"x {timeouts['multiplier']:g}, within floor/ceiling)")
+            else:
+                report_lines.append("PHASE TIMEOUTS (fixed)")
+            report_lines.append("-" * 80)
+            report_lines.append(f"{'Phase':<9}{'Samples':>9}{'p50':>10}{'p95':>10}{'p99':>10}"
+                                f"{'Timeout':>10}  {'Range used':<16}{'Cut off':>8}")
+            ms = lambda value: '-' if value is None else f"{value:.0f} ms"
+            for row in timeouts['phases']:
+                if row['timeout_min'] is None:
+                    used = '-'
+                else:
+                    used = f"{row['timeout_min']:.2f}-{row['timeout_max']:.2f} s"
+                report_lines.append(f"{row['phase']:<9}{row['count']:>9}{ms(row['p50_ms']):>10}"
+                                    f"{ms(row['p95_ms']):>10}{ms(row['p99_ms']):>10}"
+                                    f"{row['timeout']:>8.2f} s  {used:<16}{row['cut_off']:>8}")
+            report_lines.append("")
+        
+        # Where probe time went, phase by phase
+        timings = metrics.get('timings')
+        if timings and timings['phases']:
+            report_lines.append(f"PHASE TIMINGS ({timings['probes']} timed probes)")
+            report_lines.append("-" * 80)
+            report_lines.append(f"{'Phase':<9}{'Samples':>9}{'Mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+                                f"{'Max':>10}{'Time share':>12}")
+            ms = lambda value: '-' if value is None else f"{value:.0f} ms"
+            for phase, row in timings['phases'].items():
+                report_lines.append(f"{phase:<9}{row['count']:>9}{ms(row['mean_ms']):>10}{ms(row['p50_ms']):>10}"
+                                    f"{ms(row['p95_ms']):>10}{ms(row['p99_ms']):>10}{ms(row['max_ms']):>10}"
+                                    f"{row['share_percentage']:>11.1f}%")
+            report_lines.append("")
+        
         # Efficiency Metrics
         report_lines.append("1. RECONNAISSANCE EFFICIENCY METRICS")
         report_lines.append("-" * 80)
@@ -218,22 +475,22 @@ class AssetAnalyzer:
         # Categorized Assets
         report_lines.append("3. ASSET CATEGORIZATION")
         report_lines.append("-" * 80)
-        report_lines.append(f"Fully Active (200 OK): {len(categorized['active_200'])} assets")
-        report_lines.append(f"Restricted Access (403 Forbidden): {len(categorized['forbidden_403'])} assets ⚠️ HIGH INTEREST")
-        report_lines.append(f"Authentication Required (401): {len(categorized['unauthorized_401'])} assets")
-        report_lines.append(f"Redirects (3xx): {len(categorized['redirects'])} assets")
-        report_lines.append(f"Other Live: {len(categorized['other_live'])} assets")
-        report_lines.append(f"DNS Resolved but Unreachable: {len(categorized['unreachable'])} assets")
+        report_lines.append(f"Fully Active (200 OK): {category_counts['active_200']} assets")
+        report_lines.append(f"Restricted Access (403 Forbidden): {category_counts['forbidden_403']} assets ⚠️ HIGH INTEREST")
+        report_lines.append(f"Authentication Required (401): {category_counts['unauthorized_401']} assets")
+        report_lines.append(f"Redirects (3xx): {category_counts['redirects']} assets")
+        report_lines.append(f"Other Live: {category_counts['other_live']} assets")
+        report_lines.append(f"DNS Resolved but Unreachable: {category_counts['unreachable']} assets")
         report_lines.append("")
         
         # High-Value Targets
         report_lines.append("4. HIGH-VALUE TARGETS (Prioritized)")
         report_lines.append("-" * 80)
         if high_value_assets:
-            report_lines.append(f"Found {len(high_value_assets)} high-value targets:")
+            report_lines.append(f"Found {high_value_total} high-value targets:")
             report_lines.append("")
             
-            for i, asset in enumerate(high_value_assets[:20], 1):  # Top 20
+            for i, asset in enumerate(high_value_assets[:self.high_value_top_k], 1):  # Top K
                 report_lines.append(f"{i}. {asset['subdomain']} [Priority Score: {asset['priority_score']}]")
                 report_lines.append(f"   Status: HTTP {asset['status_code']} ({asset['protocol'].upper()})")
                 report_lines.append(f"   Keywords: {', '.join(asset['keywords'])}")
@@ -263,3 +520,97 @@ class AssetAnalyzer:
         report_lines.append("=" * 80)
         
         return "\n".join(report_lines)
+
+
+class IncrementalAnalysis:
+    """
+    Single-pass, online version of the AssetAnalyzer analysis.
+    
+    Metrics, status buckets and the high-value ranking are updated as each
+    verification result arrives, so the analysis is ready the moment
+    verification finishes and never needs the full result list in memory:
+    each status category keeps its count and its first CATEGORY_SAMPLE
+    results, and the ranking its top K (all high-value assets with
+    keep_all_high_value).
+    """
+    
+    def __init__(self, analyzer: AssetAnalyzer):
+        """
+        Initialize an empty analysis.
+        
+        Args:
+            analyzer: Analyzer providing keywords and scoring rules
+        """
+        self.analyzer = analyzer
+        self.count = 0
+        self.dns_resolved = 0
+        self.live_assets = 0
+        self.status_distribution = {}
+        self.timings = PhaseTimings()
+        self.categorized = analyzer.categorize_by_status([])
+        self.category_counts = {category: 0 for category in self.categorized}
+        self.high_value = TopKRanking(analyzer.high_value_top_k, keep_all=analyzer.keep_all_high_value)
+    
+    def update(self, result: Dict):
+        """
+        Add one verification result to the analysis.
+        
+        Args:
+            result: Verification result from SubdomainVerifier
+        """
+        self.count += 1
+        if result.get('dns_resolves'):
+            self.dns_resolved += 1
+        if result.get('is_live'):
+            self.live_assets += 1
+            status = self.analyzer.status_key(result)
+            self.status_distribution[status] = self.status_distribution.get(status, 0) + 1
+        self.timings.add(result.get('timings'))
+        
+        category = self.analyzer.status_category(result)
+        if category:
+            self.category_counts[category] += 1
+            if len(self.categorized[category]) < CATEGORY_SAMPLE:
+                self.categorized[category].append(result)
+        
+        asset = self.analyzer.score_asset(result)
+        if asset:
+            self.high_value.push(asset['priority_score'], asset)
+    
+    def snapshot(self, total_candidates: Optional[int] = None) -> Dict:
+        """
+        Return the current state of the analysis.
+        
+        Args:
+            total_candidates: Total number of candidates (defaults to the
+                              number of results seen so far)
+            
+        Returns:
+            Dictionary with metrics, categorized (the first results of each
+            category), category_counts (all results of each category),
+            high_value_assets (the top K, highest first) and high_value_total
+            (all high-value assets seen)
+        """
+        if total_candidates is None:
+            total_candidates = self.count
+        
+        return {
+            'metrics': self.analyzer.build_metrics(
+                total_candidates, self.dns_resolved, self.live_assets, dict(self.status_distribution),
+                self.timings
+            ),
+            'categorized': {category: list(assets) for category, assets in self.categorized.items()},
+            'category_counts': dict(self.category_counts),
+            'high_value_assets': self.high_value.top(),
+            'high_value_total': len(self.high_value)
+        }
+    
+    def all_high_value_assets(self) -> List[Dict]:
+        """
+        Complete high-value ordering, sorted only when requested.
+        
+        Returns:
+            Every high-value asset, highest score first (only the top K when
+            keep_all_high_value is disabled)
+        """
+        return self.high_value.ordered()
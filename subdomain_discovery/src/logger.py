@@ -8,13 +8,16 @@ import sys
 from pathlib import Path
 
 
-def setup_logger(log_file: str = "subdomain_discovery.log", log_level: str = "INFO") -> logging.Logger:
+def setup_logger(log_file: str = "subdomain_discovery.log", log_level: str = "INFO",
+                 console_stream=None) -> logging.Logger:
     """
     Configure and return a logger instance.
     
     Args:
         log_file: Path to the log file
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
+        console_stream: Stream for console messages (default: stdout; use
+                        stderr when stdout carries data for a pipeline)
     
     Returns:
         Configured logger instance
@@ -37,7 +40,7 @@ def setup_logger(log_file: str = "subdomain_discovery.log", log_level: str = "IN
     file_handler.setFormatter(file_formatter)
     
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(console_stream or sys.stdout)
     console_handler.setLevel(getattr(logging, log_level.upper()))
     console_formatter = logging.Formatter(
         '%(levelname)s - %(message)s'
@@ -0,0 +1,78 @@
+"""
+Ranking Module
+Bounded top-K ranking of scored items, with an optional lazy full ordering.
+"""
+
+import heapq
+from typing import Any, List, Optional
+
+
+class TopKRanking:
+    """Keeps the K best-scoring items in a min-heap (O(n log K) for n pushes)."""
+
+    def __init__(self, k: int = 20, keep_all: bool = False):
+        """
+        Initialize an empty ranking.
+
+        Args:
+            k: Number of best-scoring items to keep ranked
+            keep_all: Also keep every item (unsorted) so the complete
+                      ordering can be produced on demand
+        """
+        self.k = k
+        self.keep_all = keep_all
+        self._heap = []      # (score, -sequence, item); the root is the worst kept item
+        self._all = [] if keep_all else None
+        self._ordered = None # cached complete ordering, reset on every push
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Number of items pushed so far (not only the ones kept)."""
+        return self._count
+
+    def push(self, score: float, item: Any):
+        """
+        Add an item. Items with equal scores rank in arrival order.
+
+        Args:
+            score: Ranking score (higher is better)
+            item: Item to rank
+        """
+        self._count += 1
+        entry = (score, -self._count, item)
+
+        if self.keep_all:
+            self._all.append(entry)
+            self._ordered = None
+
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif self._heap and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def top(self, n: Optional[int] = None) -> List[Any]:
+        """
+        Return the best items, highest score first.
+
+        Args:
+            n: How many items to return (at most K; defaults to K)
+
+        Returns:
+            List of items
+        """
+        n = self.k if n is None else min(n, self.k)
+        return [entry[2] for entry in heapq.nlargest(n, self._heap, key=lambda e: e[:2])]
+
+    def ordered(self) -> List[Any]:
+        """
+        Return every item, highest score first. The sort runs only when this
+        is called and is cached until the next push.
+
+        Returns:
+            List of all items (just the top K if keep_all is disabled)
+        """
+        if not self.keep_all:
+            return self.top()
+        if self._ordered is None:
+            self._ordered = [entry[2] for entry in sorted(self._all, key=lambda e: e[:2], reverse=True)]
+        return list(self._ordered)
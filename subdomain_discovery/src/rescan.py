@@ -0,0 +1,201 @@
+"""
+Rescan Module
+Incremental rescans: only new, stale or DNS-changed subdomains are probed
+again; every other result is carried forward from the previous scan.
+"""
+
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Container, Dict, List, Optional, Tuple
+
+from recon_common.deadline import ProbePlan, FULL_PLAN
+from recon_common.records import VerificationResult
+from recon_common.serialization import read_document
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Fields compared to decide whether a re-probed asset changed
+SUMMARY_HTTP_KEYS = ('status_code', 'protocol', 'redirect_url', 'title')
+
+
+def latest_results_file(output_dir: Path, domain: str) -> Optional[Path]:
+    """
+    Find the most recent {domain}_{timestamp}_results.* (any results_format)
+    in output_dir.
+
+    Args:
+        output_dir: Directory the results are saved to
+        domain: Target domain
+
+    Returns:
+        Path of the latest results file, or None if there is none
+    """
+    pattern = re.compile(rf"^{re.escape(domain)}_(\d{{8}}_\d{{6}})_results\.(json|jsonl|bin)(\.gz|\.zst)?$")
+    candidates = [(match.group(1), path) for path in Path(output_dir).glob(f"{domain}_*_results.*")
+                  for match in [pattern.match(path.name)] if match]
+    # The timestamp format sorts chronologically
+    return max(candidates, default=(None, None))[1]
+
+
+def summarize(result, addresses: Optional[List[str]]) -> Dict:
+    """The parts of a result that a diff reports."""
+    http_info = result.get('http_info') or {}
+    summary = {
+        'dns_resolves': result.get('dns_resolves'),
+        'is_live': result.get('is_live'),
+        'addresses': addresses
+    }
+    for key in SUMMARY_HTTP_KEYS:
+        summary[key] = http_info.get(key)
+    return summary
+
+
+class IncrementalRescan:
+    """Decides per subdomain whether to probe it again or reuse the last result."""
+
+    def __init__(self, verifier, previous_file: Optional[Path] = None, ttl_hours: float = 24,
+                 now: Optional[datetime] = None, previous_data: Optional[Dict] = None,
+                 source: Optional[str] = None):
+        """
+        Load the previous scan (if any).
+
+        Args:
+            verifier: SubdomainVerifier used for DNS lookups and probes
+            previous_file: Results file of the previous scan
+            ttl_hours: Results older than this are probed again
+            now: Time of this scan (defaults to the current time)
+            previous_data: Previous scan already loaded, in the *_results.json
+                           shape (e.g. read back from the result store)
+            source: Where previous_data came from, reported in the diff
+        """
+        self.verifier = verifier
+        self.ttl = timedelta(hours=ttl_hours)
+        self.now = now or datetime.now()
+        self.source = str(previous_file) if previous_file is not None else source
+
+        self.previous = {}           # subdomain -> previous result (dict)
+        self.previous_verified = {}  # subdomain -> datetime of its last probe
+        self.previous_addresses = {} # subdomain -> A records seen then (None if unknown)
+        if previous_file is not None:
+            self._load(previous_file)
+        elif previous_data is not None:
+            self._load_data(previous_data)
+
+        self.verified_at = {}
+        self.addresses = {}
+        self.carried = set()
+        self.reasons = {'new': 0, 'stale': 0, 'dns_changed': 0, 'carried': 0}
+        self.new = []
+        self.changed = []
+
+    def _load(self, path: Path):
+        self._load_data(read_document(path))
+
+    def _load_data(self, data: Dict):
+        scan_time = datetime.strptime(data['timestamp'], TIMESTAMP_FORMAT)
+        # Files written before incremental mode have no per-host metadata
+        meta = data.get('rescan', {})
+        verified_at = meta.get('verified_at', {})
+        addresses = meta.get('addresses', {})
+        for result in data.get('results', []):
+            subdomain = result['subdomain']
+            self.previous[subdomain] = result
+            stamp = verified_at.get(subdomain)
+            self.previous_verified[subdomain] = (
+                datetime.strptime(stamp, TIMESTAMP_FORMAT) if stamp else scan_time
+            )
+            self.previous_addresses[subdomain] = addresses.get(subdomain)
+
+    def _dns_changed(self, subdomain: str, addresses: List[str]) -> bool:
+        before = self.previous_addresses.get(subdomain)
+        if before is None:
+            # Unknown answers: only a change in resolution counts
+            return bool(addresses) != bool(self.previous[subdomain].get('dns_resolves'))
+        return sorted(before) != addresses
+
+    def verify(self, subdomain: str, plan: ProbePlan = FULL_PLAN) -> VerificationResult:
+        """
+        Verify one subdomain, probing it only when it is new, stale or its
+        DNS answers changed.
+
+        Args:
+            subdomain: The subdomain to verify
+            plan: Probe plan of a scan with a deadline
+
+        Returns:
+            VerificationResult (probed now or carried forward)
+        """
+        subdomain = subdomain.strip()
+        addresses = self.verifier.resolve_addresses(subdomain, plan)
+        self.addresses[subdomain] = addresses
+        previous = self.previous.get(subdomain)
+
+        if previous is None:
+            reason = 'new'
+        elif self.now - self.previous_verified[subdomain] >= self.ttl:
+            reason = 'stale'
+        elif self._dns_changed(subdomain, addresses):
+            reason = 'dns_changed'
+        else:
+            self.reasons['carried'] += 1
+            self.carried.add(subdomain)
+            self.verified_at[subdomain] = self.previous_verified[subdomain].strftime(TIMESTAMP_FORMAT)
+            return VerificationResult.from_dict(previous)
+
+        self.reasons[reason] += 1
+        self.verified_at[subdomain] = self.now.strftime(TIMESTAMP_FORMAT)
+        result = self.verifier.verify_subdomain(subdomain, skip_dns=False, addresses=addresses, plan=plan)
+
+        after = summarize(result, addresses)
+        if previous is None:
+            self.new.append({'subdomain': subdomain, **after})
+        else:
+            before = summarize(previous, self.previous_addresses.get(subdomain))
+            # Addresses only count when the previous scan recorded them
+            if before != (after if before['addresses'] is not None else dict(after, addresses=None)):
+                self.changed.append({'subdomain': subdomain, 'reason': reason,
+                                     'before': before, 'after': after})
+        return result
+
+    def metadata(self) -> Dict:
+        """Per-host data saved with the results so the next rescan can use it."""
+        return {'verified_at': self.verified_at, 'addresses': self.addresses}
+
+    def diff(self, discovered: Optional[Container[str]] = None) -> Dict:
+        """
+        Changes since the previous scan.
+
+        Args:
+            discovered: Every subdomain discovered in this scan; when a
+                        deadline cut the scan short, previous subdomains that
+                        were discovered but not verified are not "removed"
+
+        Returns:
+            Dictionary with the previous file, probe counts and the
+            new / removed / changed assets
+        """
+        unverified = 0
+        removed = []
+        for subdomain in sorted(self.previous):
+            if subdomain in self.verified_at:
+                continue
+            if discovered is not None and subdomain in discovered:
+                unverified += 1
+            else:
+                removed.append(subdomain)
+        return {
+            'previous_results': self.source,
+            'probed': {key: value for key, value in self.reasons.items() if key != 'carried'},
+            'carried_forward': self.reasons['carried'],
+            **({'unverified': unverified} if unverified else {}),
+            'new': self.new,
+            'removed': [{'subdomain': subdomain,
+                         **summarize(self.previous[subdomain], self.previous_addresses.get(subdomain))}
+                        for subdomain in removed],
+            'changed': self.changed
+        }
+
+    def counts(self) -> Tuple[int, int]:
+        """(probed, carried forward) so far."""
+        return sum(self.reasons.values()) - self.reasons['carried'], self.reasons['carried']
@@ -0,0 +1,246 @@
+"""
+Result Table Module
+Columnar (NumPy) storage for verification results, for large-scale analytics.
+"""
+
+import json
+import sys
+from enum import IntEnum
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Shared result file readers live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.serialization import iter_records
+
+
+class Protocol(IntEnum):
+    """Protocol column values."""
+    NONE = 0
+    HTTP = 1
+    HTTPS = 2
+
+
+# Bits of the flags column
+DNS_RESOLVES = 1 << 0
+IS_LIVE = 1 << 1
+ACCESSIBLE = 1 << 2
+HAS_HTTP_INFO = 1 << 3
+HAS_TIMINGS = 1 << 4
+
+# Sentinel for missing status codes and missing strings
+NO_STATUS = -1
+NO_STRING = -1
+
+RESULT_KEYS = ('subdomain', 'dns_resolves', 'is_live', 'http_info', 'timings')
+# Phases of the timings dict, each stored in a <phase>_ms column
+TIMING_PHASES = ('dns', 'connect', 'tls', 'ttfb')
+HTTP_INFO_KEYS = ('accessible', 'status_code', 'protocol', 'redirect_url', 'title', 'error')
+
+
+class StringPool:
+    """Interns strings: each distinct value is stored once and referenced by id."""
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values = list(values or [])
+        self._ids = {value: i for i, value in enumerate(self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.values.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def get(self, string_id: int) -> Optional[str]:
+        return None if string_id == NO_STRING else self.values[string_id]
+
+
+class ResultTable:
+    """
+    Verification results stored column by column.
+
+    Columns (one row per result):
+        subdomain, title, redirect_url, error: int32 ids into StringPools
+        status_code: int16 (NO_STATUS when missing)
+        protocol: uint8 Protocol value
+        dns_ms, connect_ms, tls_ms, ttfb_ms: float32 phase timings (NaN when missing)
+        flags: uint8 bitmap of DNS_RESOLVES, IS_LIVE, ACCESSIBLE, HAS_HTTP_INFO,
+               HAS_TIMINGS
+    """
+
+    STRING_COLUMNS = ('subdomain', 'title', 'redirect_url', 'error')
+    TIMING_COLUMNS = tuple(f"{phase}_ms" for phase in TIMING_PHASES)
+
+    def __init__(self, columns: Dict[str, np.ndarray], pools: Dict[str, StringPool],
+                 extras: Optional[Dict[int, Dict]] = None):
+        self.columns = columns
+        self.pools = pools
+        # Keys outside the known result shape, kept per row for a lossless round trip
+        self.extras = extras or {}
+
+    def __len__(self) -> int:
+        return len(self.columns['flags'])
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    @classmethod
+    def from_results(cls, results: List[Dict]) -> 'ResultTable':
+        """
+        Build a table from SubdomainVerifier result dictionaries.
+
+        Args:
+            results: Verification results
+
+        Returns:
+            ResultTable with one row per result
+        """
+        pools = {name: StringPool() for name in cls.STRING_COLUMNS}
+        data = {name: [] for name in cls.STRING_COLUMNS + cls.TIMING_COLUMNS + ('status_code', 'protocol', 'flags')}
+        intern = {name: pool.intern for name, pool in pools.items()}
+        extras = {}
+
+        for row, result in enumerate(results):
+            flags = 0
+            if result.get('dns_resolves'):
+                flags |= DNS_RESOLVES
+            if result.get('is_live'):
+                flags |= IS_LIVE
+            data['subdomain'].append(intern['subdomain'](result.get('subdomain')))
+
+            http_info = result.get('http_info')
+            if http_info is not None:
+                flags |= HAS_HTTP_INFO
+                if http_info.get('accessible'):
+                    flags |= ACCESSIBLE
+                status_code = http_info.get('status_code')
+                protocol = http_info.get('protocol')
+                data['status_code'].append(NO_STATUS if status_code is None else status_code)
+                data['protocol'].append(Protocol[protocol.upper()] if protocol else Protocol.NONE)
+                for name in ('title', 'redirect_url', 'error'):
+                    data[name].append(intern[name](http_info.get(name)))
+            else:
+                data['status_code'].append(NO_STATUS)
+                data['protocol'].append(Protocol.NONE)
+                for name in ('title', 'redirect_url', 'error'):
+                    data[name].append(NO_STRING)
+
+            timings = result.get('timings')
+            if timings is not None:
+                flags |= HAS_TIMINGS
+                for phase, column in zip(TIMING_PHASES, cls.TIMING_COLUMNS):
+                    data[column].append(timings.get(phase, np.nan))
+            else:
+                for column in cls.TIMING_COLUMNS:
+                    data[column].append(np.nan)
+
+            data['flags'].append(flags)
+
+            # Results written before timings were recorded have no timings key
+            known = len(RESULT_KEYS) if 'timings' in result else len(RESULT_KEYS) - 1
+            if len(result) > known or (http_info and len(http_info) > len(HTTP_INFO_KEYS)):
+                extra = {key: value for key, value in result.items() if key not in RESULT_KEYS}
+                extra_http = {key: value for key, value in (http_info or {}).items() if key not in HTTP_INFO_KEYS}
+                if extra or extra_http:
+                    extras[row] = {'result': extra, 'http_info': extra_http}
+
+        columns = {name: np.array(data[name], dtype=np.int32) for name in cls.STRING_COLUMNS}
+        columns['status_code'] = np.array(data['status_code'], dtype=np.int16)
+        columns['protocol'] = np.array(data['protocol'], dtype=np.uint8)
+        columns['flags'] = np.array(data['flags'], dtype=np.uint8)
+        for column in cls.TIMING_COLUMNS:
+            columns[column] = np.array(data[column], dtype=np.float32)
+
+        return cls(columns, pools, extras)
+
+    @classmethod
+    def from_json(cls, path: str) -> 'ResultTable':
+        """
+        Build a table from a results file written by main.py, in any
+        results_format (json, jsonl or bin, optionally .gz/.zst; detected
+        from the content). JSONL and binary files are read incrementally.
+
+        Args:
+            path: Path to the results file
+
+        Returns:
+            ResultTable with one row per result
+        """
+        return cls.from_results(iter_records(path))
+
+    def row(self, index: int) -> Dict:
+        """Rebuild the original result dictionary for one row."""
+        columns, pools = self.columns, self.pools
+        flags = int(columns['flags'][index])
+        result = {
+            'subdomain': pools['subdomain'].get(int(columns['subdomain'][index])),
+            'dns_resolves': bool(flags & DNS_RESOLVES),
+            'is_live': bool(flags & IS_LIVE),
+            'http_info': None,
+            'timings': None
+        }
+        if flags & HAS_TIMINGS:
+            # Stored timings have one decimal; rounding undoes the float32 error
+            result['timings'] = {
+                phase: round(float(columns[column][index]), 1)
+                for phase, column in zip(TIMING_PHASES, self.TIMING_COLUMNS)
+                if not np.isnan(columns[column][index])
+            }
+        if flags & HAS_HTTP_INFO:
+            status_code = int(columns['status_code'][index])
+            protocol = Protocol(int(columns['protocol'][index]))
+            result['http_info'] = {
+                'accessible': bool(flags & ACCESSIBLE),
+                'status_code': None if status_code == NO_STATUS else status_code,
+                'protocol': None if protocol == Protocol.NONE else protocol.name.lower(),
+                'redirect_url': pools['redirect_url'].get(int(columns['redirect_url'][index])),
+                'title': pools['title'].get(int(columns['title'][index])),
+                'error': pools['error'].get(int(columns['error'][index]))
+            }
+
+        extra = self.extras.get(index)
+        if extra:
+            result.update(extra['result'])
+            if result['http_info'] is not None:
+                result['http_info'].update(extra['http_info'])
+        return result
+
+    def to_results(self, indices=None) -> List[Dict]:
+        """
+        Convert rows back to result dictionaries (the current JSON shape).
+
+        Args:
+            indices: Row indices to convert (all rows by default)
+
+        Returns:
+            List of result dictionaries
+        """
+        if indices is None:
+            indices = range(len(self))
+        return [self.row(int(i)) for i in indices]
+
+    def to_json(self, path: str):
+        """
+        Write the rows as {"results": [...]} JSON.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, 'w') as f:
+            json.dump({'results': self.to_results()}, f, indent=2)
+
+    def mask(self, flag: int) -> np.ndarray:
+        """Boolean array of the rows with the given flag bit set."""
+        return (self.columns['flags'] & flag) != 0
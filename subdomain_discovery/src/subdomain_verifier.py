@@ -7,11 +7,26 @@ and HTTP responses with timeout handling.
 import requests
 import dns.resolver
 import socket
+import sys
+import threading
+from pathlib import Path
 from typing import Dict, List, Optional
 from urllib.parse import urlparse
 import time
+from functools import partial
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
 
+# Shared record types live in recon_common/ at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from recon_common.records import HttpInfo, VerificationResult
+from recon_common.replay import ResponseArchive
+from recon_common.deadline import ProbePlan, FULL_PLAN
+from recon_common.latency import AdaptiveTimeouts, probe_timing, record_phase, timed_get
+from recon_common.metrics import PROBE_TIMEOUTS, PROBES_IN_FLIGHT, record_probe
+
+# Label of this tool's series in the shared probe metrics
+TOOL = 'subdomain_discovery'
+
 # Suppress only the single warning from urllib3 needed.
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
@@ -19,7 +34,8 @@ requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 class SubdomainVerifier:
     """Verifies if subdomains are live and accessible."""
     
-    def __init__(self, http_timeout: int = 3, dns_timeout: int = 2, headers: Optional[Dict] = None):
+    def __init__(self, http_timeout: int = 3, dns_timeout: int = 2, headers: Optional[Dict] = None,
+                 archive: Optional[ResponseArchive] = None, timeouts: Optional[AdaptiveTimeouts] = None):
         """
         Initialize the verifier with timeout settings.
         
@@ -27,6 +43,11 @@ class SubdomainVerifier:
             http_timeout: Timeout for HTTP requests in seconds
             dns_timeout: Timeout for DNS resolution in seconds
             headers: Custom HTTP headers to use
+            archive: Optional response archive that records every DNS
+                     answer and HTTP response, or replays them offline
+            timeouts: Per-phase (dns, connect, tls, ttfb) timeouts, adapted
+                      to the observed latencies; fixed at dns_timeout and
+                      http_timeout when omitted
         """
         self.http_timeout = http_timeout
         self.dns_timeout = dns_timeout
@@ -38,59 +59,94 @@ class SubdomainVerifier:
         self.resolver = dns.resolver.Resolver()
         self.resolver.timeout = dns_timeout
         self.resolver.lifetime = dns_timeout
+        
+        self.timeouts = timeouts or AdaptiveTimeouts(
+            {'dns': dns_timeout, 'connect': http_timeout, 'tls': http_timeout, 'ttfb': http_timeout},
+            enabled=False)
+        
+        # (subdomain, seconds) of each thread's last DNS lookup, so a probe
+        # given addresses looked up beforehand still reports its DNS time
+        self._last_lookup = threading.local()
+        
+        self.archive = archive
+        self._get = timed_get if archive is None else partial(archive.fetch, timed_get)
+    
+    def resolve_addresses(self, subdomain: str, plan: ProbePlan = FULL_PLAN) -> List[str]:
+        """
+        Resolve the A records of a subdomain.
+        
+        Args:
+            subdomain: The subdomain to resolve
+            plan: Probe plan of a scan with a deadline (shrinks the DNS timeout)
+            
+        Returns:
+            Sorted list of IPv4 addresses (empty if it does not resolve)
+        """
+        lifetime = plan.timeout(self.timeouts.timeout('dns'))
+        if self.archive is not None:
+            return self.archive.call('dns', subdomain, lambda: self._lookup_addresses(subdomain, lifetime),
+                                     missing=[])
+        return self._lookup_addresses(subdomain, lifetime)
+    
+    def _lookup_addresses(self, subdomain: str, lifetime: Optional[float] = None) -> List[str]:
+        start = time.perf_counter()
+        answered = True
+        try:
+            answer = self.resolver.resolve(subdomain, 'A', lifetime=lifetime)
+            addresses = sorted(rdata.address for rdata in answer)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            # Still an answer: its latency counts
+            addresses = []
+        except dns.resolver.Timeout:
+            self.timeouts.cut_off('dns')
+            PROBE_TIMEOUTS.labels(TOOL, 'dns').inc()
+            addresses, answered = [], False
+        except dns.exception.DNSException:
+            addresses, answered = [], False
+        elapsed = time.perf_counter() - start
+        if answered:
+            self.timeouts.observe('dns', elapsed)
+        record_phase('dns', elapsed)
+        self._last_lookup.value = (subdomain, elapsed)
+        return addresses
     
-    def check_dns_resolution(self, subdomain: str) -> bool:
+    def check_dns_resolution(self, subdomain: str, plan: ProbePlan = FULL_PLAN) -> bool:
         """
         Check if a subdomain resolves via DNS.
         
         Args:
             subdomain: The subdomain to check
+            plan: Probe plan of a scan with a deadline
             
         Returns:
             True if DNS resolves, False otherwise
         """
-        try:
-            self.resolver.resolve(subdomain, 'A')
-            return True
-        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.Timeout, 
-                dns.exception.DNSException):
-            return False
+        return bool(self.resolve_addresses(subdomain, plan))
     
-    def check_http_status(self, subdomain: str) -> Dict[str, any]:
+    def check_http_status(self, subdomain: str, plan: ProbePlan = FULL_PLAN) -> HttpInfo:
         """
         Check HTTP/HTTPS status of a subdomain.
         
         Args:
             subdomain: The subdomain to check
+            plan: Probe plan of a scan with a deadline (shrunk timeout; an
+                  essential plan tries HTTPS only and skips the title)
             
         Returns:
-            Dictionary with status information:
+            HttpInfo record with status information:
             - accessible: bool
             - status_code: int or None
             - protocol: str (http or https)
             - redirect_url: str or None
             - title: str or None
         """
-        result = {
-            'accessible': False,
-            'status_code': None,
-            'protocol': None,
-            'redirect_url': None,
-            'title': None,
-            'error': None
-        }
+        result = HttpInfo()
         
         # Try HTTPS first, then HTTP
-        for protocol in ['https', 'http']:
+        for protocol in ['https', 'http'] if plan.secondary else ['https']:
             url = f"{protocol}://{subdomain}"
             try:
-                response = requests.get(
-                    url,
-                    timeout=self.http_timeout,
-                    headers=self.headers,
-                    allow_redirects=True,
-                    verify=False  # Skip SSL verification to avoid certificate errors
-                )
+                response = self._fetch(url, plan)
                 
                 result['accessible'] = True
                 result['status_code'] = response.status_code
@@ -101,6 +157,8 @@ class SubdomainVerifier:
                     result['redirect_url'] = response.url
                 
                 # Try to extract title from HTML
+                if not plan.title:
+                    return result
                 try:
                     from bs4 import BeautifulSoup
                     soup = BeautifulSoup(response.text, 'html.parser')
@@ -123,36 +181,86 @@ class SubdomainVerifier:
         
         return result
     
-    def verify_subdomain(self, subdomain: str, skip_dns: bool = False) -> Dict[str, any]:
+    def _fetch(self, url: str, plan: ProbePlan) -> requests.Response:
+        """GET a URL with per-phase timeouts, feeding its phase latencies back to them."""
+        limits = {phase: plan.timeout(self.timeouts.timeout(phase)) for phase in ('connect', 'tls', 'ttfb')}
+        with probe_timing(limits['tls']) as timing:
+            try:
+                return self._get(
+                    url,
+                    timeout=(limits['connect'], limits['ttfb']),
+                    headers=self.headers,
+                    allow_redirects=True,
+                    verify=False  # Skip SSL verification to avoid certificate errors
+                )
+            except requests.exceptions.Timeout:
+                if timing.phase is not None:
+                    self.timeouts.cut_off(timing.phase)
+                    PROBE_TIMEOUTS.labels(TOOL, timing.phase).inc()
+                raise
+            finally:
+                self.timeouts.observe_timing(timing)
+                # The time a failed phase took still counts in the result's timings
+                if timing.phase is not None:
+                    timing.stop()
+    
+    def verify_subdomain(self, subdomain: str, skip_dns: bool = False,
+                         addresses: Optional[List[str]] = None,
+                         plan: ProbePlan = FULL_PLAN) -> VerificationResult:
         """
         Perform complete verification of a subdomain.
         
         Args:
             subdomain: The subdomain to verify
             skip_dns: Skip DNS check (useful when piping from subfinder)
+            addresses: A records already looked up for this subdomain
+                       (the DNS check then uses them instead of resolving again)
+            plan: Probe plan of a scan with a deadline (see recon_common.deadline)
             
         Returns:
-            Dictionary with complete verification results
+            VerificationResult record (dict-style access, to_dict() for JSON),
+            with the time spent in each phase in timings
         """
         subdomain = subdomain.strip()
-        
-        result = {
-            'subdomain': subdomain,
-            'dns_resolves': False,
-            'is_live': False,
-            'http_info': None
-        }
+        start = time.perf_counter()
+        with PROBES_IN_FLIGHT.labels(TOOL).track_inprogress(), probe_timing() as timing:
+            if addresses is not None:
+                last = getattr(self._last_lookup, 'value', None)
+                if last is not None and last[0] == subdomain:
+                    timing.add('dns', last[1])
+                    self._last_lookup.value = None
+            result = self._verify(subdomain, skip_dns, addresses, plan)
+        result['timings'] = timing.milliseconds()
+        record_probe(TOOL, self.outcome(result), time.perf_counter() - start, result['timings'])
+        return result
+    
+    @staticmethod
+    def outcome(result: VerificationResult) -> str:
+        """Outcome of a verification in recon_probes_total."""
+        if not result['dns_resolves']:
+            return 'no_dns'
+        if result['is_live']:
+            return 'live'
+        return 'error' if result['http_info'] is None or result['http_info']['error'] else 'not_live'
+
+    
+    def _verify(self, subdomain: str, skip_dns: bool, addresses: Optional[List[str]],
+                plan: ProbePlan) -> VerificationResult:
+        result = VerificationResult(subdomain=subdomain)
         
         # Check DNS resolution
         if not skip_dns:
-            result['dns_resolves'] = self.check_dns_resolution(subdomain)
+            if addresses is None:
+                result['dns_resolves'] = self.check_dns_resolution(subdomain, plan)
+            else:
+                result['dns_resolves'] = bool(addresses)
             if not result['dns_resolves']:
                 return result
         else:
             result['dns_resolves'] = True  # Assume DNS resolves if skipped
         
         # Check HTTP status
-        http_info = self.check_http_status(subdomain)
+        http_info = self.check_http_status(subdomain, plan)
         result['http_info'] = http_info
         
         # Consider live if accessible via HTTP
@@ -161,7 +269,7 @@ class SubdomainVerifier:
         
         return result
     
-    def verify_batch(self, subdomains: List[str], skip_dns: bool = False) -> List[Dict[str, any]]:
+    def verify_batch(self, subdomains: List[str], skip_dns: bool = False) -> List[VerificationResult]:
         """
         Verify a batch of subdomains.
         
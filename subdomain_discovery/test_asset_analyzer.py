@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Checks of the online analysis (IncrementalAnalysis) against the batch one
+
+Run with: python -m pytest subdomain_discovery/test_asset_analyzer.py
+      or: python subdomain_discovery/test_asset_analyzer.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.asset_analyzer import CATEGORY_SAMPLE, AssetAnalyzer
+
+
+def result(name, status=None, live=True):
+    http_info = {'status_code': status, 'protocol': 'https', 'title': None} if live else {}
+    return {'subdomain': name, 'dns_resolves': True, 'is_live': live, 'http_info': http_info}
+
+
+def analyzer():
+    return AssetAnalyzer(['vpn', 'admin'], [200, 401, 403], high_value_top_k=3, keep_all_high_value=False)
+
+
+def results(count):
+    statuses = [200, 403, 403, 301, None, 500]
+    for i in range(count):
+        yield result(f"host{i}.upm.es", statuses[i % len(statuses)], live=i % 7 != 0)
+
+
+def test_categories_keep_counts_and_a_bounded_sample():
+    analysis = analyzer().incremental()
+    for r in results(10_000):
+        analysis.update(r)
+    snapshot = analysis.snapshot()
+
+    expected = analyzer().categorize_by_status(list(results(10_000)))
+    assert snapshot['category_counts'] == {category: len(assets) for category, assets in expected.items()}
+    for category, assets in snapshot['categorized'].items():
+        assert assets == expected[category][:CATEGORY_SAMPLE]
+
+
+def test_status_distribution_keys_are_strings():
+    analysis = analyzer().incremental()
+    for r in results(600):
+        analysis.update(r)
+    distribution = analysis.snapshot()['metrics']['status_distribution']
+
+    assert set(distribution) == {'200', '301', '403', '500', 'unknown'}
+    assert distribution == analyzer().calculate_efficiency_metrics(600, list(results(600)))['status_distribution']
+
+
+def test_report_counts_every_result_of_a_category():
+    asset_analyzer = analyzer()
+    analysis = asset_analyzer.incremental()
+    for r in results(600):
+        analysis.update(r)
+    snapshot = analysis.snapshot()
+    report = asset_analyzer.generate_report(snapshot['metrics'], snapshot['categorized'],
+                                            snapshot['high_value_assets'], snapshot['high_value_total'],
+                                            category_counts=snapshot['category_counts'])
+
+    assert f"Restricted Access (403 Forbidden): {snapshot['category_counts']['forbidden_403']} assets" in report
+    assert snapshot['category_counts']['forbidden_403'] > CATEGORY_SAMPLE
+    assert "HTTP unknown:" in report
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Checks of the runs recorded in result_store: every run is either finished
+or removed, verify --stream is recorded too, and a streamed input file is
+read only once (no network needed)
+
+Run with: python -m pytest subdomain_discovery/test_result_runs.py
+      or: python subdomain_discovery/test_result_runs.py
+"""
+import io
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).parent
+sys.path.insert(0, str(ROOT))
+
+from main import SubdomainDiscoveryTool
+from recon_common.latency import AdaptiveTimeouts
+from recon_common.mapped_input import MappedLines
+
+
+class FakeVerifier:
+    """Answers every probe from a table of live hosts; fails for `broken` ones."""
+
+    def __init__(self, live=(), broken=()):
+        self.live = set(live)
+        self.broken = set(broken)
+        self.timeouts = AdaptiveTimeouts({'dns': 1, 'connect': 1, 'tls': 1, 'ttfb': 1}, enabled=False)
+
+    def resolve_addresses(self, subdomain, plan=None):
+        return ['192.0.2.1']
+
+    def verify_subdomain(self, subdomain, skip_dns=False, addresses=None, plan=None):
+        if subdomain in self.broken:
+            raise RuntimeError(f"probe of {subdomain} failed")
+        live = subdomain in self.live
+        return {'subdomain': subdomain, 'dns_resolves': True, 'is_live': live,
+                'http_info': {'status_code': 200, 'protocol': 'https', 'title': None} if live else None}
+
+
+@contextmanager
+def discovery_tool(verifier):
+    """A SubdomainDiscoveryTool writing its log, output and result store to a temporary directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = yaml.safe_load((ROOT / 'config' / 'config.yaml').read_text())
+        config.update(log_file=f"{tmp}/discovery.log", output_dir=f"{tmp}/output",
+                      result_store=f"{tmp}/output/results.db", scan_deadline=None)
+        config_path = Path(tmp) / 'config.yaml'
+        config_path.write_text(yaml.safe_dump(config))
+        tool = SubdomainDiscoveryTool(str(config_path))
+        tool.verifier = verifier
+        try:
+            yield tool
+        finally:
+            tool.close()
+            tool.store.close()
+
+
+def subfinder(names):
+    def stream_subfinder(domain, found=None):
+        for name in names:
+            if found is None or found.add(name):
+                yield name
+    return stream_subfinder
+
+
+def runs(tool):
+    tool.store.flush()
+    return [dict(row) for row in tool.store.conn.execute(
+        "SELECT r.domain, r.finished_at IS NOT NULL AS finished, "
+        "(SELECT COUNT(*) FROM probes p WHERE p.run_id = r.id) AS probes FROM runs r")]
+
+
+def test_run_without_subdomains_is_removed():
+    with discovery_tool(FakeVerifier()) as tool:
+        tool.stream_subfinder = subfinder([])
+        tool.discover_and_analyze('upm.es')
+        assert runs(tool) == []
+
+
+def test_run_with_a_failed_verification_is_removed():
+    with discovery_tool(FakeVerifier(live={'www.upm.es'}, broken={'vpn.upm.es'})) as tool:
+        tool.stream_subfinder = subfinder(['www.upm.es', 'vpn.upm.es'])
+        try:
+            tool.discover_and_analyze('upm.es')
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("the failed probe was not raised")
+        assert runs(tool) == []
+
+
+def test_stream_stdin_is_recorded():
+    with discovery_tool(FakeVerifier(live={'www.upm.es'})) as tool:
+        stdin, sys.stdin = sys.stdin, io.StringIO("www.upm.es\nmail.upm.es\nwww.upm.es\n")
+        output = io.StringIO()
+        try:
+            tool.stream_stdin(workers=2, output=output)
+        finally:
+            sys.stdin = stdin
+        assert len(output.getvalue().splitlines()) == 2
+        assert runs(tool) == [{'domain': 'stdin', 'finished': 1, 'probes': 2}]
+
+
+def test_streamed_file_is_read_once():
+    with discovery_tool(FakeVerifier(live={'www.upm.es'})) as tool:
+        input_file = Path(tool.config['output_dir']).parent / 'upm.es.txt'
+        input_file.write_text("www.upm.es\n\nmail.upm.es\nvpn.upm.es\nmail.upm.es\n")
+        reads = []
+        iter_lines, length = MappedLines.iter_lines, MappedLines.__len__
+        MappedLines.iter_lines = lambda self, *args: reads.append(args) or iter_lines(self, *args)
+        MappedLines.__len__ = lambda self: reads.append('len') or length(self)
+        try:
+            tool.verify_from_file(str(input_file), stream=True, workers=2)
+        finally:
+            MappedLines.iter_lines, MappedLines.__len__ = iter_lines, length
+        # One pass per shard, no count of its own
+        assert 'len' not in reads and len(reads) == 2
+        assert [row['total_candidates'] for row in tool.store.conn.execute("SELECT total_candidates FROM runs")] == [4]
+        assert not list(Path(tool.config['output_dir']).glob('*_raw.txt'))
+        assert list(Path(tool.config['output_dir']).glob('upm.es_*_live.txt'))
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"ok  {name}")